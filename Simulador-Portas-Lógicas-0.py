@@ -3,33 +3,27 @@
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QPushButton, QVBoxLayout, QHBoxLayout,
     QLabel, QGraphicsView, QGraphicsScene, QGraphicsItem, QGraphicsEllipseItem,
-    QGraphicsLineItem, QFileDialog, QMessageBox, QMenuBar
+    QGraphicsLineItem, QFileDialog, QMessageBox, QMenuBar, QProgressDialog,
+    QInputDialog, QDialog, QPlainTextEdit, QTableWidget, QTableWidgetItem,
+    QAbstractItemView
 )
-from PySide6.QtGui import QAction, QPen, QBrush
-from PySide6.QtCore import Qt, QPointF, QRectF
-import sys, json
-
-# =============================================================
-#  FUNÇÕES LÓGICAS
-# =============================================================
+from PySide6.QtGui import QAction, QPen, QBrush, QPainter, QPixmap, QFontDatabase
+from PySide6.QtCore import Qt, QPointF, QRectF, QObject, QThread, QTimer, Signal
+import os
+import sys
+
+from logicsim import (
+    GATE_TYPES, SOURCE_GATES, Circuit, X, LoadCancelled, MacroDefinition,
+    SequentialSimulator, SimulationCancelled, SimulationTimeout,
+    SimulationUnstable, load_project, save_project, subcircuit
+)
+from logicsim import profiling
+from logicsim.interchange import is_netlist
+from logicsim.layout import layered_layout
+from logicsim.waveform import WaveformRecorder
 
-def gate_and(inputs): return int(all(inputs))
-def gate_or(inputs): return int(any(inputs))
-def gate_not(inputs): return int(not inputs[0])
-def gate_xor(inputs): return int(inputs[0] != inputs[1])
-def gate_nand(inputs): return int(not all(inputs))
-def gate_nor(inputs): return int(not any(inputs))
-
-GATE_TYPES = {
-    "AND": gate_and,
-    "OR": gate_or,
-    "NOT": gate_not,
-    "XOR": gate_xor,
-    "NAND": gate_nand,
-    "NOR": gate_nor,
-    "INPUT": lambda _: None,   # valor definido pelo utilizador
-    "OUTPUT": lambda x: x[0] if x else 0
-}
+# Abaixo deste nível de zoom as portas são desenhadas sem texto nem âncoras
+DETAIL_LOD = 0.4
 
 # =============================================================
 #  ÂNCORA (Ponto de ligação)
@@ -37,10 +31,12 @@ GATE_TYPES = {
 
 class Anchor(QGraphicsEllipseItem):
     """Representa um ponto de ligação (entrada ou saída)."""
-    def __init__(self, parent, x_offset, y_offset, is_output=False):
+    def __init__(self, parent, x_offset, y_offset, is_output=False, pin=0):
         super().__init__(-5, -5, 10, 10, parent)
+        self.setPos(x_offset, y_offset)
         self.setBrush(QBrush(Qt.darkGreen))
         self.is_output = is_output
+        self.pin = pin
         self.parent_gate = parent
         self.x_offset = x_offset
         self.y_offset = y_offset
@@ -51,54 +47,150 @@ class Anchor(QGraphicsEllipseItem):
         p = self.parent_gate.scenePos()
         return QPointF(p.x() + self.x_offset, p.y() + self.y_offset)
 
+    def paint(self, painter, option, widget):
+        if option.levelOfDetailFromTransform(painter.worldTransform()) >= DETAIL_LOD:
+            super().paint(painter, option, widget)
+
 # =============================================================
 #  PORTA LÓGICA
 # =============================================================
 
 class GateItem(QGraphicsItem):
-    """Porta lógica com âncoras de entrada e saída."""
+    """Porta lógica com âncoras de entrada e saída.
+
+    É apenas a vista de uma porta do `Circuit` da cena (`gate_id`).
+    """
     def __init__(self, gate_type="AND"):
         super().__init__()
         self.gate_type = gate_type
+        self.label = gate_type
+        self.gate_id = None
         self.width, self.height = 80, 50
         self.value = 0
 
         # Criar âncoras
         self.inputs = []
         self.output = None
+        self.createAnchors()
+
+        self.setFlags(QGraphicsItem.ItemIsMovable | QGraphicsItem.ItemIsSelectable |
+                      QGraphicsItem.ItemSendsGeometryChanges)
 
+    def createAnchors(self):
+        gate_type = self.gate_type
         if gate_type == "NOT":
             self.inputs.append(Anchor(self, -10, 25, False))
             self.output = Anchor(self, 90, 25, True)
-        elif gate_type == "INPUT":
+        elif gate_type in ("INPUT", "CLOCK", "CONST0", "CONST1"):
             self.output = Anchor(self, 90, 25, True)
         elif gate_type == "OUTPUT":
             self.inputs.append(Anchor(self, -10, 25, False))
         else:
-            self.inputs.append(Anchor(self, -10, 15, False))
-            self.inputs.append(Anchor(self, -10, 35, False))
+            self.inputs.append(Anchor(self, -10, 15, False, pin=0))
+            self.inputs.append(Anchor(self, -10, 35, False, pin=1))
             self.output = Anchor(self, 90, 25, True)
 
-        self.setFlags(QGraphicsItem.ItemIsMovable | QGraphicsItem.ItemIsSelectable)
+    def itemChange(self, change, value):
+        # Avisar a cena para reposicionar só os fios desta porta
+        if change == QGraphicsItem.ItemPositionHasChanged and self.scene():
+            self.scene().gateMoved(self)
+        return super().itemChange(change, value)
+
+    def anchors(self):
+        """Todas as âncoras da porta (entradas e saída)."""
+        if self.output is None:
+            return list(self.inputs)
+        return self.inputs + [self.output]
+
+    def circuitIds(self):
+        """IDs das portas do circuito representadas por este item."""
+        return range(self.gate_id, self.gate_id + 1)
+
+    def outputId(self, pin):
+        """ID da porta do circuito ligada à saída `pin`."""
+        return self.gate_id
 
     def boundingRect(self):
         return QRectF(0, 0, self.width, self.height)
 
+    # Imagens já desenhadas, partilhadas por todas as portas: (tipo, valor) -> QPixmap
+    _pixmaps = {}
+
     def paint(self, painter, option, widget):
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        if lod < DETAIL_LOD:
+            # Muito afastado: só o retângulo
+            painter.fillRect(0, 0, self.width, self.height, Qt.lightGray)
+        elif lod <= 1:
+            painter.drawPixmap(0, 0, self.pixmap())
+        else:
+            # Ampliado: desenho vetorial para não ficar desfocado
+            self.paintDetail(painter)
+
+    def paintDetail(self, painter):
         painter.setPen(Qt.black)
         painter.setBrush(Qt.lightGray)
         painter.drawRect(0, 0, self.width, self.height)
-        painter.drawText(20, 30, self.gate_type)
+        painter.drawText(20, 30, self.label)
         if self.gate_type in ("INPUT", "OUTPUT") or self.value is not None:
-            painter.drawText(50, 45, str(self.value))
+            painter.drawText(50, 45, "X" if self.value == X else str(self.value))
+
+    def pixmap(self):
+        """Imagem da porta para o seu tipo e valor atuais (em cache)."""
+        key = (self.label, self.height, self.value)
+        pixmap = GateItem._pixmaps.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(self.width + 1, self.height + 1)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            self.paintDetail(painter)
+            painter.end()
+            GateItem._pixmaps[key] = pixmap
+        return pixmap
 
     def mouseDoubleClickEvent(self, event):
         """Duplo clique no INPUT alterna entre 0 e 1."""
         if self.gate_type == "INPUT":
             self.value = 0 if self.value == 1 else 1
             self.update()
+            if self.scene():
+                self.scene().inputToggled(self)
         super().mouseDoubleClickEvent(event)
 
+class MacroItem(GateItem):
+    """Instância de um componente, com as entradas e saídas da definição.
+
+    No circuito corresponde a uma porta MACRO (`gate_id`) seguida de uma
+    porta PIN por saída.
+    """
+    def __init__(self, definition):
+        self.definition = definition
+        super().__init__("MACRO")
+        self.label = definition.name
+
+    def createAnchors(self):
+        d = self.definition
+        self.height = max(50, 20 * max(d.n_inputs, d.n_outputs) + 10)
+        self.inputs = [Anchor(self, -10, 15 + 20 * k, False, pin=k)
+                       for k in range(d.n_inputs)]
+        self.outputs = [Anchor(self, 90, 15 + 20 * k, True, pin=k)
+                        for k in range(d.n_outputs)]
+
+    def anchors(self):
+        return self.inputs + self.outputs
+
+    def circuitIds(self):
+        return range(self.gate_id, self.gate_id + 1 + len(self.outputs))
+
+    def outputId(self, pin):
+        return self.gate_id + 1 + pin
+
+    def paintDetail(self, painter):
+        painter.setPen(Qt.black)
+        painter.setBrush(Qt.lightGray)
+        painter.drawRect(0, 0, self.width, self.height)
+        painter.drawText(10, self.height // 2 + 5, self.label)
+
 # =============================================================
 #  FIO (Wire)
 # =============================================================
@@ -119,6 +211,62 @@ class WireItem(QGraphicsLineItem):
         end = self.in_anchor.scenePos()
         self.setLine(start.x(), start.y(), end.x(), end.y())
 
+# =============================================================
+#  ÍNDICE ESPACIAL DE ÂNCORAS
+# =============================================================
+
+# Distância máxima (unidades da cena) a que um clique "apanha" uma âncora
+SNAP_RADIUS = 12
+
+class AnchorIndex:
+    """Grelha uniforme para encontrar a âncora mais próxima de um ponto.
+
+    Cada pesquisa só visita as células à volta do ponto, pelo que o custo
+    não depende do número de âncoras na cena.
+    """
+    def __init__(self, cell=40.0):
+        self.cell = cell
+        self.cells = {}
+        self.where = {}
+
+    def _key(self, pos):
+        return (int(pos.x() // self.cell), int(pos.y() // self.cell))
+
+    def insert(self, anchor):
+        key = self._key(anchor.scenePos())
+        self.cells.setdefault(key, []).append(anchor)
+        self.where[anchor] = key
+
+    def remove(self, anchor):
+        key = self.where.pop(anchor)
+        bucket = self.cells[key]
+        bucket.remove(anchor)
+        if not bucket:
+            del self.cells[key]
+
+    def move(self, anchor):
+        if self._key(anchor.scenePos()) != self.where[anchor]:
+            self.remove(anchor)
+            self.insert(anchor)
+
+    def clear(self):
+        self.cells.clear()
+        self.where.clear()
+
+    def nearest(self, pos, radius):
+        """Âncora mais próxima de `pos` a menos de `radius`, ou None."""
+        x0, y0 = self._key(QPointF(pos.x() - radius, pos.y() - radius))
+        x1, y1 = self._key(QPointF(pos.x() + radius, pos.y() + radius))
+        best, best_d2 = None, radius * radius
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for anchor in self.cells.get((cx, cy), ()):
+                    p = anchor.scenePos()
+                    d2 = (p.x() - pos.x()) ** 2 + (p.y() - pos.y()) ** 2
+                    if d2 <= best_d2:
+                        best, best_d2 = anchor, d2
+        return best
+
 # =============================================================
 #  CENA PRINCIPAL
 # =============================================================
@@ -129,70 +277,398 @@ class LogicScene(QGraphicsScene):
         super().__init__()
         self.current_gate_type = None
         self.pending_output_anchor = None
+        self.circuit = Circuit()
+        self.gates = []
         self.wires = []
+        self.anchors = AnchorIndex()
+        self.live = False
+        # Versão da netlist cujo ciclo combinacional já foi assinalado
+        self.cycle_warned = None
+        # Formas de onda: cada atualização de valores é um instante
+        self.recorder = None
+        self.recording = False
+        self.trace_time = 0
+
+        # Portas movidas desde a última atualização dos fios
+        self.moved_gates = set()
+        self.wire_timer = QTimer()
+        self.wire_timer.setSingleShot(True)
+        self.wire_timer.setInterval(0)
+        self.wire_timer.timeout.connect(self.updateMovedWires)
 
     def setGateType(self, gate_type):
         self.current_gate_type = gate_type
 
     def mousePressEvent(self, event):
-        item = self.itemAt(event.scenePos(), self.views()[0].transform())
+        anchor = self.anchors.nearest(event.scenePos(), SNAP_RADIUS)
 
         # Clique numa âncora → gerir ligação automática
-        if isinstance(item, Anchor):
-            if item.is_output:
+        if anchor is not None:
+            if anchor.is_output:
                 # Selecionou saída (primeiro clique)
-                self.pending_output_anchor = item
+                self.pending_output_anchor = anchor
             elif self.pending_output_anchor:
                 # Selecionou entrada (segundo clique)
-                self.addWire(self.pending_output_anchor, item)
+                self.addWire(self.pending_output_anchor, anchor)
                 self.pending_output_anchor = None
             return
 
         # Criar nova porta
         if self.current_gate_type:
-            gate = GateItem(self.current_gate_type)
+            if isinstance(self.current_gate_type, MacroDefinition):
+                gate = MacroItem(self.current_gate_type)
+            else:
+                gate = GateItem(self.current_gate_type)
             gate.setPos(event.scenePos())
-            self.addItem(gate)
+            self.addGate(gate)
             self.current_gate_type = None
         else:
             super().mousePressEvent(event)
 
+    def addGate(self, gate):
+        """Acrescenta a porta à cena e ao circuito."""
+        pos = gate.pos()
+        if isinstance(gate, MacroItem):
+            ids = self.circuit.add_macro(gate.definition, pos.x(), pos.y())
+        else:
+            ids = [self.circuit.add_gate(gate.gate_type, gate.value,
+                                         pos.x(), pos.y())]
+        gate.gate_id = ids[0]
+        # `gates` segue os IDs do circuito: as saídas (PIN) de um
+        # componente apontam para o mesmo item
+        self.gates.extend([gate] * len(ids))
+        self.addItem(gate)
+        for anchor in gate.anchors():
+            self.anchors.insert(anchor)
+
     def addWire(self, output_anchor, input_anchor):
         """Cria fio entre saída e entrada."""
         wire = WireItem(output_anchor, input_anchor)
         self.addItem(wire)
         self.wires.append(wire)
+        self.circuit.connect(output_anchor.parent_gate.outputId(output_anchor.pin),
+                             input_anchor.parent_gate.gate_id,
+                             input_anchor.pin)
+
+    def syncCircuit(self):
+        """Copia posições e valores das portas para o circuito."""
+        circuit = self.circuit
+        for g in self.gates:
+            pos = g.pos()
+            circuit.x[g.gate_id] = pos.x()
+            circuit.y[g.gate_id] = pos.y()
+            circuit.values[g.gate_id] = g.value
+        return circuit
+
+    def populate(self, circuit, batch=2000):
+        """Substitui o conteúdo da cena pelas portas e fios de `circuit`.
+
+        É um gerador: a cada `batch` itens criados produz a fração já
+        concluída, para que a interface possa continuar a responder.
+        """
+        self.clear()
+        total = max(len(circuit) + len(circuit.wire_src), 1)
+        done = 0
+        for i, gate_type in enumerate(circuit.gate_types):
+            done += 1
+            if gate_type == "PIN":
+                continue   # criadas com o componente
+            if gate_type == "MACRO":
+                gate = MacroItem(circuit.macros[circuit.params[i]])
+            else:
+                gate = GateItem(gate_type)
+                gate.value = circuit.values[i]
+            gate.setPos(circuit.x[i], circuit.y[i])
+            self.addGate(gate)
+            if done % batch == 0:
+                yield done / total
+        for src, dst, pin in circuit.wires:
+            done += 1
+            if self.gates[dst].gate_id != dst:
+                continue   # ligação interna MACRO -> PIN
+            self.addWire(self.outputAnchor(src), self.gates[dst].inputs[pin])
+            if done % batch == 0:
+                yield done / total
+
+    def outputAnchor(self, gate_id):
+        """Âncora de saída correspondente à porta `gate_id` do circuito."""
+        gate = self.gates[gate_id]
+        if isinstance(gate, MacroItem):
+            return gate.outputs[gate_id - gate.gate_id - 1]
+        return gate.output
+
+    def selectedIds(self):
+        """IDs do circuito das portas selecionadas."""
+        ids = []
+        for item in self.selectedItems():
+            if isinstance(item, GateItem):
+                ids.extend(item.circuitIds())
+        return ids
+
+    def loadCircuit(self, circuit):
+        """Versão síncrona de `populate`."""
+        for _ in self.populate(circuit):
+            pass
+
+    def gateMoved(self, gate):
+        """Regista uma porta movida; os fios são atualizados uma vez por ciclo."""
+        self.moved_gates.add(gate)
+        if not self.wire_timer.isActive():
+            self.wire_timer.start()
+
+    def updateMovedWires(self):
+        """Reposiciona só os fios ligados às portas movidas, cada um uma vez."""
+        wires = set()
+        for gate in self.moved_gates:
+            for anchor in gate.anchors():
+                self.anchors.move(anchor)
+                wires.update(anchor.connected_wires)
+        self.moved_gates.clear()
+        for wire in wires:
+            wire.updatePosition()
+
+    def clear(self):
+        """Remove todos os itens e recomeça com um circuito vazio."""
+        super().clear()
+        self.anchors.clear()
+        self.moved_gates.clear()
+        self.pending_output_anchor = None
+        self.circuit = Circuit()
+        self.gates = []
+        self.wires = []
+        self.recorder = None
+        self.recording = False
+
+    def startRecording(self, ids):
+        """Começa a registar as formas de onda das portas `ids`."""
+        ids = sorted(i for i in set(ids) if i < len(self.circuit))
+        names = [f"{self.gates[i].label}_{i}" for i in ids]
+        self.recorder = WaveformRecorder(ids, names)
+        self.recording = True
+        self.trace_time = 0
+
+    def stopRecording(self):
+        """Deixa de registar; o que foi gravado continua disponível."""
+        self.recording = False
+
+    def setLive(self, enabled):
+        """Liga/desliga a simulação automática ao alternar INPUTs."""
+        self.live = enabled
+        if enabled:
+            self.evaluate()
+
+    def inputToggled(self, gate):
+        """Propaga a alteração de um INPUT só pelo cone afetado."""
+        if not self.live:
+            return
+        changed = self.circuit.set_input(gate.gate_id, gate.value)
+        self.applyValues(self.circuit.result, changed)
+
+    def applyValues(self, values, ids):
+        """Copia `values` para as portas `ids` e redesenha numa só atualização.
+
+        Só as portas cujo valor mudou contam para a área a redesenhar. Um
+        valor X é mostrado como tal, para não ficar o 0/1 anterior.
+        """
+        recorder = self.recorder
+        if (self.recording and recorder.probes
+                and len(values) > recorder.probes[-1]):
+            recorder.sample(self.trace_time, values, ids)
+            self.trace_time += 1
+
+        with profiling.phase("ui_update"):
+            dirty = QRectF()
+            gates = self.gates
+            for i in ids:
+                v = values[i]
+                g = gates[i]
+                if g.gate_id != i:
+                    continue   # saída de um componente
+                if v != g.value:
+                    g.value = v
+                    dirty = dirty.united(g.sceneBoundingRect())
+            if not dirty.isNull():
+                self.update(dirty)
+
+    def snapshot(self):
+        """Netlist compilada e cópia dos valores, para simular noutra thread."""
+        circuit = self.circuit
+        for g in self.gates:
+            # INPUTs e estado dos elementos sequenciais
+            if g.gate_type in SOURCE_GATES:
+                circuit.values[g.gate_id] = g.value
+        return circuit.compile(), bytearray(circuit.values)
+
+    def applyResult(self, compiled, values):
+        """Aplica de uma só vez o resultado de uma simulação às portas.
+
+        Portas criadas depois da fotografia (`snapshot`) ficam como estão.
+        """
+        self.circuit.store_result(compiled, values)
+
+        # Um aviso por versão da netlist: latches de portas NOR/NAND são
+        # ciclos intencionais e a simulação automática avalia muitas vezes
+        if compiled.cyclic and self.cycle_warned != compiled.version:
+            self.cycle_warned = compiled.version
+            QMessageBox.warning(self.views()[0] if self.views() else None,
+                "Ciclo detetado",
+                f"{len(compiled.cyclic)} porta(s) fazem parte de um ciclo "
+                "combinacional e não foram avaliadas.")
+
+        # Actualizar valores
+        self.applyValues(values, range(min(len(compiled), len(self.gates))))
 
     def evaluate(self):
-        """Executa simulação lógica completa."""
-        gates = [i for i in self.items() if isinstance(i, GateItem)]
-        values = {}
-        changed = True
-
-        while changed:
-            changed = False
-            for g in gates:
-                if g.gate_type == "INPUT":
-                    values[g] = g.value
-                else:
-                    inputs = []
-                    for inp in g.inputs:
-                        v = None
-                        for w in inp.connected_wires:
-                            if w.out_anchor.parent_gate in values:
-                                v = values[w.out_anchor.parent_gate]
-                        if v is not None:
-                            inputs.append(v)
-                    if len(inputs) == len(g.inputs):
-                        new_val = GATE_TYPES[g.gate_type](inputs)
-                        if g not in values or values[g] != new_val:
-                            values[g] = new_val
-                            changed = True
+        """Executa simulação lógica completa (uma passagem por nível)."""
+        compiled, values = self.snapshot()
+        self.applyResult(compiled, compiled.evaluate(values))
+
+    def stepClock(self):
+        """Avança um ciclo de relógio; o novo estado fica nos DFF/LATCH."""
+        compiled, values = self.snapshot()
+        # O estado guardado em ciclos de portas (latch NOR/NAND) é o que
+        # está à vista; sem isto voltaria a 0 em cada ciclo
+        for i in compiled.cyclic:
+            if i < len(self.gates) and self.gates[i].gate_id == i:
+                values[i] = self.gates[i].value
+        sim = SequentialSimulator(compiled, values)
+        sim.step()
+        self.circuit.store_result(compiled, sim.values)
+        self.applyValues(sim.values, range(min(len(compiled), len(self.gates))))
+
+class CircuitView(QGraphicsView):
+    """Vista da cena; com o perfil ativo, a pintura conta como fase "paint"."""
+    def paintEvent(self, event):
+        with profiling.phase("paint"):
+            super().paintEvent(event)
 
-        # Actualizar valores
-        for g, v in values.items():
-            g.value = v
-            g.update()
+# =============================================================
+#  PERFIL DE DESEMPENHO
+# =============================================================
+
+class ProfileDialog(QDialog):
+    """Tempos por fase, contadores e portas mais ativas (duplo clique
+    seleciona a porta na cena)."""
+    def __init__(self, window, profiler):
+        super().__init__(window)
+        self.setWindowTitle("Perfil de desempenho")
+        self.resize(520, 560)
+        self.window = window
+        self.profiler = profiler
+
+        self.summary = QPlainTextEdit(readOnly=True)
+        self.summary.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["ID", "Tipo", "Avaliações", "Mudanças"])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.cellDoubleClicked.connect(self.showGate)
+
+        btn_refresh = QPushButton("Atualizar")
+        btn_reset = QPushButton("Limpar")
+        btn_refresh.clicked.connect(self.refresh)
+        btn_reset.clicked.connect(self.resetProfile)
+        buttons = QHBoxLayout()
+        buttons.addWidget(btn_refresh)
+        buttons.addWidget(btn_reset)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.summary)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+        self.refresh()
+
+    def refresh(self):
+        prof = self.profiler
+        self.summary.setPlainText(prof.report(n=0))
+        types = self.window.scene.circuit.gate_types
+        spots = prof.hotspots(50)
+        self.table.setRowCount(len(spots))
+        for row, (i, evaluations, changes) in enumerate(spots):
+            cells = (i, types[i] if i < len(types) else "", evaluations, changes)
+            for col, value in enumerate(cells):
+                item = QTableWidgetItem(str(value))
+                if col != 1:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, col, item)
+
+    def resetProfile(self):
+        self.profiler.reset()
+        self.refresh()
+
+    def showGate(self, row, _col):
+        i = int(self.table.item(row, 0).text())
+        scene = self.window.scene
+        if i >= len(scene.gates):
+            return
+        gate = scene.gates[i]
+        scene.clearSelection()
+        gate.setSelected(True)
+        self.window.view.centerOn(gate)
+
+# =============================================================
+#  CARREGAMENTO EM SEGUNDO PLANO
+# =============================================================
+
+class ProjectLoader(QObject):
+    """Lê um projeto numa thread separada da interface."""
+    progress = Signal(float)
+    loaded = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.cancel_requested = False
+
+    def run(self):
+        try:
+            circuit = load_project(self.path, self.progress.emit,
+                                   lambda: self.cancel_requested)
+            if is_netlist(self.path):
+                layered_layout(circuit)   # as netlists não trazem posições
+        except LoadCancelled:
+            self.failed.emit("")
+        except Exception as e:
+            # Qualquer erro tem de chegar à interface, que fecha o diálogo
+            self.failed.emit(str(e) or type(e).__name__)
+        else:
+            self.loaded.emit(circuit)
+
+# =============================================================
+#  SIMULAÇÃO EM SEGUNDO PLANO
+# =============================================================
+
+# Tempo máximo (segundos) de uma simulação lançada pela interface
+SIMULATION_TIME_LIMIT = 60.0
+
+class SimulationWorker(QObject):
+    """Simula uma fotografia da netlist numa thread separada."""
+    progress = Signal(float)
+    simulated = Signal(object, object)
+    failed = Signal(str)
+
+    def __init__(self, compiled, values):
+        super().__init__()
+        self.compiled = compiled
+        self.values = values
+        self.cancel_requested = False
+
+    def run(self):
+        try:
+            result = self.compiled.evaluate(
+                self.values, self.progress.emit,
+                lambda: self.cancel_requested, SIMULATION_TIME_LIMIT)
+        except SimulationTimeout:
+            self.failed.emit("A simulação excedeu o tempo limite "
+                             f"({SIMULATION_TIME_LIMIT:.0f} s).")
+        except SimulationCancelled:
+            self.failed.emit("")
+        except Exception as e:
+            # Qualquer erro tem de chegar à interface, que fecha o diálogo
+            self.failed.emit(str(e) or type(e).__name__)
+        else:
+            self.simulated.emit(self.compiled, result)
 
 # =============================================================
 #  JANELA PRINCIPAL
@@ -206,17 +682,18 @@ class LogicSimulator(QMainWindow):
         self.resize(1000, 700)
 
         self.scene = LogicScene()
-        self.view = QGraphicsView(self.scene)
+        self.view = CircuitView(self.scene)
 
         # Botões
-        layout_btns = QHBoxLayout()
+        self.layout_btns = layout_btns = QHBoxLayout()
         for gate in GATE_TYPES.keys():
             btn = QPushButton(gate)
             btn.clicked.connect(lambda _, g=gate: self.scene.setGateType(g))
             layout_btns.addWidget(btn)
+        self.components = []
 
         btn_run = QPushButton("Executar Simulação")
-        btn_run.clicked.connect(self.scene.evaluate)
+        btn_run.clicked.connect(self.runSimulation)
         layout_btns.addWidget(btn_run)
 
         layout_main = QVBoxLayout()
@@ -227,6 +704,8 @@ class LogicSimulator(QMainWindow):
         container.setLayout(layout_main)
         self.setCentralWidget(container)
 
+        self.sim_thread = None
+        self.profiler = None
         self.createMenuBar()
 
     def createMenuBar(self):
@@ -244,14 +723,170 @@ class LogicSimulator(QMainWindow):
 
         menu_sim = menubar.addMenu("Simulação")
         act_run = QAction("Executar", self)
-        act_run.triggered.connect(self.scene.evaluate)
-        menu_sim.addAction(act_run)
+        act_run.triggered.connect(self.runSimulation)
+        act_live = QAction("Simulação automática", self, checkable=True)
+        act_live.toggled.connect(self.scene.setLive)
+        act_step = QAction("Avançar ciclo de relógio", self)
+        act_step.setShortcut("F6")
+        act_step.triggered.connect(self.stepClock)
+        menu_sim.addActions([act_run, act_live, act_step])
+        menu_sim.addSeparator()
+        self.act_record = QAction("Gravar formas de onda", self, checkable=True)
+        self.act_record.toggled.connect(self.toggleRecording)
+        act_vcd = QAction("Exportar VCD...", self)
+        act_vcd.triggered.connect(self.exportVCD)
+        menu_sim.addActions([self.act_record, act_vcd])
+        menu_sim.addSeparator()
+        act_profile = QAction("Perfil de desempenho", self, checkable=True)
+        act_profile.toggled.connect(self.toggleProfiling)
+        act_hotspots = QAction("Mostrar perfil...", self)
+        act_hotspots.triggered.connect(self.showProfile)
+        menu_sim.addActions([act_profile, act_hotspots])
+
+        menu_comp = menubar.addMenu("Componentes")
+        act_create = QAction("Criar a partir da seleção...", self)
+        act_import = QAction("Importar de projeto...", self)
+        self.act_collapse = QAction("Reduzir a tabela de consulta", self,
+                                    checkable=True, checked=True)
+        act_create.triggered.connect(self.createComponent)
+        act_import.triggered.connect(self.importComponent)
+        menu_comp.addActions([act_create, act_import])
+        menu_comp.addSeparator()
+        menu_comp.addAction(self.act_collapse)
 
         menu_help = menubar.addMenu("Ajuda")
         act_about = QAction("Sobre", self)
         act_about.triggered.connect(self.showAbout)
         menu_help.addAction(act_about)
 
+    def runSimulation(self):
+        """Simula numa thread de trabalho, com progresso e cancelamento."""
+        if self.sim_thread is not None and self.sim_thread.isRunning():
+            return
+        compiled, values = self.scene.snapshot()
+
+        self.sim_progress = QProgressDialog("A simular...", "Cancelar",
+                                            0, 100, self)
+        self.sim_progress.setWindowModality(Qt.WindowModal)
+        self.sim_progress.setMinimumDuration(500)
+
+        self.sim_worker = SimulationWorker(compiled, values)
+        self.sim_thread = QThread(self)
+        self.sim_worker.moveToThread(self.sim_thread)
+        self.sim_thread.started.connect(self.sim_worker.run)
+        self.sim_progress.canceled.connect(self.cancelSimulation)
+        self.sim_worker.progress.connect(self.onSimulationProgress)
+        self.sim_worker.simulated.connect(self.onSimulated)
+        self.sim_worker.failed.connect(self.onSimulationFailed)
+        self.sim_worker.simulated.connect(self.sim_thread.quit)
+        self.sim_worker.failed.connect(self.sim_thread.quit)
+        self.sim_thread.start()
+
+    def onSimulationProgress(self, fraction):
+        self.sim_progress.setValue(int(100 * fraction))
+
+    def onSimulated(self, compiled, values):
+        self.sim_progress.reset()
+        self.scene.applyResult(compiled, values)
+
+    def onSimulationFailed(self, message):
+        self.sim_progress.reset()
+        if message:
+            QMessageBox.warning(self, "Simulação interrompida", message)
+
+    def stepClock(self):
+        try:
+            self.scene.stepClock()
+        except SimulationUnstable as e:
+            QMessageBox.warning(self, "Circuito instável", str(e))
+
+    def toggleRecording(self, enabled):
+        """Grava as portas selecionadas (ou INPUTs, OUTPUTs e registos)."""
+        if not enabled:
+            self.scene.stopRecording()
+            return
+        ids = self.scene.selectedIds()
+        if not ids:
+            ids = [g.gate_id for g in self.scene.gates
+                   if g.gate_type in SOURCE_GATES or g.gate_type == "OUTPUT"]
+        self.scene.startRecording(ids)
+
+    def toggleProfiling(self, enabled):
+        """Liga/desliga a instrumentação; os dados mantêm-se ao desligar."""
+        if enabled:
+            self.profiler = profiling.enable(self.profiler)
+        else:
+            profiling.disable()
+
+    def showProfile(self):
+        if self.profiler is None:
+            QMessageBox.information(self, "Perfil de desempenho",
+                "Ative \"Perfil de desempenho\" e simule o circuito primeiro.")
+            return
+        ProfileDialog(self, self.profiler).show()
+
+    def exportVCD(self):
+        recorder = self.scene.recorder
+        if recorder is None or recorder.base is None:
+            QMessageBox.information(self, "Formas de onda",
+                "Ative \"Gravar formas de onda\" e simule o circuito primeiro.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar VCD", "",
+            "VCD (*.vcd)")
+        if not path: return
+        with open(path, "w") as f:
+            recorder.write_vcd(f)
+
+    def cancelSimulation(self):
+        self.sim_worker.cancel_requested = True
+
+    def addComponent(self, definition):
+        """Acrescenta um botão para instanciar o componente."""
+        if any(d is definition for d in self.components):
+            return
+        self.components.append(definition)
+        btn = QPushButton(definition.name)
+        btn.clicked.connect(lambda _, d=definition: self.scene.setGateType(d))
+        # Antes do botão "Executar Simulação"
+        self.layout_btns.insertWidget(self.layout_btns.count() - 1, btn)
+
+    def createComponent(self):
+        """Cria um componente com as portas selecionadas.
+
+        Os INPUTs e OUTPUTs selecionados passam a ser os seus pinos.
+        """
+        ids = self.scene.selectedIds()
+        if not ids:
+            QMessageBox.information(self, "Componentes",
+                "Selecione as portas do componente, incluindo os INPUTs "
+                "e OUTPUTs que serão os seus pinos.")
+            return
+        name, ok = QInputDialog.getText(self, "Novo componente", "Nome:")
+        if not ok or not name:
+            return
+        try:
+            definition = MacroDefinition(
+                name, subcircuit(self.scene.syncCircuit(), ids),
+                self.act_collapse.isChecked())
+        except ValueError as e:
+            QMessageBox.warning(self, "Erro", f"Não foi possível criar o componente:\n{e}")
+            return
+        self.addComponent(definition)
+
+    def importComponent(self):
+        """Cria um componente a partir de um projeto guardado."""
+        path, _ = QFileDialog.getOpenFileName(self, "Importar Componente", "",
+            "Projetos (*.json *.lgsb)")
+        if not path: return
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            definition = MacroDefinition(name, load_project(path),
+                                         self.act_collapse.isChecked())
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Erro", f"Não foi possível importar o componente:\n{e}")
+            return
+        self.addComponent(definition)
+
     def showAbout(self):
         QMessageBox.information(self, "Sobre",
             "Simulador de Portas Lógicas\n"
@@ -260,35 +895,83 @@ class LogicSimulator(QMainWindow):
         )
 
     def saveProject(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Guardar Projeto", "", "JSON (*.json)")
+        path, _ = QFileDialog.getSaveFileName(self, "Guardar Projeto", "",
+            "JSON (*.json);;Binário (*.lgsb);;BLIF (*.blif);;Verilog (*.v)")
         if not path: return
-        data = []
-        for item in self.scene.items():
-            if isinstance(item, GateItem):
-                data.append({
-                    "type": "gate",
-                    "gate_type": item.gate_type,
-                    "x": item.pos().x(),
-                    "y": item.pos().y(),
-                    "value": item.value
-                })
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        try:
+            save_project(self.scene.syncCircuit(), path)
+        except ValueError as e:   # p. ex. componentes numa netlist
+            QMessageBox.warning(self, "Erro", f"Não foi possível guardar o projeto:\n{e}")
+            return
         QMessageBox.information(self, "Guardado", "Projeto guardado com sucesso.")
 
     def loadProject(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Carregar Projeto", "", "JSON (*.json)")
+        path, _ = QFileDialog.getOpenFileName(self, "Carregar Projeto", "",
+            "Projetos (*.json *.lgsb);;Netlists (*.blif *.v)")
         if not path: return
-        self.scene.clear()
-        with open(path, "r") as f:
-            data = json.load(f)
-        for item in data:
-            if item["type"] == "gate":
-                gate = GateItem(item["gate_type"])
-                gate.setPos(item["x"], item["y"])
-                gate.value = item.get("value", 0)
-                self.scene.addItem(gate)
-        QMessageBox.information(self, "Carregado", "Projeto carregado com sucesso.")
+
+        # Leitura na thread de trabalho (0-50%), depois a cena é
+        # preenchida por lotes no ciclo de eventos (50-100%)
+        self.load_progress = QProgressDialog("A carregar projeto...",
+                                             "Cancelar", 0, 100, self)
+        self.load_progress.setWindowModality(Qt.WindowModal)
+        self.load_progress.canceled.connect(self.cancelLoad)
+        self.populating = None
+        # Um QTimer persistente não dispara de novo dentro de si próprio,
+        # mesmo quando o diálogo modal processa eventos em setValue()
+        self.populate_timer = QTimer(self)
+        self.populate_timer.timeout.connect(self.populateStep)
+
+        self.loader = ProjectLoader(path)
+        self.loader_thread = QThread(self)
+        self.loader.moveToThread(self.loader_thread)
+        self.loader_thread.started.connect(self.loader.run)
+        self.loader.progress.connect(self.onLoadProgress)
+        self.loader.loaded.connect(self.onProjectRead)
+        self.loader.failed.connect(self.onLoadFailed)
+        self.loader.loaded.connect(self.loader_thread.quit)
+        self.loader.failed.connect(self.loader_thread.quit)
+        self.loader_thread.start()
+
+    def onLoadProgress(self, fraction):
+        self.load_progress.setValue(int(50 * fraction))
+
+    def onProjectRead(self, circuit):
+        if self.loader.cancel_requested:
+            return
+        for definition in circuit.macros:
+            self.addComponent(definition)
+        self.act_record.setChecked(False)   # a gravação era do circuito anterior
+        self.populating = self.scene.populate(circuit)
+        self.populate_timer.start(0)
+
+    def populateStep(self):
+        """Cria o próximo lote de itens e volta ao ciclo de eventos."""
+        if self.populating is None:
+            return
+        try:
+            fraction = next(self.populating)
+        except StopIteration:
+            self.populating = None
+            self.populate_timer.stop()
+            self.load_progress.reset()
+            QMessageBox.information(self, "Carregado", "Projeto carregado com sucesso.")
+            return
+        self.load_progress.setValue(50 + int(50 * fraction))
+
+    def onLoadFailed(self, message):
+        self.load_progress.reset()
+        if message:
+            QMessageBox.warning(self, "Erro", f"Não foi possível carregar o projeto:\n{message}")
+
+    def cancelLoad(self):
+        """Interrompe a leitura ou o preenchimento da cena."""
+        self.loader.cancel_requested = True
+        if self.populating is not None:
+            self.populate_timer.stop()
+            self.populating.close()
+            self.populating = None
+            self.scene.clear()
 
 # =============================================================
 #  ENTRADA PRINCIPAL
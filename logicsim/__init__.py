@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""Motor de simulação de portas lógicas, utilizável sem Qt."""
+from .core import (
+    GATE_TYPES, BITWISE_GATES, GATE_INPUTS, GATE_NAMES, OPCODES,
+    SOURCE_GATES, X, gate_arity, Circuit, CompiledNetlist,
+    SimulationCancelled, SimulationTimeout, SimulationUnstable,
+)
+from .macros import MacroDefinition, subcircuit
+from .optimize import OptimizeReport, optimize
+from .sequential import SequentialSimulator
+from .project import (
+    LoadCancelled, circuit_from_data, circuit_to_data, load_project,
+    save_project,
+)
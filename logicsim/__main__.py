@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Simulação em linha de comandos: python -m logicsim projeto.json"""
+import argparse
+import sys
+
+from . import profiling
+from .core import X, SimulationUnstable
+from .project import load_project, save_project
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="logicsim",
+        description="Simula um projeto guardado sem abrir a interface.")
+    parser.add_argument("project",
+        help="ficheiro de projeto (.json ou .lgsb) ou netlist (.blif ou .v)")
+    parser.add_argument("--truth-table", action="store_true",
+        help="escreve a tabela de verdade completa")
+    parser.add_argument("--equivalent", metavar="OUTRO",
+        help="verifica se OUTRO implementa a mesma função")
+    parser.add_argument("--stimulus", metavar="FICHEIRO",
+        help="simula cada vetor do ficheiro de estímulos (com --cycles, "
+             "um vetor por ciclo)")
+    parser.add_argument("--faults", action="store_true",
+        help="com --stimulus, escreve a cobertura de falhas stuck-at dos "
+             "vetores e as falhas não detetadas")
+    parser.add_argument("--cycles", type=int, metavar="N",
+        help="simulação sequencial: avança N ciclos de relógio")
+    parser.add_argument("--vcd", metavar="FICHEIRO",
+        help="com --cycles, grava as formas de onda dos INPUTs e OUTPUTs "
+             "em formato VCD")
+    parser.add_argument("--optimize", action="store_true",
+        help="otimiza a netlist antes de simular (o resumo vai para stderr)")
+    parser.add_argument("--export", metavar="FICHEIRO",
+        help="grava o circuito (otimizado, com --optimize) noutro formato "
+             "(.json, .lgsb, .blif ou .v) em vez de simular")
+    parser.add_argument("--jit", action="store_true",
+        help="usa código compilado (guardado em cache) na avaliação e nos "
+             "ciclos")
+    parser.add_argument("--profile", action="store_true",
+        help="escreve em stderr o tempo por fase e as portas mais ativas")
+    parser.add_argument("--jobs", type=int, default=None,
+        help="número de processos (por omissão, um por núcleo)")
+    args = parser.parse_args(argv)
+    if args.vcd and args.cycles is None:
+        parser.error("--vcd precisa de --cycles")
+
+    if args.profile:
+        profiling.enable()
+    try:
+        run(args)
+    except (OSError, ValueError, SimulationUnstable) as e:
+        parser.exit(2, f"logicsim: {e}\n")
+    finally:
+        profiling.disable()
+
+def run(args):
+    circuit = load_project(args.project)
+    # IDs dos INPUTs e OUTPUTs no projeto (a otimização renumera as portas)
+    input_ids, output_ids = circuit.inputs(), circuit.outputs()
+    if args.optimize:
+        from .optimize import optimize
+        circuit, report = optimize(circuit)
+        print(report, file=sys.stderr)
+    if args.export:
+        save_project(circuit, args.export)
+        return
+    try:
+        simulate(circuit, input_ids, output_ids, args)
+    finally:
+        if args.profile:
+            print(profiling.active.report(circuit.gate_types),
+                  file=sys.stderr)
+
+def simulate(circuit, input_ids, output_ids, args):
+    if args.truth_table:
+        from .truthtable import write_truth_table
+        write_truth_table(circuit, sys.stdout)
+        return
+
+    if args.cycles is not None:
+        run_cycles(circuit, input_ids, output_ids, args)
+        return
+
+    if args.faults:
+        if not args.stimulus:
+            raise ValueError("--faults precisa de --stimulus")
+        from .faults import fault_coverage
+        report = fault_coverage(circuit, args.stimulus)
+        report.write(sys.stdout, circuit.gate_types)
+        return
+
+    if args.stimulus:
+        from .parallel import simulate_file
+        simulate_file(circuit, args.stimulus, sys.stdout, args.jobs)
+        return
+
+    if args.equivalent:
+        from .truthtable import check_equivalence
+        mismatch = check_equivalence(circuit, load_project(args.equivalent))
+        if mismatch is None:
+            print("Equivalentes")
+            return
+        bits, out_a, out_b = mismatch
+        print(f"Diferentes para INPUTs {bits}: {out_a} != {out_b}")
+        sys.exit(1)
+
+    if args.jit:
+        from .codegen import JitNetlist, supported
+        compiled = circuit.compile()
+        if supported(compiled):
+            compiled = JitNetlist(compiled)
+        result = compiled.evaluate(circuit.values)
+    else:
+        result = circuit.evaluate()
+    for name, i in zip(output_ids, circuit.outputs()):
+        v = result[i]
+        print(f"OUTPUT {name}: {'X' if v == X else v}")
+
+def run_cycles(circuit, input_ids, output_ids, args):
+    """Simulação por ciclos; com estímulos escreve os OUTPUTs de cada ciclo."""
+    if args.vcd:
+        with open(args.vcd, "w") as f:
+            _run_cycles(circuit, input_ids, output_ids, args, f)
+    else:
+        _run_cycles(circuit, input_ids, output_ids, args, None)
+
+def _run_cycles(circuit, input_ids, output_ids, args, vcd):
+    from .sequential import SequentialSimulator
+    from .stimulus import read_vectors
+    recorder = None
+    if vcd is not None:
+        from .waveform import VCDWriter, WaveformRecorder
+        names = ([f"INPUT_{i}" for i in input_ids]
+                 + [f"OUTPUT_{i}" for i in output_ids])
+        # O ficheiro é escrito à medida que o buffer enche
+        recorder = WaveformRecorder(circuit.inputs() + circuit.outputs(),
+                                    names, sink=VCDWriter(vcd, names))
+    sim = SequentialSimulator(circuit, jit=args.jit, recorder=recorder)
+    if args.stimulus:
+        vectors = read_vectors(args.stimulus)
+        for _, outputs in zip(range(args.cycles), sim.trace(vectors)):
+            print("".join("X" if v == X else str(v) for v in outputs))
+    else:
+        sim.run(args.cycles)
+        for name, v in zip(output_ids, sim.outputs()):
+            print(f"OUTPUT {name}: {'X' if v == X else v}")
+    if recorder is not None:
+        recorder.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Avaliação bit-paralela de muitos vetores de entrada de uma só vez.
+
+Cada INPUT recebe uma palavra empacotada em que o bit k é o valor desse
+INPUT no vetor k. A palavra pode ser um `int` de Python (largura
+arbitrária) ou um array NumPy de uint64. Cada porta é avaliada uma única
+vez por lote com operações bit a bit (`BITWISE_GATES`).
+"""
+from .core import BITWISE_OPS, OP_MACRO, OP_PIN
+
+try:
+    import numpy as np
+except ImportError:   # NumPy é opcional
+    np = None
+
+# =============================================================
+#  EMPACOTAMENTO
+# =============================================================
+
+def pack_vectors(vectors, n_inputs):
+    """Empacota vetores (sequências de 0/1) numa palavra int por INPUT."""
+    words = [0] * n_inputs
+    for k, vector in enumerate(vectors):
+        bit = 1 << k
+        for j in range(n_inputs):
+            if vector[j]:
+                words[j] |= bit
+    return words
+
+def unpack_word(word, count):
+    """Devolve os `count` primeiros bits de uma palavra como lista de 0/1."""
+    if np is not None and isinstance(word, np.ndarray):
+        bits = np.unpackbits(word.view(np.uint8), bitorder="little")
+        return bits[:count].tolist()
+    return [(word >> k) & 1 for k in range(count)]
+
+def pack_array(bits):
+    """Empacota uma matriz (n_vetores, n_inputs) de 0/1 em arrays uint64.
+
+    Devolve uma lista com um array por INPUT (requer NumPy).
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    n_vectors = bits.shape[0]
+    n_words = max(1, (n_vectors + 63) // 64)
+    padded = np.zeros((n_words * 64, bits.shape[1]), dtype=np.uint8)
+    padded[:n_vectors] = bits
+    packed = np.packbits(padded.T, axis=1, bitorder="little")
+    return [np.ascontiguousarray(row).view(np.uint64) for row in packed]
+
+def full_mask(count, like=0):
+    """Máscara com `count` bits a 1, do mesmo tipo que `like`."""
+    if np is not None and isinstance(like, np.ndarray):
+        return np.uint64(0xFFFFFFFFFFFFFFFF)
+    return (1 << count) - 1
+
+# =============================================================
+#  AVALIAÇÃO
+# =============================================================
+
+def evaluate_packed(netlist, input_words, count):
+    """Avalia `count` vetores empacotados numa única passagem.
+
+    `netlist` é um Circuit ou CompiledNetlist; `input_words` tem uma
+    palavra por INPUT, pela ordem de `netlist.inputs`. Devolve um dict
+    {ID do OUTPUT: palavra empacotada}; None se a saída não estiver
+    determinada (entrada desligada ou ciclo).
+    """
+    if hasattr(netlist, "compile"):
+        netlist = netlist.compile()
+    words, _ = packed_words(netlist, input_words, count)
+    return {i: words[i] for i in netlist.outputs}
+
+def packed_words(netlist, input_words, count):
+    """Como `evaluate_packed`, mas devolve (palavras de todas as portas,
+    máscara); a última posição da lista é sempre None."""
+    if len(input_words) != len(netlist.inputs):
+        raise ValueError(f"Esperadas {len(netlist.inputs)} palavras de "
+                         f"entrada, recebidas {len(input_words)}")
+
+    mask = full_mask(count, input_words[0] if input_words else 0)
+    # Uma posição extra a None para as entradas desligadas (fanin -1)
+    words = [None] * (len(netlist) + 1)
+    for i, w in zip(netlist.inputs, input_words):
+        words[i] = w
+
+    opcodes, ptr, fanin = netlist.opcodes, netlist.fanin_ptr, netlist.fanin
+    params, macros = netlist.params, netlist.macros
+    outs = {}   # palavras das saídas de cada instância de componente
+    for i in netlist.eval_order:
+        op = opcodes[i]
+        if op == OP_PIN:
+            out = outs.get(fanin[ptr[i]])
+            words[i] = None if out is None else out[params[i]]
+            continue
+        operands = [words[d] for d in fanin[ptr[i]:ptr[i + 1]]]
+        if any(o is None for o in operands):
+            continue
+        if op == OP_MACRO:
+            outs[i] = macros[params[i]].evaluate_packed(operands, count)
+            words[i] = mask
+        else:
+            words[i] = BITWISE_OPS[op](operands, mask)
+    return words, mask
+
+def evaluate_vectors(netlist, vectors, chunk=4096):
+    """Avalia uma sequência de vetores de entrada, `chunk` de cada vez.
+
+    Produz, para cada vetor, um tuplo com os valores dos OUTPUTs (pela
+    ordem de `netlist.outputs`; None se não determinado).
+    """
+    if hasattr(netlist, "compile"):
+        netlist = netlist.compile()
+    n_inputs = len(netlist.inputs)
+    vectors = iter(vectors)
+    while True:
+        block = [v for _, v in zip(range(chunk), vectors)]
+        if not block:
+            return
+        result = evaluate_packed(netlist, pack_vectors(block, n_inputs),
+                                 len(block))
+        columns = [unpack_word(w, len(block)) if w is not None
+                   else [None] * len(block) for w in result.values()]
+        yield from zip(*columns)
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""Testes de desempenho com circuitos gerados.
+
+    python -m logicsim.benchmark [--suite full] [--gui] [-o resultados.json]
+                                 [--baseline anterior.json]
+
+Para cada circuito (`logicsim.generators`) são medidos: construção,
+compilação, avaliação (interpretada e compilada), débito em lotes,
+gravação e leitura nos dois formatos e memória por porta; com --gui,
+também o preenchimento e a avaliação da cena (plataforma Qt offscreen).
+
+Os resultados são escritos em JSON; com --baseline, cada métrica é
+comparada com a de uma execução anterior e as regressões acima do limite
+dão código de saída 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from . import generators
+from .batch import evaluate_packed
+from .project import FORMAT_VERSION, load_project, save_project
+
+# Circuitos: nome -> função que o gera
+QUICK = {
+    "rca64": lambda: generators.ripple_carry_adder(64),
+    "cla64": lambda: generators.carry_lookahead_adder(64),
+    "mult16": lambda: generators.array_multiplier(16),
+    "dag1k": lambda: generators.random_dag(1_000),
+    "dag10k": lambda: generators.random_dag(10_000),
+    "dag100k": lambda: generators.random_dag(100_000),
+    "chain10k": lambda: generators.chain(10_000),
+}
+FULL = dict(QUICK, **{
+    "mult32": lambda: generators.array_multiplier(32),
+    "dag1m": lambda: generators.random_dag(1_000_000),
+    "chain100k": lambda: generators.chain(100_000),
+})
+SUITES = {"quick": QUICK, "full": FULL}
+
+# Vetores por lote na medição do débito
+BATCH_VECTORS = 4096
+# A cena só é medida até este tamanho (o resto é dominado pelo Qt)
+GUI_MAX_GATES = 20_000
+# Aumento relativo a partir do qual uma métrica conta como regressão
+DEFAULT_THRESHOLD = 0.25
+# Medições mais curtas do que isto (segundos) são ruído e não se comparam
+MIN_COMPARE_TIME = 1e-3
+
+def _best(fn, repeat):
+    """Menor tempo (segundos) de `repeat` execuções de `fn()`."""
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+def _timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t
+
+# =============================================================
+#  MEDIÇÕES
+# =============================================================
+
+def measure(factory, repeat=3, gui=None):
+    """Métricas de um circuito: dict nome -> valor.
+
+    Os tempos (`*_s`) são o melhor de `repeat` execuções, exceto os que
+    só fazem sentido uma vez (construção, primeira compilação).
+    """
+    m = {}
+    circuit, m["build_s"] = _timed(factory)
+    m["gates"] = len(circuit)
+    m["wires"] = len(circuit.wire_src)
+
+    compiled, m["compile_s"] = _timed(circuit.compile)
+    m["depth"] = compiled.depth
+    m["evaluate_s"] = _best(lambda: compiled.evaluate(circuit.values), repeat)
+
+    rng = random.Random(0)
+    words = [rng.getrandbits(BATCH_VECTORS) for _ in compiled.inputs]
+    t = _best(lambda: evaluate_packed(compiled, words, BATCH_VECTORS), repeat)
+    m["batch_vectors_per_s"] = BATCH_VECTORS / t
+
+    m.update(_measure_jit(compiled, circuit.values, repeat))
+    m.update(_measure_files(circuit, repeat))
+    m["bytes_per_gate"] = _memory(factory) / max(len(circuit), 1)
+    if gui is not None and len(circuit) <= GUI_MAX_GATES:
+        m.update(gui.measure(circuit, repeat))
+    return m
+
+def _measure_jit(compiled, values, repeat):
+    from . import codegen
+    if not codegen.supported(compiled):
+        return {}
+    # Cache vazia, para medir também a geração e a compilação
+    saved = os.environ.get("LOGICSIM_CACHE")
+    with tempfile.TemporaryDirectory() as cache:
+        os.environ["LOGICSIM_CACHE"] = cache
+        try:
+            codegen._loaded.clear()
+            jit = codegen.JitNetlist(compiled)
+            _, first = _timed(lambda: jit.evaluate(values))
+            codegen._loaded.clear()
+            _, cached = _timed(lambda: codegen.JitNetlist(compiled).evaluate(values))
+            t = _best(lambda: jit.evaluate(values), repeat)
+        finally:
+            codegen._loaded.clear()
+            if saved is None:
+                del os.environ["LOGICSIM_CACHE"]
+            else:
+                os.environ["LOGICSIM_CACHE"] = saved
+    return {"jit_compile_s": first, "jit_cached_load_s": cached,
+            "jit_evaluate_s": t}
+
+def _measure_files(circuit, repeat):
+    m = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("json", "lgsb"):
+            path = os.path.join(tmp, "bench." + fmt)
+            m[f"save_{fmt}_s"] = _best(lambda: save_project(circuit, path), repeat)
+            m[f"{fmt}_bytes"] = os.path.getsize(path)
+            m[f"load_{fmt}_s"] = _best(lambda: load_project(path), repeat)
+    return m
+
+def _memory(factory):
+    """Bytes alocados por um circuito gerado e a sua netlist compilada."""
+    tracemalloc.start()
+    try:
+        circuit = factory()
+        compiled = circuit.compile()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del circuit, compiled
+    return size
+
+class GuiBenchmark:
+    """Medições da cena do editor, com a plataforma Qt offscreen."""
+    def __init__(self):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        import importlib.util
+        from PySide6.QtWidgets import QApplication
+        self.app = QApplication.instance() or QApplication([])
+        path = os.path.join(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))), "Simulador-Portas-Lógicas-0.py")
+        spec = importlib.util.spec_from_file_location("logicsim_gui", path)
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+
+    def measure(self, circuit, repeat):
+        scene = self.module.LogicScene()
+        m = {"gui_populate_s": _best(lambda: scene.loadCircuit(circuit), repeat)}
+        m["gui_evaluate_s"] = _best(scene.evaluate, repeat)
+        scene.clear()
+        return m
+
+# =============================================================
+#  COMPARAÇÃO
+# =============================================================
+
+def _higher_is_better(metric):
+    return metric.endswith("_per_s")
+
+def _comparable(metric):
+    return metric.endswith(("_s", "_bytes")) or metric == "bytes_per_gate"
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Regressões em relação a `baseline`: (caso, métrica, antes, depois).
+
+    Conta como regressão um tempo ou tamanho que aumente, ou um débito que
+    diminua, mais do que `threshold` (fração). Medições abaixo de
+    MIN_COMPARE_TIME são ignoradas.
+    """
+    regressions = []
+    for case, metrics in results["results"].items():
+        old = baseline.get("results", {}).get(case, {})
+        for metric, new in metrics.items():
+            before = old.get(metric)
+            if before is None or not _comparable(metric) or before <= 0:
+                continue
+            if _higher_is_better(metric):
+                if BATCH_VECTORS / before < MIN_COMPARE_TIME:
+                    continue
+            elif metric.endswith("_s") and before < MIN_COMPARE_TIME:
+                continue
+            ratio = new / before
+            if _higher_is_better(metric):
+                ratio = 1 / ratio if ratio else float("inf")
+            if ratio > 1 + threshold:
+                regressions.append((case, metric, before, new))
+    return regressions
+
+# =============================================================
+#  LINHA DE COMANDOS
+# =============================================================
+
+def run(cases, repeat=3, gui=False, label=None, log=sys.stderr):
+    """Executa os `cases` (nome -> função) e devolve os resultados."""
+    gui_bench = GuiBenchmark() if gui else None
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    results = {
+        "meta": {
+            "label": label,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": numpy_version,
+            "format_version": FORMAT_VERSION,
+            "repeat": repeat,
+        },
+        "results": {},
+    }
+    for name, factory in cases.items():
+        if log is not None:
+            print(f"{name}...", file=log, flush=True)
+        results["results"][name] = measure(factory, repeat, gui_bench)
+    return results
+
+def format_table(results):
+    """Tabela de texto com as principais métricas de cada caso."""
+    columns = ("gates", "depth", "evaluate_s", "jit_evaluate_s",
+               "batch_vectors_per_s", "load_lgsb_s", "bytes_per_gate")
+    lines = ["caso".ljust(10) + "".join(c.rjust(20) for c in columns)]
+    for name, m in results["results"].items():
+        cells = []
+        for c in columns:
+            v = m.get(c)
+            cells.append("-" if v is None else f"{v:.4g}" if isinstance(v, float) else str(v))
+        lines.append(name.ljust(10) + "".join(cell.rjust(20) for cell in cells))
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m logicsim.benchmark",
+        description="Mede o desempenho com circuitos gerados.")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--cases", metavar="NOMES",
+        help="só os casos indicados, separados por vírgulas")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="execuções por medição (conta a melhor)")
+    parser.add_argument("--gui", action="store_true",
+        help="mede também a cena do editor (Qt offscreen)")
+    parser.add_argument("--label", help="identificação desta execução "
+                        "(p. ex. a versão)")
+    parser.add_argument("-o", "--output", metavar="FICHEIRO",
+        help="escreve os resultados em JSON")
+    parser.add_argument("--baseline", metavar="FICHEIRO",
+        help="compara com os resultados JSON de uma execução anterior")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="aumento relativo que conta como regressão (por omissão "
+             f"{DEFAULT_THRESHOLD})")
+    args = parser.parse_args(argv)
+
+    cases = SUITES[args.suite]
+    if args.cases:
+        names = args.cases.split(",")
+        unknown = [n for n in names if n not in FULL]
+        if unknown:
+            parser.error(f"casos desconhecidos: {', '.join(unknown)}")
+        cases = {n: FULL[n] for n in names}
+
+    results = run(cases, args.repeat, args.gui, args.label)
+    print(format_table(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for case, metric, before, after in regressions:
+            print(f"REGRESSÃO {case} {metric}: {before:.4g} -> {after:.4g}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
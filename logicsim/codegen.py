@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""Compilação de netlists para código Python em linha reta.
+
+Cada porta passa a ser uma atribuição a uma variável local com uma
+expressão bit a bit (`v5 = v1 & v3`), sem ciclos, listas nem chamadas
+por porta. São geradas três funções, conforme o uso:
+
+* `evaluate`: avaliação de um vetor (valores 0/1 por porta);
+* `evaluate_packed`: avaliação bit-paralela (palavras int ou arrays
+  NumPy, como em `logicsim.batch`);
+* `run_cycles`: ciclos de relógio no caminho rápido da simulação
+  sequencial.
+
+O código compilado é guardado em disco (marshal), numa chave que é o
+hash estrutural da netlist: voltar a abrir ou a simular um projeto que
+não mudou não volta a gerar nem a compilar nada. A pasta é
+$LOGICSIM_CACHE ou ~/.cache/logicsim.
+
+As expressões bit a bit só são válidas com fontes a 0/1; os X que se
+conhecem na compilação (entradas desligadas) são constantes. Se alguma
+fonte for X na altura da chamada, é usada a avaliação interpretada.
+Circuitos com componentes ou acima de JIT_MAX_GATES portas não são
+compilados.
+"""
+import hashlib
+import importlib.util
+import marshal
+import os
+import tempfile
+
+from .core import IS_SOURCE, OPCODES, X
+
+# Versão do gerador; muda a chave da cache quando o código gerado muda
+CODEGEN_VERSION = 2
+# Acima deste número de portas a compilação custa mais do que poupa
+JIT_MAX_GATES = 200_000
+
+_EXPRESSIONS = {
+    "AND": "{a} & {b}", "OR": "{a} | {b}", "XOR": "{a} ^ {b}",
+    "NAND": "({a} & {b}) ^ {m}", "NOR": "({a} | {b}) ^ {m}",
+    "NOT": "{a} ^ {m}", "OUTPUT": "{a}",
+    "CONST0": "{m} ^ {m}", "CONST1": "{m}",
+}
+_EXPRESSIONS = {OPCODES[name]: e for name, e in _EXPRESSIONS.items()}
+
+# Funções já carregadas neste processo, pela chave da cache
+_loaded = {}
+
+def cache_dir():
+    return os.environ.get("LOGICSIM_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".cache", "logicsim")
+
+def structural_hash(netlist):
+    """Hash (hex) da estrutura da netlist: tipos das portas e ligações."""
+    h = hashlib.sha256()
+    h.update(netlist.opcodes)
+    h.update(netlist.fanin_ptr.tobytes())
+    h.update(netlist.fanin.tobytes())
+    h.update(netlist.params.tobytes())
+    return h.hexdigest()
+
+def supported(netlist):
+    """Se a netlist pode ser compilada."""
+    return not netlist.macros and len(netlist) <= JIT_MAX_GATES
+
+# =============================================================
+#  GERAÇÃO
+# =============================================================
+
+class _Generator:
+    """Expressões das portas de uma netlist, com os X conhecidos à partida."""
+    def __init__(self, netlist, mask):
+        self.netlist = netlist
+        self.mask = mask
+        n = len(netlist)
+        # Nome (ou constante) do valor de cada porta; X estático = None
+        self.names = [None] * (n + 1)
+
+    def operands(self, i):
+        nl = self.netlist
+        return [self.names[d] for d in nl.fanin[nl.fanin_ptr[i]:nl.fanin_ptr[i + 1]]]
+
+    def gates(self):
+        """Linhas das portas combinacionais, por ordem de nível."""
+        lines = []
+        names = self.names
+        for i in self.netlist.eval_order:
+            ops = self.operands(i)
+            if any(o is None for o in ops):
+                continue
+            names[i] = f"v{i}"
+            a = ops[0] if ops else None
+            b = ops[1] if len(ops) > 1 else None
+            expr = _EXPRESSIONS[self.netlist.opcodes[i]]
+            lines.append(f"v{i} = " + expr.format(a=a, b=b, m=self.mask))
+        return lines
+
+def _buffer(names):
+    """Expressão do buffer de valores (X nas portas não calculadas)."""
+    values = "".join(f"{name or X}, " for name in names[:-1])
+    return f"bytearray(({values}{X},))"
+
+def _scalar_source(netlist):
+    g = _Generator(netlist, "1")
+    lines = ["def evaluate(I):"]
+    for i in netlist.sources:
+        g.names[i] = f"v{i}"
+        lines.append(f"    v{i} = I[{i}]")
+    lines += ["    " + line for line in g.gates()]
+    lines.append(f"    return {_buffer(g.names)}")
+    return "\n".join(lines) + "\n"
+
+def _packed_source(netlist):
+    g = _Generator(netlist, "m")
+    lines = ["def evaluate_packed(W, m):"]
+    for k, i in enumerate(netlist.inputs):
+        g.names[i] = f"v{i}"
+        lines.append(f"    v{i} = W[{k}]")
+    lines += ["    " + line for line in g.gates()]
+    outputs = "".join(f"{g.names[i] or None}, " for i in netlist.outputs)
+    lines.append(f"    return ({outputs})")
+    return "\n".join(lines) + "\n"
+
+def _cycle_source(netlist, dffs, dff_d):
+    g = _Generator(netlist, "1")
+    lines = ["def run_cycles(V, cycles):"]
+    for i in netlist.sources:
+        g.names[i] = f"v{i}"
+        lines.append(f"    v{i} = V[{i}]")
+    body = g.gates()
+    # Os D amostrados vêm da avaliação anterior (já feita em V)
+    for d in set(dff_d):
+        if d >= 0 and not IS_SOURCE[netlist.opcodes[d]]:
+            lines.append(f"    v{d} = V[{d}]")
+    lines.append("    for _ in range(cycles):")
+    if dffs:
+        targets = ", ".join(f"v{i}" for i in dffs)
+        sampled = ", ".join(g.names[d] for d in dff_d)
+        lines.append(f"        {targets}, = {sampled},")
+    lines += ["        " + line for line in body] or ["        pass"]
+    lines.append(f"    return {_buffer(g.names)}")
+    return "\n".join(lines) + "\n"
+
+# =============================================================
+#  CACHE
+# =============================================================
+
+def _cache_path(key):
+    return os.path.join(cache_dir(), key + ".bin")
+
+def _load(netlist, kind, source, extra=b""):
+    """Função `kind` gerada por `source()`, da cache sempre que possível."""
+    h = hashlib.sha256()
+    h.update(importlib.util.MAGIC_NUMBER)
+    h.update(f"{CODEGEN_VERSION}:{kind}:{structural_hash(netlist)}".encode())
+    h.update(extra)
+    key = h.hexdigest()
+    fn = _loaded.get(key)
+    if fn is not None:
+        return fn
+
+    path = _cache_path(key)
+    code = None
+    try:
+        with open(path, "rb") as f:
+            code = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    if code is None:
+        code = compile(source(), f"<logicsim {kind}>", "exec")
+        try:
+            os.makedirs(cache_dir(), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=cache_dir())
+            with os.fdopen(fd, "wb") as f:
+                marshal.dump(code, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass   # sem cache em disco, continua a funcionar
+    namespace = {}
+    exec(code, namespace)
+    _loaded[key] = fn = namespace[kind]
+    return fn
+
+# =============================================================
+#  INTERFACE
+# =============================================================
+
+class JitNetlist:
+    """Versão compilada de uma CompiledNetlist, com a mesma interface.
+
+    As funções são geradas (ou lidas da cache) no primeiro uso.
+    """
+    __slots__ = ("netlist", "_evaluate", "_packed")
+
+    def __init__(self, netlist):
+        if hasattr(netlist, "compile"):
+            netlist = netlist.compile()
+        if not supported(netlist):
+            raise ValueError("Circuito não suportado pela compilação "
+                             "(componentes ou demasiadas portas)")
+        self.netlist = netlist
+        self._evaluate = None
+        self._packed = None
+
+    def __len__(self):
+        return len(self.netlist)
+
+    def __getattr__(self, name):
+        # inputs, outputs, cyclic, ... vêm da netlist
+        return getattr(self.netlist, name)
+
+    def evaluate(self, input_values, **limits):
+        """Como `CompiledNetlist.evaluate`."""
+        netlist = self.netlist
+        if (any(v is not None for v in limits.values())
+                or any(input_values[i] > 1 for i in netlist.sources)):
+            return netlist.evaluate(input_values, **limits)
+        if self._evaluate is None:
+            self._evaluate = _load(netlist, "evaluate",
+                                   lambda: _scalar_source(netlist))
+        return self._evaluate(input_values)
+
+    def evaluate_packed(self, input_words, count):
+        """Como `batch.evaluate_packed`."""
+        from .batch import full_mask
+        netlist = self.netlist
+        if len(input_words) != len(netlist.inputs):
+            raise ValueError(f"Esperadas {len(netlist.inputs)} palavras de "
+                             f"entrada, recebidas {len(input_words)}")
+        if self._packed is None:
+            self._packed = _load(netlist, "evaluate_packed",
+                                 lambda: _packed_source(netlist))
+        mask = full_mask(count, input_words[0] if input_words else 0)
+        words = self._packed(input_words, mask)
+        return dict(zip(netlist.outputs, words))
+
+def cycle_function(netlist, dffs, dff_d):
+    """`run_cycles(V, cycles)` para o caminho rápido da simulação sequencial.
+
+    Devolve None se a netlist não puder ser compilada ou se algum D
+    tiver um X conhecido à partida.
+    """
+    if not supported(netlist) or any(d < 0 for d in dff_d):
+        return None
+    g = _Generator(netlist, "1")
+    for i in netlist.sources:
+        g.names[i] = f"v{i}"
+    g.gates()
+    if any(g.names[d] is None for d in dff_d):
+        return None
+    extra = dffs.tobytes() + dff_d.tobytes()
+    return _load(netlist, "run_cycles",
+                 lambda: _cycle_source(netlist, dffs, dff_d), extra)
@@ -0,0 +1,592 @@
+# -*- coding: utf-8 -*-
+"""Núcleo de simulação sem Qt: portas, netlist e avaliação."""
+import heapq
+import time
+from array import array
+
+from . import profiling
+
+# =============================================================
+#  FUNÇÕES LÓGICAS
+# =============================================================
+
+def gate_and(inputs): return int(all(inputs))
+def gate_or(inputs): return int(any(inputs))
+def gate_not(inputs): return int(not inputs[0])
+def gate_xor(inputs): return int(inputs[0] != inputs[1])
+def gate_nand(inputs): return int(not all(inputs))
+def gate_nor(inputs): return int(not any(inputs))
+
+GATE_TYPES = {
+    "AND": gate_and,
+    "OR": gate_or,
+    "NOT": gate_not,
+    "XOR": gate_xor,
+    "NAND": gate_nand,
+    "NOR": gate_nor,
+    "INPUT": lambda _: None,   # valor definido pelo utilizador
+    "OUTPUT": lambda x: x[0] if x else 0,
+    # Elementos sequenciais: o valor é o estado guardado, que só muda na
+    # simulação por ciclos (logicsim.sequential)
+    "DFF": lambda _: None,     # entradas D e CLK; guarda D no flanco ascendente
+    "LATCH": lambda _: None,   # entradas D e EN; transparente com EN = 1
+    "CLOCK": lambda _: None,   # relógio, alterna em cada meio ciclo
+    # Constantes: sem entradas, mas avaliadas como as restantes portas
+    "CONST0": lambda _: 0,
+    "CONST1": lambda _: 1,
+}
+
+# Portas cujo valor não é calculado a partir das entradas: na avaliação
+# combinacional são fontes, tal como os INPUTs
+SOURCE_GATES = ("INPUT", "DFF", "LATCH", "CLOCK")
+
+# Versões bit-paralelas: cada operando é uma palavra (int ou array de
+# uint64) com um vetor de entrada por bit; `mask` tem todos os bits úteis
+# a 1 e serve para as negações.
+BITWISE_GATES = {
+    "AND": lambda x, mask: x[0] & x[1],
+    "OR": lambda x, mask: x[0] | x[1],
+    "NOT": lambda x, mask: x[0] ^ mask,
+    "XOR": lambda x, mask: x[0] ^ x[1],
+    "NAND": lambda x, mask: (x[0] & x[1]) ^ mask,
+    "NOR": lambda x, mask: (x[0] | x[1]) ^ mask,
+    "OUTPUT": lambda x, mask: x[0],
+    "CONST0": lambda x, mask: mask ^ mask,
+    "CONST1": lambda x, mask: mask,
+}
+
+# Número de entradas de cada tipo (as restantes portas têm 2). O número
+# de entradas de um MACRO depende do componente instanciado.
+GATE_INPUTS = {"NOT": 1, "INPUT": 0, "OUTPUT": 1, "CLOCK": 0, "CONST0": 0,
+               "CONST1": 0, "MACRO": 0, "PIN": 1}
+
+def gate_arity(gate_type):
+    return GATE_INPUTS.get(gate_type, 2)
+
+# Códigos numéricos (opcodes) dos tipos de porta, pela ordem de GATE_TYPES.
+# Seguem-se os nós dos sub-circuitos: MACRO (uma instância de um
+# componente) e PIN (a saída k dessa instância).
+GATE_NAMES = list(GATE_TYPES) + ["MACRO", "PIN"]
+OPCODES = {name: op for op, name in enumerate(GATE_NAMES)}
+OP_INPUT = OPCODES["INPUT"]
+OP_DFF = OPCODES["DFF"]
+OP_LATCH = OPCODES["LATCH"]
+OP_CLOCK = OPCODES["CLOCK"]
+OP_MACRO = OPCODES["MACRO"]
+OP_PIN = OPCODES["PIN"]
+ARITY = bytes(gate_arity(name) for name in GATE_NAMES)
+BITWISE_OPS = [BITWISE_GATES.get(name) for name in GATE_NAMES]
+IS_SOURCE = bytes(name in SOURCE_GATES for name in GATE_NAMES)
+
+# Valor "não determinado" no buffer de valores (entrada desligada/ciclo)
+X = 2
+
+def _build_lut():
+    """Tabela op*9 + 3*a + b -> valor, com X a propagar-se.
+
+    Nas portas de uma só entrada o valor depende apenas de `a`; nas
+    constantes, de nenhuma.
+    """
+    lut = bytearray([X]) * (9 * len(GATE_NAMES))
+    for op, name in enumerate(GATE_NAMES):
+        arity = ARITY[op]
+        if name not in GATE_TYPES or IS_SOURCE[op]:
+            continue
+        if arity == 0:
+            lut[9 * op:9 * op + 9] = bytes([GATE_TYPES[name]([])]) * 9
+            continue
+        for a in (0, 1):
+            for b in (0, 1):
+                inputs = [a, b][:arity]
+                lut[9 * op + 3 * a + b] = GATE_TYPES[name](inputs)
+            if arity == 1:
+                lut[9 * op + 3 * a + X] = lut[9 * op + 3 * a]
+    return bytes(lut)
+
+GATE_LUT = _build_lut()
+
+# Portas avaliadas entre verificações de progresso/cancelamento
+EVAL_CHUNK = 1 << 16
+# Máximo de passagens de `CompiledNetlist.settle` pelas portas em ciclo
+SETTLE_LIMIT = 1000
+
+class SimulationCancelled(Exception):
+    """A simulação foi interrompida antes de terminar."""
+
+class SimulationTimeout(SimulationCancelled):
+    """A simulação excedeu o tempo limite."""
+
+class SimulationUnstable(Exception):
+    """O circuito não estabilizou dentro do limite de iterações."""
+
+# =============================================================
+#  CIRCUITO (netlist editável)
+# =============================================================
+
+class Circuit:
+    """Portas e fios identificados por IDs inteiros estáveis.
+
+    Guardado em arrays compactos: `opcodes[i]` é o tipo da porta i,
+    `values[i]` o valor definido pelo utilizador (só conta nos INPUTs) e
+    `x[i]`, `y[i]` a posição da porta no editor.
+    Cada instância de um componente (ver `logicsim.macros`) ocupa uma
+    porta MACRO seguida de uma porta PIN por saída; `params[i]` é o índice
+    do componente em `macros` (MACRO) ou o número da saída (PIN).
+    Cada fio liga a saída de uma porta a uma entrada (pino) de outra; se
+    a mesma entrada receber vários fios, conta o último. O resultado da
+    última avaliação fica em `result`.
+    """
+    __slots__ = ("opcodes", "values", "x", "y", "wire_src", "wire_dst",
+                 "wire_pin", "params", "macros", "version", "result",
+                 "_result_version", "_compiled")
+
+    def __init__(self):
+        self.opcodes = array("B")
+        self.values = bytearray()
+        self.x = array("f")
+        self.y = array("f")
+        self.wire_src = array("i")
+        self.wire_dst = array("i")
+        self.wire_pin = array("B")
+        self.params = array("i")
+        self.macros = []
+        self.version = 0
+        self.result = None
+        self._result_version = -1
+        self._compiled = None
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    @property
+    def gate_types(self):
+        return [GATE_NAMES[op] for op in self.opcodes]
+
+    @property
+    def wires(self):
+        return list(zip(self.wire_src, self.wire_dst, self.wire_pin))
+
+    def add_gate(self, gate_type, value=0, x=0.0, y=0.0):
+        """Acrescenta uma porta e devolve o seu ID."""
+        if gate_type not in GATE_TYPES:
+            raise ValueError(f"Tipo de porta desconhecido: {gate_type}")
+        return self._append(OPCODES[gate_type], value, x, y, 0)
+
+    def add_macro(self, definition, x=0.0, y=0.0):
+        """Instancia um componente; devolve os IDs do MACRO e das saídas.
+
+        A definição é partilhada por todas as instâncias (só é compilada
+        uma vez); cada instância tem apenas os seus próprios valores.
+        """
+        for index, known in enumerate(self.macros):
+            if known is definition:
+                break
+        else:
+            index = len(self.macros)
+            self.macros.append(definition)
+        macro = self._append(OP_MACRO, 0, x, y, index)
+        pins = [self._append(OP_PIN, 0, x, y, k)
+                for k in range(definition.n_outputs)]
+        for pin in pins:
+            self.connect(macro, pin)
+        return [macro] + pins
+
+    def _append(self, op, value, x, y, param):
+        self.opcodes.append(op)
+        self.values.append(value or 0)
+        self.x.append(x)
+        self.y.append(y)
+        self.params.append(param)
+        self.version += 1
+        return len(self.opcodes) - 1
+
+    def arity(self, i):
+        """Número de entradas da porta i."""
+        op = self.opcodes[i]
+        if op == OP_MACRO:
+            return self.macros[self.params[i]].n_inputs
+        return ARITY[op]
+
+    def connect(self, src, dst, pin=0):
+        """Liga a saída da porta `src` à entrada `pin` da porta `dst`."""
+        if not 0 <= pin < self.arity(dst):
+            raise ValueError(f"Porta {dst} não tem entrada {pin}")
+        self.wire_src.append(src)
+        self.wire_dst.append(dst)
+        self.wire_pin.append(pin)
+        self.version += 1
+
+    def inputs(self):
+        """IDs das portas INPUT, por ordem de criação."""
+        return [i for i, op in enumerate(self.opcodes) if op == OP_INPUT]
+
+    def outputs(self):
+        """IDs das portas OUTPUT, por ordem de criação."""
+        out = OPCODES["OUTPUT"]
+        return [i for i, op in enumerate(self.opcodes) if op == out]
+
+    def compile(self):
+        """Devolve a netlist compilada, reconstruindo-a só se necessário."""
+        if self._compiled is None or self._compiled.version != self.version:
+            with profiling.phase("netlist"):
+                self._compiled = CompiledNetlist(self)
+        return self._compiled
+
+    def evaluate(self, **limits):
+        """Avalia o circuito; o resultado fica também em `result`.
+
+        `limits` são passados a `CompiledNetlist.evaluate`.
+        """
+        compiled = self.compile()
+        result = compiled.evaluate(self.values, **limits)
+        self.store_result(compiled, result)
+        return result
+
+    def store_result(self, compiled, result):
+        """Guarda o resultado de `compiled` se a topologia não mudou entretanto."""
+        if compiled.version == self.version:
+            prof = profiling.active
+            if (prof is not None and self.result is not None
+                    and self._result_version == compiled.version):
+                prof.compare(self.result, result)
+            self.result = result
+            self._result_version = compiled.version
+
+    def set_input(self, gate_id, value):
+        """Altera um INPUT e propaga só pelo cone afetado.
+
+        Usa o resultado da última avaliação; se não houver nenhum válido
+        para a topologia atual, faz uma avaliação completa. Devolve os IDs
+        das portas cujo valor mudou.
+        """
+        self.values[gate_id] = value
+        compiled = self.compile()
+        if self.result is None or self._result_version != compiled.version:
+            self.evaluate()
+            return list(range(len(self)))
+        if compiled.macros:
+            # O estado interno das instâncias não é guardado entre
+            # avaliações, por isso reavalia-se tudo
+            old = self.result
+            new = self.evaluate()
+            return [i for i in range(len(self)) if old[i] != new[i]]
+        return compiled.propagate(self.result, self.values, [gate_id])
+
+# =============================================================
+#  NETLIST COMPILADA
+# =============================================================
+
+class CompiledNetlist:
+    """Netlist em arrays planos, com as portas ordenadas por níveis.
+
+    As entradas estão em formato CSR: as da porta i são
+    `fanin[fanin_ptr[i]:fanin_ptr[i + 1]]`, cada uma com o ID da porta
+    que a alimenta ou -1 se não estiver ligada. O fan-out usa o mesmo
+    formato. `order` tem as portas por nível topológico (o nível d vai de
+    `level_ptr[d]` a `level_ptr[d + 1]`). As portas que pertencem a um
+    ciclo combinacional (ou a jusante de um) ficam em `cyclic` e não são
+    avaliadas numa passagem; ver `settle`. Os elementos sequenciais
+    (SOURCE_GATES) são fontes: as suas entradas não contam para os níveis
+    nem para o fan-out, e estão em `registers`.
+
+    Os valores vivem num bytearray com n + 1 posições (0, 1 ou X); a
+    última é sempre X, para que `values[-1]` dê o valor de uma entrada
+    desligada sem testes adicionais. Pela mesma razão `fanin` tem mais
+    uma posição, a -1, lida (e ignorada) pelas constantes quando são as
+    últimas portas.
+
+    As instâncias de componentes partilham a definição (`macros`); o
+    resultado de cada MACRO (as saídas empacotadas num inteiro, ou -1 se
+    alguma for X) só existe durante a avaliação e é lido pelos PIN.
+    """
+    __slots__ = ("version", "opcodes", "fanin_ptr", "fanin", "fanout_ptr",
+                 "fanout", "order", "eval_order", "level_ptr", "level_of",
+                 "cyclic", "inputs", "outputs", "registers", "sources",
+                 "params", "macros")
+
+    def __init__(self, circuit):
+        self.version = circuit.version
+        self.opcodes = opcodes = bytes(circuit.opcodes)
+        self.params = array("i", circuit.params)
+        self.macros = list(circuit.macros)
+        n = len(opcodes)
+
+        self.fanin_ptr = ptr = array("i", [0]) * (n + 1)
+        for i, op in enumerate(opcodes):
+            ptr[i + 1] = ptr[i] + ARITY[op]
+        if self.macros:
+            for i, op in enumerate(opcodes):
+                ptr[i + 1] = ptr[i] + circuit.arity(i)
+        self.fanin = fanin = array("i", [-1]) * (ptr[n] + 1)
+        for src, dst, pin in zip(circuit.wire_src, circuit.wire_dst,
+                                 circuit.wire_pin):
+            fanin[ptr[dst] + pin] = src
+
+        self._levelize()
+        self.inputs = array("i", (i for i, op in enumerate(opcodes)
+                                  if op == OP_INPUT))
+        out = OPCODES["OUTPUT"]
+        self.outputs = array("i", (i for i, op in enumerate(opcodes)
+                                   if op == out))
+        self.registers = array("i", (i for i, op in enumerate(opcodes)
+                                     if op == OP_DFF or op == OP_LATCH))
+        self.sources = array("i", (i for i, op in enumerate(opcodes)
+                                   if IS_SOURCE[op]))
+        self.eval_order = array("i", (i for i in self.order
+                                      if not IS_SOURCE[opcodes[i]]))
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    @property
+    def types(self):
+        return [GATE_NAMES[op] for op in self.opcodes]
+
+    @property
+    def depth(self):
+        return len(self.level_ptr) - 1
+
+    def drivers(self, i):
+        """IDs das portas ligadas às entradas da porta i (-1 = desligada)."""
+        return self.fanin[self.fanin_ptr[i]:self.fanin_ptr[i + 1]]
+
+    def successors(self, i):
+        """IDs das portas alimentadas pela saída da porta i."""
+        return self.fanout[self.fanout_ptr[i]:self.fanout_ptr[i + 1]]
+
+    def _levelize(self):
+        """Fan-out em CSR e ordenação topológica (Kahn) por níveis."""
+        n = len(self.opcodes)
+        opcodes, ptr, fanin = self.opcodes, self.fanin_ptr, self.fanin
+
+        # Fan-out em CSR por contagem; cada par (origem, destino) conta
+        # uma só vez. As entradas das fontes não criam dependências.
+        self.fanout_ptr = out_ptr = array("i", [0]) * (n + 1)
+        pending = array("i", [0]) * n
+        for i in range(n):
+            if IS_SOURCE[opcodes[i]]:
+                continue
+            prev = -1
+            for k in range(ptr[i], ptr[i + 1]):
+                d = fanin[k]
+                if d >= 0 and d != prev:
+                    out_ptr[d + 1] += 1
+                    pending[i] += 1
+                    prev = d
+        for i in range(n):
+            out_ptr[i + 1] += out_ptr[i]
+
+        self.fanout = fanout = array("i", [0]) * out_ptr[n]
+        fill = out_ptr[:n]
+        for i in range(n):
+            if IS_SOURCE[opcodes[i]]:
+                continue
+            prev = -1
+            for k in range(ptr[i], ptr[i + 1]):
+                d = fanin[k]
+                if d >= 0 and d != prev:
+                    fanout[fill[d]] = i
+                    fill[d] += 1
+                    prev = d
+        del fill
+
+        self.order = order = array("i", (i for i in range(n)
+                                         if pending[i] == 0))
+        self.level_ptr = level_ptr = array("i", [0])
+        self.level_of = level_of = array("i", [-1]) * n
+        start = 0
+        while start < len(order):
+            end = len(order)
+            depth = len(level_ptr) - 1
+            for k in range(start, end):
+                i = order[k]
+                level_of[i] = depth
+                for m in range(out_ptr[i], out_ptr[i + 1]):
+                    j = fanout[m]
+                    pending[j] -= 1
+                    if pending[j] == 0:
+                        order.append(j)
+            level_ptr.append(end)
+            start = end
+
+        self.cyclic = array("i", (i for i in range(n) if pending[i] > 0))
+
+    def new_values(self, input_values):
+        """Buffer de valores a X, com as fontes copiadas de `input_values`.
+
+        As fontes são os INPUTs e os elementos sequenciais (o seu estado).
+        """
+        values = bytearray([X]) * (len(self.opcodes) + 1)
+        for i in self.sources:
+            values[i] = input_values[i]
+        return values
+
+    def evaluate(self, input_values, progress=None, cancelled=None,
+                 time_limit=None):
+        """Avalia o circuito numa única passagem.
+
+        `input_values[i]` é o valor da porta i se for INPUT ou o estado
+        de um elemento sequencial (ignorado nas restantes). Devolve o
+        buffer de valores (0, 1 ou X por porta).
+
+        Se for indicado algum de `progress(fração)`, `cancelled()` ou
+        `time_limit` (segundos), a avaliação é feita em blocos de
+        EVAL_CHUNK portas, com as verificações entre blocos; é lançada
+        SimulationCancelled ou SimulationTimeout conforme o caso.
+        """
+        prof = profiling.active
+        if prof is None:
+            return self._evaluate_pass(input_values, progress, cancelled,
+                                       time_limit)
+        prof.count("evaluate_passes")
+        with prof.phase("evaluate"):
+            values = self._evaluate_pass(input_values, progress, cancelled,
+                                         time_limit)
+        prof.add_evaluations(self.eval_order)
+        return values
+
+    def _evaluate_pass(self, input_values, progress, cancelled, time_limit):
+        values = self.new_values(input_values)
+        order = self.eval_order
+        if self.macros:
+            evaluate_gates = self._evaluate_hierarchy
+            outs = {}
+        else:
+            evaluate_gates = self._evaluate_gates
+            outs = None
+        if progress is None and cancelled is None and time_limit is None:
+            evaluate_gates(values, order, outs)
+            return values
+
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        for start in range(0, len(order), EVAL_CHUNK):
+            if cancelled is not None and cancelled():
+                raise SimulationCancelled()
+            if deadline is not None and time.monotonic() > deadline:
+                raise SimulationTimeout()
+            evaluate_gates(values, order[start:start + EVAL_CHUNK], outs)
+            if progress is not None:
+                progress(min(start + EVAL_CHUNK, len(order)) / len(order))
+        return values
+
+    def _evaluate_gates(self, values, order, outs=None):
+        opcodes, ptr, fanin, lut = self.opcodes, self.fanin_ptr, self.fanin, GATE_LUT
+        for i in order:
+            p = ptr[i]
+            b = values[fanin[p + 1]] if ptr[i + 1] - p == 2 else X
+            values[i] = lut[9 * opcodes[i] + 3 * values[fanin[p]] + b]
+
+    def _evaluate_hierarchy(self, values, order, outs):
+        """Como `_evaluate_gates`, mas com instâncias de componentes.
+
+        `outs` guarda as saídas de cada MACRO já avaliado.
+        """
+        opcodes, ptr, fanin, lut = self.opcodes, self.fanin_ptr, self.fanin, GATE_LUT
+        params, macros = self.params, self.macros
+        for i in order:
+            op = opcodes[i]
+            p = ptr[i]
+            if op < OP_MACRO:
+                b = values[fanin[p + 1]] if ptr[i + 1] - p == 2 else X
+                values[i] = lut[9 * op + 3 * values[fanin[p]] + b]
+            elif op == OP_MACRO:
+                index = 0
+                for k in range(p, ptr[i + 1]):
+                    v = values[fanin[k]]
+                    if v == X:
+                        out = -1
+                        break
+                    index |= v << (k - p)
+                else:
+                    out = macros[params[i]].evaluate_index(index)
+                outs[i] = out
+                values[i] = X if out < 0 else 0
+            else:
+                out = outs.get(fanin[p], -1)
+                values[i] = X if out < 0 else (out >> params[i]) & 1
+
+    def settle(self, values, limit=SETTLE_LIMIT):
+        """Avalia as portas de `cyclic` em passagens até estabilizarem.
+
+        Atualiza `values` no lugar e devolve os IDs das portas alteradas.
+        Se ao fim de `limit` passagens ainda houver mudanças o circuito
+        oscila, e é lançada SimulationUnstable.
+        """
+        cyclic = self.cyclic
+        opcodes, ptr, fanin, lut = self.opcodes, self.fanin_ptr, self.fanin, GATE_LUT
+        changed = set()
+        passes = 0
+        try:
+            with profiling.phase("settle"):
+                while passes < limit:
+                    passes += 1
+                    moved = False
+                    for i in cyclic:
+                        p = ptr[i]
+                        b = values[fanin[p + 1]] if ptr[i + 1] - p == 2 else X
+                        v = lut[9 * opcodes[i] + 3 * values[fanin[p]] + b]
+                        if v != values[i]:
+                            values[i] = v
+                            changed.add(i)
+                            moved = True
+                    if not moved:
+                        return sorted(changed)
+            raise SimulationUnstable(f"O circuito não estabilizou em {limit} "
+                                     "passagens (oscilação)")
+        finally:
+            prof = profiling.active
+            if prof is not None:
+                prof.count("settle_passes", passes)
+                prof.add_evaluations(cyclic, passes)
+                prof.add_changes(changed)
+
+    def propagate(self, values, input_values, sources):
+        """Propagação orientada a eventos a partir das portas `sources`.
+
+        Atualiza `values` (resultado de uma avaliação anterior) no lugar.
+        As portas são reavaliadas por ordem de nível e só as que estão no
+        fan-out de uma porta que mudou são agendadas; a propagação pára
+        onde o valor se mantém. Devolve os IDs das portas alteradas.
+        """
+        prof = profiling.active
+        if prof is not None:
+            with prof.phase("propagate"):
+                changed, evaluated = self._propagate(values, input_values,
+                                                     sources, [])
+            prof.count("propagations")
+            prof.add_evaluations(evaluated)
+            prof.add_changes(changed)
+            return changed
+        return self._propagate(values, input_values, sources, None)[0]
+
+    def _propagate(self, values, input_values, sources, evaluated):
+        """Corpo de `propagate`; acrescenta a `evaluated` (se não for None)
+        as portas avaliadas. Devolve (alteradas, evaluated)."""
+        opcodes, ptr, fanin, lut = self.opcodes, self.fanin_ptr, self.fanin, GATE_LUT
+        out_ptr, fanout, level_of = self.fanout_ptr, self.fanout, self.level_of
+
+        heap = [(level_of[i], i) for i in set(sources) if level_of[i] >= 0]
+        heapq.heapify(heap)
+        queued = {i for _, i in heap}
+        changed = []
+        while heap:
+            _, i = heapq.heappop(heap)
+            queued.discard(i)
+            if evaluated is not None:
+                evaluated.append(i)
+            if IS_SOURCE[opcodes[i]]:
+                new_val = input_values[i]
+            else:
+                p = ptr[i]
+                b = values[fanin[p + 1]] if ptr[i + 1] - p == 2 else X
+                new_val = lut[9 * opcodes[i] + 3 * values[fanin[p]] + b]
+            if new_val == values[i]:
+                continue
+            values[i] = new_val
+            changed.append(i)
+            for m in range(out_ptr[i], out_ptr[i + 1]):
+                j = fanout[m]
+                if j not in queued and level_of[j] >= 0:
+                    queued.add(j)
+                    heapq.heappush(heap, (level_of[j], j))
+        return changed, evaluated
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""Simulação de falhas stuck-at com vetores em paralelo.
+
+Uma falha é um tuplo (porta, pino, valor): o pino -1 é a saída da porta,
+os restantes são as suas entradas (as âncoras do editor), e o valor (0 ou
+1) é aquele a que o ponto fica preso. Há duas falhas por âncora ligada;
+os OUTPUT só têm entradas.
+
+Os vetores são simulados em lotes de BLOCK_VECTORS, empacotados num int
+por porta (bit k = vetor k). Por lote, a máquina sem falhas é avaliada
+uma vez. O efeito de cada falha ainda não detetada é levado, pelo caminho
+único dentro da sua região sem fan-out, até ao tronco da região; daí é
+reavaliado só o cone a jusante, por nível, uma vez por tronco para todas
+as falhas da região, e só enquanto diverge nos vetores que ainda
+interessam (os anteriores à primeira deteção de cada falha). Uma falha é
+detetada (e deixa de ser simulada) quando algum OUTPUT difere, num vetor
+em que o valor correto é conhecido. As falhas em portas sem caminho até
+um OUTPUT nunca são simuladas.
+
+As falhas numa entrada alimentada por uma porta sem mais nenhum destino
+são equivalentes à mesma falha na saída dessa porta: só uma é simulada,
+e o resultado vale para as duas.
+"""
+import heapq
+
+from .batch import packed_words
+from .core import BITWISE_OPS, IS_SOURCE, OP_INPUT, OPCODES
+from .stimulus import pack_lines, read_vectors
+
+OP_OUTPUT = OPCODES["OUTPUT"]
+
+# Vetores por lote
+BLOCK_VECTORS = 4096
+# Vetores do início do lote simulados primeiro, em separado
+FIRST_VECTORS = (1 << 64) - 1
+
+def _compiled(netlist):
+    return netlist.compile() if hasattr(netlist, "compile") else netlist
+
+def fault_list(netlist):
+    """Todas as falhas stuck-at do circuito, por ordem de porta e pino."""
+    nl = _compiled(netlist)
+    faults = []
+    for g in range(len(nl)):
+        if nl.opcodes[g] != OP_OUTPUT:
+            faults += [(g, -1, 0), (g, -1, 1)]
+        for pin, d in enumerate(nl.fanin[nl.fanin_ptr[g]:nl.fanin_ptr[g + 1]]):
+            if d >= 0:
+                faults += [(g, pin, 0), (g, pin, 1)]
+    return faults
+
+class FaultReport:
+    """Resultado de uma simulação de falhas.
+
+    `detected` dá, para cada falha detetada, o índice do primeiro vetor
+    que a deteta.
+    """
+    __slots__ = ("faults", "detected", "patterns")
+
+    def __init__(self, faults):
+        self.faults = faults
+        self.detected = {}
+        self.patterns = 0
+
+    @property
+    def coverage(self):
+        return len(self.detected) / len(self.faults) if self.faults else 1.0
+
+    def undetected(self):
+        detected = self.detected
+        return [f for f in self.faults if f not in detected]
+
+    def __str__(self):
+        return (f"Falhas detetadas: {len(self.detected)}/{len(self.faults)} "
+                f"({100 * self.coverage:.2f}%) com {self.patterns} vetores")
+
+    def write(self, f, gate_types=None):
+        """Escreve o resumo e a lista das falhas não detetadas."""
+        f.write(f"{self}\n")
+        for g, pin, value in self.undetected():
+            kind = f" ({gate_types[g]})" if gate_types else ""
+            where = "saída" if pin < 0 else f"entrada {pin}"
+            f.write(f"porta {g}{kind} {where} stuck-at-{value}\n")
+
+class FaultSimulator:
+    """Simulação de um conjunto de falhas ao longo de vários lotes."""
+    __slots__ = ("netlist", "report", "pending", "_equivalent", "_fanins",
+                 "_fanouts", "_next", "_stem")
+
+    def __init__(self, netlist, faults=None):
+        nl = self.netlist = _compiled(netlist)
+        if nl.macros or nl.cyclic or any(
+                IS_SOURCE[op] and op != OP_INPUT for op in nl.opcodes):
+            raise ValueError("A simulação de falhas só suporta circuitos "
+                             "combinacionais, sem ciclos nem componentes")
+        if faults is None:
+            faults = fault_list(nl)
+        self.report = FaultReport(list(faults))
+        n = len(nl)
+        ptr, out_ptr = nl.fanin_ptr, nl.fanout_ptr
+        self._fanins = fanins = [nl.fanin[ptr[g]:ptr[g + 1]] for g in range(n)]
+        # Portas com caminho até algum OUTPUT; as restantes não são
+        # propagadas, e as suas falhas nunca são detetáveis
+        observable = bytearray(n)
+        stack = [g for g in range(n) if nl.opcodes[g] == OP_OUTPUT]
+        while stack:
+            g = stack.pop()
+            if not observable[g]:
+                observable[g] = 1
+                stack.extend(d for d in fanins[g] if d >= 0)
+        self._fanouts = [[k for k in nl.fanout[out_ptr[g]:out_ptr[g + 1]]
+                          if observable[k]] for g in range(n)]
+        # Regiões sem fan-out: uma porta que alimenta uma só entrada
+        # pertence à região do seu destino, cujo tronco (`_stem`) é a
+        # primeira porta com mais de um destino (ou nenhum)
+        uses = [0] * n
+        self._next = [None] * n   # porta de uso único -> (destino, pino)
+        for j in range(n):
+            for pin, d in enumerate(fanins[j]):
+                if d >= 0:
+                    uses[d] += 1
+                    self._next[d] = (j, pin)
+        self._stem = stem = list(range(n))
+        for g in reversed(nl.order):
+            if uses[g] == 1:
+                stem[g] = stem[self._next[g][0]]
+            else:
+                self._next[g] = None
+        # Falha simulada -> falhas que representa
+        self._equivalent = {}
+        for fault in self.report.faults:
+            g, pin, value = fault
+            simulated = fault
+            if pin >= 0:
+                d = fanins[g][pin]
+                if uses[d] == 1:
+                    simulated = (d, -1, value)
+            self._equivalent.setdefault(simulated, []).append(fault)
+        self.pending = [f for f in self._equivalent if observable[f[0]]]
+
+    def simulate(self, input_words, count):
+        """Simula um lote; devolve as falhas detetadas nele."""
+        good, mask = packed_words(self.netlist, input_words, count)
+        # Vetores em que cada falha chega ao tronco da sua região
+        sensitized = {}
+        regions = {}
+        for fault in self.pending:
+            word = self._activation(fault, good, mask)
+            if word:
+                word &= self._path(fault[0], good, mask, sensitized)
+            if word:
+                regions.setdefault(self._stem[fault[0]], []).append((fault, word))
+
+        base = self.report.patterns
+        detected = self.report.detected
+        found = []
+        hit = set()
+        for s, wanted in regions.items():
+            seen = self._observe(s, good, mask, [w for _, w in wanted])
+            for fault, word in wanted:
+                word &= seen
+                if word:
+                    first = base + (word & -word).bit_length() - 1
+                    hit.add(fault)
+                    for f in self._equivalent[fault]:
+                        detected[f] = first
+                        found.append(f)
+        self.pending = [f for f in self.pending if f not in hit]
+        self.report.patterns += count
+        return found
+
+    def _activation(self, fault, good, mask):
+        """Vetores em que a falha altera a saída da sua porta."""
+        g, pin, value = fault
+        if good[g] is None:
+            return 0   # o valor correto não é conhecido
+        stuck = mask if value else 0
+        if pin < 0:
+            return good[g] ^ stuck
+        operands = [good[d] for d in self._fanins[g]]
+        operands[pin] = stuck
+        if None in operands:
+            return 0
+        return BITWISE_OPS[self.netlist.opcodes[g]](operands, mask) ^ good[g]
+
+    def _path(self, g, good, mask, sensitized):
+        """Vetores em que inverter a porta `g` inverte o tronco da região.
+
+        Dentro da região o caminho é único, por isso basta, em cada porta,
+        ver se a inversão de uma entrada passa para a saída; `sensitized`
+        guarda os resultados do lote.
+        """
+        chain = []
+        while g not in sensitized:
+            nxt = self._next[g]
+            if nxt is None:
+                sensitized[g] = mask
+                break
+            chain.append(g)
+            g = nxt[0]
+        word = sensitized[g]
+        opcodes = self.netlist.opcodes
+        for g in reversed(chain):
+            if word:
+                j, pin = self._next[g]
+                operands = [good[d] for d in self._fanins[j]]
+                if None in operands:
+                    word = 0
+                else:
+                    operands[pin] ^= mask
+                    word &= BITWISE_OPS[opcodes[j]](operands, mask) ^ good[j]
+            sensitized[g] = word
+        return word
+
+    def _observe(self, s, good, mask, wanted):
+        """Vetores em que inverter a porta `s` altera algum OUTPUT.
+
+        Cada palavra de `wanted` são os vetores que interessam a uma falha,
+        dos quais só conta o primeiro: só esses vetores são propagados.
+        Primeiro os do início do lote (que detetam a maioria das falhas,
+        com um cone menor), depois os restantes das falhas que faltam.
+        """
+        if good[s] is None:
+            return 0
+        if self.netlist.opcodes[s] == OP_OUTPUT:
+            return mask
+        first = [w & FIRST_VECTORS for w in wanted]
+        seen = self._propagate(s, good, mask, first)
+        rest = [w & ~FIRST_VECTORS for w, f in zip(wanted, first)
+                if not f & seen]
+        return seen | self._propagate(s, good, mask, rest) if rest else seen
+
+    def _propagate(self, s, good, mask, wanted):
+        """Propaga a inversão da porta `s`, por nível, enquanto divergir
+        nalgum vetor que ainda interessa."""
+        care = 0
+        for w in wanted:
+            care |= w
+        if not care:
+            return 0
+        opcodes, level_of = self.netlist.opcodes, self.netlist.level_of
+        fanins, fanouts = self._fanins, self._fanouts
+        seen = 0
+        faulty = {s: good[s] ^ mask}
+        queued = set(fanouts[s])
+        heap = [(level_of[j], j) for j in queued]
+        heapq.heapify(heap)
+        while heap:
+            j = heapq.heappop(heap)[1]
+            operands = [faulty.get(d, good[d]) for d in fanins[j]]
+            if None in operands:
+                continue
+            new = BITWISE_OPS[opcodes[j]](operands, mask)
+            diff = (new ^ good[j]) & care
+            if not diff:
+                continue
+            if opcodes[j] == OP_OUTPUT:
+                # Numa falha, os vetores a seguir ao primeiro detetado
+                # deixam de interessar
+                seen |= diff
+                care = 0
+                for w in wanted:
+                    hit = w & seen
+                    care |= w & ((hit & -hit) - 1) if hit else w
+                if not care:
+                    break
+                continue
+            faulty[j] = new
+            for k in fanouts[j]:
+                if k not in queued:
+                    queued.add(k)
+                    heapq.heappush(heap, (level_of[k], k))
+        return seen
+
+    def run(self, vectors, block=BLOCK_VECTORS):
+        """Simula uma sequência de vetores ('0101'), `block` de cada vez.
+
+        Pára mais cedo se todas as falhas já tiverem sido detetadas.
+        Devolve o FaultReport.
+        """
+        n_inputs = len(self.netlist.inputs)
+        lines = []
+        for bits in vectors:
+            lines.append(bits)
+            if len(lines) == block:
+                self.simulate(pack_lines(lines, n_inputs), len(lines))
+                lines = []
+                if not self.pending:
+                    return self.report
+        if lines:
+            self.simulate(pack_lines(lines, n_inputs), len(lines))
+        return self.report
+
+def fault_coverage(netlist, stimulus_path, faults=None):
+    """FaultReport dos vetores de um ficheiro de estímulos."""
+    return FaultSimulator(netlist, faults).run(read_vectors(stimulus_path))
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""Geração de circuitos-padrão (somadores, multiplicadores, grafos
+aleatórios, cadeias), para testes de desempenho e exemplos.
+
+As portas são colocadas em colunas pela profundidade (uma coluna a seguir
+à do operando mais profundo), por isso os circuitos gerados podem ser
+abertos diretamente no editor.
+"""
+import random
+
+from .core import Circuit
+from .layout import COLUMN_WIDTH, ROW_HEIGHT
+
+class _Layout:
+    """Circuit em construção, com a coluna de cada porta."""
+    def __init__(self):
+        self.circuit = Circuit()
+        self.column = []
+        self.rows = []
+
+    def add(self, gate_type, *drivers):
+        col = 1 + max((self.column[d] for d in drivers), default=-1)
+        if col == len(self.rows):
+            self.rows.append(0)
+        row = self.rows[col]
+        self.rows[col] += 1
+        c = self.circuit
+        g = c.add_gate(gate_type, 0, col * COLUMN_WIDTH, row * ROW_HEIGHT)
+        for pin, d in enumerate(drivers):
+            c.connect(d, g, pin)
+        self.column.append(col)
+        return g
+
+    def inputs(self, n):
+        return [self.add("INPUT") for _ in range(n)]
+
+    def outputs(self, ids):
+        for i in ids:
+            self.add("OUTPUT", i)
+
+    def tree(self, gate_type, ids):
+        """Redução em árvore equilibrada de portas de 2 entradas."""
+        ids = list(ids)
+        while len(ids) > 1:
+            pairs = [self.add(gate_type, a, b) for a, b in zip(ids[::2], ids[1::2])]
+            ids = pairs + ids[len(pairs) * 2:]
+        return ids[0]
+
+def _full_adder(lay, a, b, c):
+    """(soma, transporte) de a + b + c."""
+    p = lay.add("XOR", a, b)
+    s = lay.add("XOR", p, c)
+    carry = lay.add("OR", lay.add("AND", a, b), lay.add("AND", p, c))
+    return s, carry
+
+def ripple_carry_adder(n):
+    """Somador de n bits com propagação de transporte.
+
+    INPUTs: a0..a(n-1), b0..b(n-1), cin; OUTPUTs: s0..s(n-1), cout.
+    """
+    lay = _Layout()
+    a, b = lay.inputs(n), lay.inputs(n)
+    carry = lay.add("INPUT")
+    sums = []
+    for k in range(n):
+        s, carry = _full_adder(lay, a[k], b[k], carry)
+        sums.append(s)
+    lay.outputs(sums + [carry])
+    return lay.circuit
+
+def carry_lookahead_adder(n, block=4):
+    """Somador de n bits com antecipação de transporte em blocos de `block`.
+
+    Mesmos INPUTs e OUTPUTs que `ripple_carry_adder`.
+    """
+    lay = _Layout()
+    a, b = lay.inputs(n), lay.inputs(n)
+    carry = lay.add("INPUT")
+    g = [lay.add("AND", a[k], b[k]) for k in range(n)]
+    p = [lay.add("XOR", a[k], b[k]) for k in range(n)]
+    sums = []
+    for start in range(0, n, block):
+        c0 = carry
+        for k in range(start, min(start + block, n)):
+            sums.append(lay.add("XOR", p[k], carry))
+            # c(k+1) = g(k) | p(k)g(k-1) | ... | p(k)..p(start)c0
+            terms = [g[k]]
+            for j in range(k - 1, start - 1, -1):
+                terms.append(lay.tree("AND", p[j + 1:k + 1] + [g[j]]))
+            terms.append(lay.tree("AND", p[start:k + 1] + [c0]))
+            carry = lay.tree("OR", terms)
+    lay.outputs(sums + [carry])
+    return lay.circuit
+
+def array_multiplier(n):
+    """Multiplicador n x n: produtos parciais somados linha a linha.
+
+    INPUTs: a0..a(n-1), b0..b(n-1); OUTPUTs: p0..p(2n-1).
+    """
+    lay = _Layout()
+    a, b = lay.inputs(n), lay.inputs(n)
+    # Linha 0: a & b0; o acumulador tem os bits ainda não fixados
+    acc = [lay.add("AND", a[k], b[0]) for k in range(n)]
+    product = [acc.pop(0)]
+    for j in range(1, n):
+        row = [lay.add("AND", a[k], b[j]) for k in range(n)]
+        carry = None
+        new = []
+        for k in range(n):
+            x = acc[k] if k < len(acc) else None
+            if x is None and carry is None:
+                new.append(row[k])
+            elif x is None or carry is None:
+                other = x if carry is None else carry
+                new.append(lay.add("XOR", row[k], other))
+                carry = lay.add("AND", row[k], other)
+            else:
+                s, carry = _full_adder(lay, row[k], x, carry)
+                new.append(s)
+        if carry is not None:
+            new.append(carry)
+        product.append(new.pop(0))
+        acc = new
+    product += acc
+    while len(product) < 2 * n:
+        product.append(lay.add("XOR", a[0], a[0]))   # 0 (só com n = 1)
+    lay.outputs(product)
+    return lay.circuit
+
+def random_dag(n_gates, n_inputs=64, n_outputs=64, seed=0, window=None):
+    """Grafo acíclico aleatório de portas lógicas.
+
+    Cada porta liga-se a portas anteriores (entre as últimas `window`, se
+    indicado, para circuitos mais profundos); as últimas `n_outputs`
+    portas alimentam OUTPUTs.
+    """
+    rng = random.Random(seed)
+    lay = _Layout()
+    ids = lay.inputs(n_inputs)
+    for i in ids:
+        lay.circuit.values[i] = rng.randint(0, 1)
+    kinds = ("AND", "OR", "XOR", "NAND", "NOR", "NOT")
+    for _ in range(n_gates):
+        lo = 0 if window is None else max(0, len(ids) - window)
+        kind = rng.choice(kinds)
+        a = ids[rng.randrange(lo, len(ids))]
+        if kind == "NOT":
+            ids.append(lay.add(kind, a))
+        else:
+            ids.append(lay.add(kind, a, ids[rng.randrange(lo, len(ids))]))
+    lay.outputs(ids[-n_outputs:])
+    return lay.circuit
+
+def chain(depth):
+    """Cadeia de `depth` portas NOT entre um INPUT e um OUTPUT.
+
+    As portas ficam numa grelha em vez de uma única linha.
+    """
+    c = Circuit()
+    cols = max(1, int(depth ** 0.5))
+    prev = c.add_gate("INPUT")
+    for k in range(depth):
+        g = c.add_gate("NOT", 0, (1 + k % cols) * COLUMN_WIDTH,
+                       (k // cols) * ROW_HEIGHT)
+        c.connect(prev, g)
+        prev = g
+    o = c.add_gate("OUTPUT", 0, (cols + 1) * COLUMN_WIDTH, 0.0)
+    c.connect(prev, o)
+    return c
@@ -0,0 +1,833 @@
+# -*- coding: utf-8 -*-
+"""Importação e exportação de netlists ao nível das portas.
+
+Formatos:
+
+* BLIF (`.blif`): `.model`, `.inputs`, `.outputs`, `.clock`, `.names`
+  (coberturas de uma saída) e `.latch`; só o primeiro modelo é lido;
+* Verilog estrutural (`.v`): um módulo com declarações `input`, `output`,
+  `wire` e `reg` (escalares ou vetores), primitivas (`and`, `or`, `nand`,
+  `nor`, `xor`, `xnor`, `not`, `buf`), `assign` com expressões de uma
+  operação (`a`, `~a`, `a & b`, `~(a | b)`, ...), registos
+  `always @(posedge clk) q <= d;` e valores iniciais `initial q = 1'b1;`.
+
+A leitura é feita linha a linha e as portas e fios vão diretamente para
+colunas (`array`), montadas no fim com `project.circuit_from_columns`: a
+memória usada é a do circuito mais o dicionário dos nomes dos sinais,
+nunca o ficheiro inteiro. As ligações a sinais ainda não definidos ficam
+pendentes até ao fim do ficheiro; um sinal que nunca é definido deixa as
+entradas que alimenta desligadas (X).
+
+As coberturas BLIF e as primitivas com mais de duas entradas são
+decompostas nas portas de GATE_TYPES, em árvores equilibradas de portas
+de 2 entradas. As portas importadas ficam todas na origem: a interface
+chama `layout.layered_layout` ao abrir o ficheiro, o modo sem interface
+não precisa de posições.
+
+Um INPUT usado como relógio de um registo é importado como CLOCK; é
+assim que os CLOCK voltam do Verilog, que não tem relógios e onde são
+exportados como `input`. Na exportação, o sinal da porta i chama-se
+`n<i>` e o de um OUTPUT `o<i>`; um circuito com LATCH só pode ser
+exportado em BLIF.
+"""
+import os
+import re
+from array import array
+
+from .core import GATE_NAMES, OP_MACRO, OPCODES
+from .project import LoadCancelled, circuit_from_columns
+
+# Linhas lidas entre chamadas de `progress`/`cancelled`
+_TICK_LINES = 4096
+
+_INVERTED = {"AND": "NAND", "OR": "NOR"}
+
+# =============================================================
+#  CONSTRUÇÃO
+# =============================================================
+
+class _Builder:
+    """Circuito em construção, com os sinais por nome.
+
+    Cada sinal tem um índice; `driver[s]` é a porta que o define (-1 se
+    ainda nenhuma) e `alias[s]` o sinal de que é cópia (-1 se nenhum). Os
+    fios guardam o índice do sinal de origem, resolvido em `circuit()`.
+    """
+    def __init__(self):
+        self.opcodes = array("B")
+        self.values = bytearray()
+        self.src = array("i")
+        self.dst = array("i")
+        self.pin = array("B")
+        self.index = {}
+        self.names = []
+        self.driver = array("i")
+        self.alias = array("i")
+        self.outputs = []      # sinais ligados a OUTPUTs, por ordem
+        self.clocked = set()   # sinais usados como relógio de registos
+        self.initial = {}      # sinal -> valor inicial do registo
+        self._negated = {}
+        self._constants = {}
+        self._clock = None
+
+    def net(self, name):
+        """Índice do sinal `name`, criado se ainda não existir."""
+        s = self.index.get(name)
+        if s is None:
+            s = self.index[name] = self._new(name)
+        return s
+
+    def _new(self, name=None):
+        self.names.append(name)
+        self.driver.append(-1)
+        self.alias.append(-1)
+        return len(self.driver) - 1
+
+    def _define(self, s, gate):
+        if self.driver[s] >= 0 or self.alias[s] >= 0:
+            raise ValueError(f"sinal com mais de uma origem: {self.names[s]}")
+        self.driver[s] = gate
+
+    def gate(self, gate_type, inputs, out=None, value=0):
+        """Acrescenta uma porta; devolve o sinal da sua saída.
+
+        Nas `inputs`, None deixa a entrada desligada.
+        """
+        g = len(self.opcodes)
+        self.opcodes.append(OPCODES[gate_type])
+        self.values.append(value)
+        for pin, s in enumerate(inputs):
+            if s is not None:
+                self.src.append(s)
+                self.dst.append(g)
+                self.pin.append(pin)
+        if out is None:
+            out = self._new()
+        self._define(out, g)
+        return out
+
+    def assign(self, s, source):
+        """O sinal `s` passa a ser uma cópia de `source`."""
+        if source is None:
+            return
+        if self.driver[s] >= 0 or self.alias[s] >= 0:
+            raise ValueError(f"sinal com mais de uma origem: {self.names[s]}")
+        self.alias[s] = source
+
+    def negate(self, s):
+        """Sinal com a negação de `s` (uma só porta NOT por sinal)."""
+        if s is None:
+            return self.gate("NOT", [None])
+        out = self._negated.get(s)
+        if out is None:
+            out = self._negated[s] = self.gate("NOT", [s])
+        return out
+
+    def tree(self, kind, nets, invert=False):
+        """Sinal com a redução `kind` (AND, OR, XOR) de `nets`, negada se
+        `invert`; a última porta é NAND/NOR quando possível."""
+        nets = list(nets)
+        if len(nets) == 1:
+            return self.negate(nets[0]) if invert else nets[0]
+        while len(nets) > 2:
+            pairs = [self.gate(kind, [a, b])
+                     for a, b in zip(nets[::2], nets[1::2])]
+            nets = pairs + nets[len(pairs) * 2:]
+        if invert and kind in _INVERTED:
+            return self.gate(_INVERTED[kind], nets)
+        out = self.gate(kind, nets)
+        return self.negate(out) if invert else out
+
+    def constant(self, value):
+        """Sinal com o valor constante 0 ou 1 (uma só porta por valor)."""
+        s = self._constants.get(value)
+        if s is None:
+            s = self._constants[value] = self.gate(f"CONST{value}", [])
+        return s
+
+    def clock(self):
+        """CLOCK comum aos registos sem relógio indicado."""
+        if self._clock is None:
+            self._clock = self.gate("CLOCK", [])
+        return self._clock
+
+    def _root(self, s):
+        seen = 0
+        while self.alias[s] >= 0:
+            s = self.alias[s]
+            seen += 1
+            if seen > len(self.alias):
+                raise ValueError(f"Atribuições circulares: {self.names[s]}")
+        return s
+
+    def circuit(self):
+        """Resolve os sinais e devolve o Circuit."""
+        op_input, op_dff = OPCODES["INPUT"], OPCODES["DFF"]
+        for s in self.clocked:
+            g = self.driver[self._root(s)]
+            if g >= 0 and self.opcodes[g] == op_input:
+                self.opcodes[g] = OPCODES["CLOCK"]
+        for s, value in self.initial.items():
+            g = self.driver[self._root(s)]
+            if g < 0 or self.opcodes[g] != op_dff:
+                raise ValueError(f"Valor inicial de um sinal que não é um "
+                                 f"registo: {self.names[s]}")
+            self.values[g] = value
+        for s in self.outputs:
+            self.gate("OUTPUT", [s])
+
+        gate_of = array("i", (self.driver[self._root(s)]
+                              for s in range(len(self.driver))))
+        src, dst, pin = array("i"), array("i"), array("B")
+        for s, d, p in zip(self.src, self.dst, self.pin):
+            g = gate_of[s]
+            if g >= 0:
+                src.append(g)
+                dst.append(d)
+                pin.append(p)
+        n = len(self.opcodes)
+        zeros = array("f", bytes(4 * n))
+        return circuit_from_columns(GATE_NAMES, self.opcodes, self.values,
+                                    zeros, array("f", zeros), src, dst, pin)
+
+def _lines(f, progress, cancelled, size):
+    """Linhas de `f`, com as chamadas de progresso e cancelamento."""
+    pos = 0
+    for k, line in enumerate(f):
+        pos += len(line)
+        if k % _TICK_LINES == 0:
+            if cancelled is not None and cancelled():
+                raise LoadCancelled()
+            if progress is not None and size:
+                progress(min(pos / size, 1.0))
+        yield k + 1, line
+
+# =============================================================
+#  BLIF
+# =============================================================
+
+# Diretivas de tempo e área, sem efeito na simulação
+_BLIF_IGNORED = {".area", ".delay", ".wire_load_slope", ".wire",
+                 ".input_arrival", ".default_input_arrival",
+                 ".output_required", ".default_output_required",
+                 ".input_drive", ".default_input_drive", ".output_load",
+                 ".default_output_load", ".max_input_load"}
+
+def _blif_statements(lines):
+    """(linha, palavras) de cada instrução BLIF, sem comentários e com as
+    linhas continuadas (`\\`) juntas."""
+    words, first = [], None
+    for number, line in lines:
+        line = line.split("#", 1)[0].rstrip()
+        more = line.endswith("\\")
+        if more:
+            line = line[:-1]
+        if first is None:
+            first = number
+        words.extend(line.split())
+        if more:
+            continue
+        if words:
+            yield first, words
+        words, first = [], None
+    if words:
+        yield first, words
+
+def _cover(b, inputs, cubes, on):
+    """Sinal com a função da cobertura `cubes` (conjunto ON se `on`, OFF
+    caso contrário) das entradas `inputs`."""
+    if not cubes:
+        return b.constant(0)
+    products = []
+    for cube in cubes:
+        if len(cube) != len(inputs) or cube.strip("01-"):
+            raise ValueError(f"linha de cobertura inválida: {cube}")
+        pos = [s for s, c in zip(inputs, cube) if c == "1"]
+        neg = [s for s, c in zip(inputs, cube) if c == "0"]
+        if not pos and not neg:
+            return b.constant(int(on))
+        products.append((pos, neg))
+
+    if len(inputs) == 2 and len(cubes) == 2:
+        kind = {frozenset(("01", "10")): True,
+                frozenset(("00", "11")): False}.get(frozenset(cubes))
+        if kind is not None:
+            return b.tree("XOR", inputs, invert=kind != on)
+    if len(products) == 1:
+        pos, neg = products[0]
+        if not neg:
+            return b.tree("AND", pos, invert=not on)
+        if not pos:
+            return b.tree("OR", neg, invert=on)
+        return b.tree("AND", pos + [b.negate(s) for s in neg], invert=not on)
+    if all(not pos and len(neg) == 1 for pos, neg in products):
+        # Soma de negações: NAND das entradas
+        return b.tree("AND", [neg[0] for _, neg in products], invert=on)
+    terms = []
+    for pos, neg in products:
+        if not pos:
+            terms.append(b.tree("OR", neg, invert=True))
+        else:
+            terms.append(b.tree("AND", pos + [b.negate(s) for s in neg]))
+    return b.tree("OR", terms, invert=not on)
+
+def read_blif(f, progress=None, cancelled=None, size=0):
+    """Lê o primeiro modelo de um ficheiro BLIF aberto em modo texto.
+
+    `progress(fração)` e `cancelled()` são como em
+    `project.read_json_project`; `size` é o tamanho do ficheiro.
+    """
+    b = _Builder()
+    statements = _blif_statements(_lines(f, progress, cancelled, size))
+    pending = None   # (linha, palavras) de um .names à espera das linhas
+    cubes = []
+    for number, words in statements:
+        head = words[0]
+        if not head.startswith("."):
+            if pending is None:
+                raise ValueError(f"linha {number}: linha de cobertura fora "
+                                 "de um .names")
+            cubes.append(words)
+            continue
+        if pending is not None:
+            _blif_names(b, *pending, cubes)
+            pending, cubes = None, []
+        try:
+            if head == ".names":
+                pending = (number, words[1:])
+            elif head == ".inputs":
+                for name in words[1:]:
+                    b.gate("INPUT", [], b.net(name))
+            elif head == ".outputs":
+                b.outputs.extend(b.net(name) for name in words[1:])
+            elif head == ".clock":
+                for name in words[1:]:
+                    b.gate("CLOCK", [], b.net(name))
+            elif head == ".latch":
+                _blif_latch(b, words[1:])
+            elif head == ".model":
+                continue
+            elif head == ".end":
+                break
+            elif head == ".exdc":
+                for _, words in statements:
+                    if words[0] == ".end":
+                        break
+                break
+            elif head not in _BLIF_IGNORED:
+                raise ValueError(f"diretiva não suportada: {head}")
+        except ValueError as e:
+            raise ValueError(f"linha {number}: {e}") from None
+    if pending is not None:
+        _blif_names(b, *pending, cubes)
+    return b.circuit()
+
+def _blif_names(b, number, names, rows):
+    if not names:
+        raise ValueError(f"linha {number}: .names sem sinais")
+    inputs = [b.net(name) for name in names[:-1]]
+    cubes, outs = [], set()
+    for row in rows:
+        if len(row) == 1 and not inputs:
+            cube, out = "", row[0]
+        elif len(row) == 2:
+            cube, out = row
+        else:
+            raise ValueError(f"linha {number}: linha de cobertura inválida: "
+                             f"{' '.join(row)}")
+        cubes.append(cube)
+        outs.add(out)
+    if not outs <= {"0", "1"} or len(outs) > 1:
+        raise ValueError(f"linha {number}: a cobertura tem de ter só 1 ou "
+                         "só 0 na saída")
+    try:
+        b.assign(b.net(names[-1]), _cover(b, inputs, cubes, outs != {"0"}))
+    except ValueError as e:
+        raise ValueError(f"linha {number}: {e}") from None
+
+def _blif_latch(b, words):
+    """.latch entrada saída [tipo controlo] [valor inicial]"""
+    if len(words) not in (2, 3, 4, 5):
+        raise ValueError(".latch com argumentos inválidos")
+    d, q = b.net(words[0]), b.net(words[1])
+    kind, control, init = "re", "NIL", "0"
+    if len(words) == 3:
+        init = words[2]
+    elif len(words) >= 4:
+        kind, control = words[2], words[3]
+        init = words[4] if len(words) == 5 else "0"
+    if init not in ("0", "1", "2", "3"):
+        raise ValueError(f"valor inicial inválido: {init}")
+    value = 1 if init == "1" else 0
+    clk = b.clock() if control == "NIL" else b.net(control)
+    if kind in ("re", "fe"):
+        if control != "NIL":
+            b.clocked.add(clk)
+        if kind == "fe":
+            clk = b.negate(clk)
+        b.gate("DFF", [d, clk], q, value)
+    elif kind in ("ah", "al"):
+        b.gate("LATCH", [d, clk if kind == "ah" else b.negate(clk)], q, value)
+    else:
+        raise ValueError(f"tipo de .latch não suportado: {kind}")
+
+# Cobertura BLIF de cada tipo de porta
+_BLIF_COVERS = {
+    "AND": "11 1", "OR": "1- 1\n-1 1", "NOT": "0 1", "XOR": "01 1\n10 1",
+    "NAND": "11 0", "NOR": "00 1", "OUTPUT": "1 1", "CONST0": "",
+    "CONST1": "1",
+}
+
+def _exportable(circuit):
+    nl = circuit.compile()
+    if OP_MACRO in nl.opcodes:
+        raise ValueError("Os componentes não podem ser exportados como "
+                         "netlist")
+    return nl
+
+def _blif_list(f, directive, names, per_line=16):
+    for k in range(0, len(names), per_line):
+        more = " \\" if k + per_line < len(names) else ""
+        prefix = directive if k == 0 else " "
+        f.write(f"{prefix} {' '.join(names[k:k + per_line])}{more}\n")
+
+def write_blif(circuit, f, model="logicsim"):
+    """Escreve o circuito em BLIF num ficheiro aberto em modo texto.
+
+    As entradas desligadas ficam ligadas a sinais sem origem
+    (`u<porta>_<pino>`).
+    """
+    nl = _exportable(circuit)
+    types = nl.types
+    f.write(f".model {model}\n")
+    _blif_list(f, ".inputs", [f"n{i}" for i in nl.inputs])
+    _blif_list(f, ".outputs", [f"o{i}" for i in nl.outputs])
+    _blif_list(f, ".clock", [f"n{i}" for i, t in enumerate(types)
+                             if t == "CLOCK"])
+    for i, t in enumerate(types):
+        names = [f"n{d}" if d >= 0 else f"u{i}_{pin}"
+                 for pin, d in enumerate(nl.drivers(i))]
+        if t in ("INPUT", "CLOCK"):
+            continue
+        if t in ("DFF", "LATCH"):
+            kind = "re" if t == "DFF" else "ah"
+            f.write(f".latch {names[0]} n{i} {kind} {names[1]} "
+                    f"{circuit.values[i] & 1}\n")
+            continue
+        out = f"o{i}" if t == "OUTPUT" else f"n{i}"
+        cover = _BLIF_COVERS[t]
+        f.write(f".names {' '.join(names + [out])}\n"
+                + (cover + "\n" if cover else ""))
+    f.write(".end\n")
+
+# =============================================================
+#  VERILOG
+# =============================================================
+
+# Nomes (também escapados), constantes, `<=` e símbolos de um carácter;
+# os caracteres inválidos saem como símbolos e o analisador rejeita-os
+_VERILOG_TOKEN = re.compile(
+    r"\\\S+|[A-Za-z_][\w$]*|\d*'[bBdDhHoO][0-9a-fA-FxXzZ_]+|\d+|<=|\S")
+_ATTRIBUTE = re.compile(r"\(\*.*?\*\)")
+
+_PRIMITIVES = {"and": ("AND", False), "or": ("OR", False),
+               "xor": ("XOR", False), "nand": ("AND", True),
+               "nor": ("OR", True), "xnor": ("XOR", True)}
+_OPERATORS = {"&": "AND", "|": "OR", "^": "XOR"}
+
+class _VerilogTokens:
+    """Símbolos de um ficheiro Verilog, lidos linha a linha."""
+    def __init__(self, lines):
+        self._lines = lines
+        self._comment = False
+        self._tokens = []
+        self._pos = 0
+        self.line = 0
+
+    def _refill(self):
+        """Passa à próxima linha com símbolos; False no fim do ficheiro."""
+        for number, line in self._lines:
+            self.line = number
+            if self._comment:
+                end = line.find("*/")
+                if end < 0:
+                    continue
+                line, self._comment = line[end + 2:], False
+            if "(*" in line:
+                line = _ATTRIBUTE.sub(" ", line)
+            while "/*" in line:
+                start = line.index("/*")
+                end = line.find("*/", start + 2)
+                if end < 0:
+                    line, self._comment = line[:start], True
+                    break
+                line = line[:start] + " " + line[end + 2:]
+            line = line.split("//", 1)[0]
+            if line.lstrip().startswith("`"):
+                continue   # diretivas do pré-processador (`timescale, ...)
+            tokens = _VERILOG_TOKEN.findall(line)
+            if tokens:
+                self._tokens, self._pos = tokens, 0
+                return True
+        return False
+
+    def peek(self):
+        if self._pos == len(self._tokens) and not self._refill():
+            return ""
+        return self._tokens[self._pos]
+
+    def take(self):
+        token = self.peek()
+        if token:
+            self._pos += 1
+        return token
+
+    def expect(self, token):
+        if self.take() != token:
+            raise ValueError(f"esperado {token!r}")
+
+    def name(self):
+        token = self.take()
+        if not token[:1].isalpha() and token[:1] not in ("_", "\\"):
+            raise ValueError(f"esperado um nome, encontrado {token!r}")
+        return token
+
+def _constant(token):
+    """Valor de uma constante de 1 bit (None para x/z)."""
+    if "'" not in token:
+        value = int(token)
+    else:
+        size, rest = token.split("'", 1)
+        base, digits = rest[0].lower(), rest[1:].replace("_", "").lower()
+        if size not in ("", "1") or digits in ("x", "z"):
+            if digits in ("x", "z"):
+                return None
+            raise ValueError(f"só são suportadas constantes de 1 bit: {token}")
+        value = int(digits, {"b": 2, "o": 8, "d": 10, "h": 16}[base])
+    if value not in (0, 1):
+        raise ValueError(f"só são suportadas constantes de 1 bit: {token}")
+    return value
+
+class _VerilogReader:
+    """Analisador descendente do subconjunto estrutural suportado."""
+    def __init__(self, tokens):
+        self.t = tokens
+        self.b = _Builder()
+
+    def read(self):
+        t, b = self.t, self.b
+        t.expect("module")
+        t.name()
+        if t.peek() == "(":
+            self.header()
+        t.expect(";")
+        while True:
+            token = t.take()
+            if token == "endmodule":
+                return b.circuit()
+            if token == "":
+                raise ValueError("falta endmodule")
+            if token in ("input", "output"):
+                self.declaration(token)
+                t.expect(";")
+            elif token in ("wire", "reg"):
+                self.nets()
+            elif token == "assign":
+                self.assignments()
+            elif token in _PRIMITIVES or token in ("not", "buf"):
+                self.primitive(token)
+            elif token == "always":
+                self.always()
+            elif token == "initial":
+                self.initial()
+            else:
+                raise ValueError(f"construção não suportada: {token}")
+
+    def header(self):
+        """Lista de portas; com direções (estilo ANSI) declara-as."""
+        t = self.t
+        t.expect("(")
+        if t.peek() == ")":
+            t.take()
+            return
+        if t.peek() not in ("input", "output"):
+            while t.take() not in (")", ""):
+                pass
+            return
+        while True:
+            self.declaration(t.take())
+            if t.peek() == ")":
+                t.take()
+                return
+
+    def declaration(self, direction):
+        """Nomes de uma declaração input/output, até ao fim da lista ou à
+        próxima direção (nas listas de portas ANSI)."""
+        t, b = self.t, self.b
+        if direction not in ("input", "output"):
+            raise ValueError(f"direção não suportada: {direction}")
+        if t.peek() in ("wire", "reg"):
+            t.take()
+        bits = self.bit_range()
+        while True:
+            for name in self.expand(t.name(), bits):
+                s = b.net(name)
+                if direction == "input":
+                    b.gate("INPUT", [], s)
+                else:
+                    b.outputs.append(s)
+            if t.peek() != ",":
+                return
+            t.take()
+            if t.peek() in ("input", "output"):
+                return
+
+    def bit_range(self):
+        """Índices de `[msb:lsb]`, ou None se não houver."""
+        t = self.t
+        if t.peek() != "[":
+            return None
+        t.take()
+        msb = int(t.take())
+        t.expect(":")
+        lsb = int(t.take())
+        t.expect("]")
+        step = 1 if lsb >= msb else -1
+        return range(msb, lsb + step, step)
+
+    @staticmethod
+    def expand(name, bits):
+        return [name] if bits is None else [f"{name}[{k}]" for k in bits]
+
+    def nets(self):
+        """wire/reg: só interessam as atribuições na declaração."""
+        t = self.t
+        self.bit_range()
+        while True:
+            name = t.name()
+            if t.peek() == "=":
+                t.take()
+                self.b.assign(self.b.net(name), self.expression())
+            token = t.take()
+            if token == ";":
+                return
+            if token != ",":
+                raise ValueError(f"esperado ',' ou ';', encontrado {token!r}")
+
+    def signal(self):
+        """Nome de um sinal, com o índice se for um bit de um vetor."""
+        t = self.t
+        name = t.name()
+        if t.peek() == "[":
+            t.take()
+            name = f"{name}[{int(t.take())}]"
+            t.expect("]")
+        return self.b.net(name)
+
+    def term(self):
+        """Sinal ou constante; None = desligado."""
+        token = self.t.peek()
+        if token[:1].isdigit() or token.startswith("'"):
+            value = _constant(self.t.take())
+            return None if value is None else self.b.constant(value)
+        return self.signal()
+
+    def operand(self):
+        t = self.t
+        if t.peek() == "~":
+            t.take()
+            return self.b.negate(self.operand())
+        if t.peek() == "(":
+            t.take()
+            s = self.expression()
+            t.expect(")")
+            return s
+        return self.term()
+
+    def expression(self):
+        """Operandos ligados por um mesmo operador (&, | ou ^)."""
+        t = self.t
+        operands = [self.operand()]
+        op = t.peek() if t.peek() in _OPERATORS else None
+        while t.peek() == op and op is not None:
+            t.take()
+            operands.append(self.operand())
+        if t.peek() in _OPERATORS:
+            raise ValueError("use parênteses para misturar operadores")
+        if op is None:
+            return operands[0]
+        return self.b.tree(_OPERATORS[op], operands)
+
+    def assignments(self):
+        t, b = self.t, self.b
+        while True:
+            target = self.signal()
+            t.expect("=")
+            b.assign(target, self.expression())
+            token = t.take()
+            if token == ";":
+                return
+            if token != ",":
+                raise ValueError(f"esperado ',' ou ';', encontrado {token!r}")
+
+    def primitive(self, kind):
+        t, b = self.t, self.b
+        if t.peek() == "#":
+            t.take()   # atraso, ignorado
+            if t.take() == "(":
+                while t.take() not in (")", ""):
+                    pass
+        while True:
+            if t.peek() != "(":
+                t.name()   # nome da instância
+            t.expect("(")
+            ports = [self.term()]
+            while t.peek() == ",":
+                t.take()
+                ports.append(self.term())
+            t.expect(")")
+            if len(ports) < 2:
+                raise ValueError(f"{kind} precisa de saída e entradas")
+            if kind in ("not", "buf"):
+                source = ports[-1]
+                if kind == "not":
+                    source = b.negate(source)
+                for out in ports[:-1]:
+                    b.assign(out, source)
+            else:
+                gate, invert = _PRIMITIVES[kind]
+                b.assign(ports[0], b.tree(gate, ports[1:], invert))
+            token = t.take()
+            if token == ";":
+                return
+            if token != ",":
+                raise ValueError(f"esperado ',' ou ';', encontrado {token!r}")
+
+    def always(self):
+        """always @(posedge|negedge clk) q <= d; (ou um bloco begin/end)"""
+        t, b = self.t, self.b
+        t.expect("@")
+        t.expect("(")
+        edge = t.take()
+        if edge not in ("posedge", "negedge"):
+            raise ValueError("só são suportados registos com posedge/negedge")
+        clk = self.term()
+        t.expect(")")
+        if clk is not None:
+            b.clocked.add(clk)
+            if edge == "negedge":
+                clk = b.negate(clk)
+        block = t.peek() == "begin"
+        if block:
+            t.take()
+        while True:
+            q = self.signal()
+            t.expect("<=")
+            b.gate("DFF", [self.expression(), clk], q)
+            t.expect(";")
+            if not block:
+                return
+            if t.peek() == "end":
+                t.take()
+                return
+
+    def initial(self):
+        """initial q = 1'b0; (ou um bloco begin/end)"""
+        t, b = self.t, self.b
+        block = t.peek() == "begin"
+        if block:
+            t.take()
+        while True:
+            q = self.signal()
+            t.expect("=")
+            b.initial[q] = _constant(t.take()) or 0
+            t.expect(";")
+            if not block:
+                return
+            if t.peek() == "end":
+                t.take()
+                return
+
+def read_verilog(f, progress=None, cancelled=None, size=0):
+    """Lê o primeiro módulo de um ficheiro Verilog estrutural.
+
+    Os argumentos são como em `read_blif`.
+    """
+    tokens = _VerilogTokens(_lines(f, progress, cancelled, size))
+    try:
+        return _VerilogReader(tokens).read()
+    except ValueError as e:
+        if str(e).startswith("linha "):
+            raise
+        raise ValueError(f"linha {tokens.line}: {e}") from None
+
+def _verilog_list(f, keyword, names):
+    for name in names:
+        f.write(f"  {keyword} {name};\n")
+
+def write_verilog(circuit, f, module="logicsim"):
+    """Escreve o circuito como um módulo Verilog estrutural.
+
+    As entradas desligadas ficam a `1'bx`.
+    """
+    nl = _exportable(circuit)
+    types = nl.types
+    if "LATCH" in types:
+        raise ValueError("Os LATCH não têm representação no Verilog "
+                         "estrutural; exporte em BLIF")
+    inputs = [f"n{i}" for i, t in enumerate(types) if t in ("INPUT", "CLOCK")]
+    outputs = [f"o{i}" for i in nl.outputs]
+    ports = inputs + outputs
+    f.write(f"module {module} (\n")
+    for k in range(0, len(ports), 16):
+        more = "," if k + 16 < len(ports) else ""
+        f.write(f"  {', '.join(ports[k:k + 16])}{more}\n")
+    f.write(");\n")
+    _verilog_list(f, "input", inputs)
+    _verilog_list(f, "output", outputs)
+    for i, t in enumerate(types):
+        if t not in ("INPUT", "CLOCK", "OUTPUT"):
+            f.write(f"  {'reg' if t == 'DFF' else 'wire'} n{i};\n")
+    for i, t in enumerate(types):
+        if t == "DFF" and circuit.values[i] & 1:
+            f.write(f"  initial n{i} = 1'b1;\n")
+    for i, t in enumerate(types):
+        names = [f"n{d}" if d >= 0 else "1'bx" for d in nl.drivers(i)]
+        if t in ("INPUT", "CLOCK"):
+            continue
+        if t == "OUTPUT":
+            f.write(f"  assign o{i} = {names[0]};\n")
+        elif t in ("CONST0", "CONST1"):
+            f.write(f"  assign n{i} = 1'b{t[-1]};\n")
+        elif t == "DFF":
+            f.write(f"  always @(posedge {names[1]}) n{i} <= {names[0]};\n")
+        else:
+            f.write(f"  {t.lower()} g{i} (n{i}, {', '.join(names)});\n")
+    f.write("endmodule\n")
+
+# =============================================================
+#  FICHEIROS
+# =============================================================
+
+_READERS = {".blif": read_blif, ".v": read_verilog}
+_WRITERS = {".blif": write_blif, ".v": write_verilog}
+NETLIST_EXTENSIONS = tuple(_READERS)
+
+def is_netlist(path):
+    """True se `path` tem a extensão de um formato de netlist."""
+    return os.path.splitext(str(path))[1].lower() in _READERS
+
+def read_netlist(path, progress=None, cancelled=None):
+    """Lê um ficheiro BLIF ou Verilog, pela extensão."""
+    reader = _READERS[os.path.splitext(str(path))[1].lower()]
+    with open(path, "r") as f:
+        return reader(f, progress, cancelled, os.path.getsize(path))
+
+def write_netlist(circuit, path):
+    """Escreve um ficheiro BLIF ou Verilog, pela extensão."""
+    writer = _WRITERS[os.path.splitext(str(path))[1].lower()]
+    name = re.sub(r"\W", "_", os.path.splitext(os.path.basename(path))[0])
+    if not name or name[0].isdigit():
+        name = "m_" + name
+    with open(path, "w") as f:
+        writer(circuit, f, name)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Colocação automática das portas para o editor.
+
+Os circuitos importados (`logicsim.interchange`) não trazem posições; só
+a interface precisa delas, por isso a colocação é um passo à parte que o
+modo sem interface nunca executa.
+"""
+from .core import OPCODES
+
+# Espaçamento da grelha onde as portas são colocadas
+COLUMN_WIDTH = 120.0
+ROW_HEIGHT = 80.0
+# Portas por coluna; um nível com mais portas ocupa várias colunas
+MAX_ROWS = 500
+
+_OP_OUTPUT = OPCODES["OUTPUT"]
+
+def layered_layout(circuit, max_rows=MAX_ROWS):
+    """Coloca as portas em colunas pela profundidade, da esquerda para a
+    direita.
+
+    Dentro de cada nível, as portas são ordenadas pela linha média dos
+    seus operandos, para reduzir os cruzamentos de fios. As portas em
+    ciclos ficam numa coluna depois das restantes e os OUTPUT na última.
+    """
+    nl = circuit.compile()
+    n = len(nl)
+    ptr, fanin = nl.fanin_ptr, nl.fanin
+    levels = [[] for _ in range(nl.depth)]
+    for i in nl.order:
+        if nl.opcodes[i] != _OP_OUTPUT:
+            levels[nl.level_of[i]].append(i)
+    levels.append(list(nl.cyclic))
+    levels.append(circuit.outputs())
+
+    row = [0.0] * n
+    x, y = circuit.x, circuit.y
+    column = 0
+    for ids in levels:
+        if not ids:
+            continue
+        keys = {}
+        for i in ids:
+            rows = [row[d] for d in fanin[ptr[i]:ptr[i + 1]] if d >= 0]
+            keys[i] = sum(rows) / len(rows) if rows else 0.0
+        ids.sort(key=keys.__getitem__)
+        for k, i in enumerate(ids):
+            r = k % max_rows
+            row[i] = r
+            x[i] = (column + k // max_rows) * COLUMN_WIDTH
+            y[i] = r * ROW_HEIGHT
+        column += (len(ids) + max_rows - 1) // max_rows
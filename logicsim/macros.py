@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Sub-circuitos reutilizáveis (componentes / portas macro).
+
+Um componente é um Circuit cujos INPUTs e OUTPUTs (por ordem de ID) são
+os seus pinos. A definição é compilada uma só vez e partilhada por todas
+as instâncias (`Circuit.add_macro`). Se for puramente combinacional e
+tiver poucas entradas, pode ser reduzida a uma tabela de consulta: cada
+instância passa então a ser avaliada num único acesso.
+"""
+from array import array
+
+from .core import IS_SOURCE, OP_INPUT, OP_MACRO, X, Circuit
+
+# Máximo de entradas para reduzir um componente a tabela (2**n linhas)
+LUT_MAX_INPUTS = 16
+
+class MacroDefinition:
+    """Definição de um componente, partilhada pelas suas instâncias.
+
+    `lut[i]` tem as saídas empacotadas (bit k = saída k) para o vetor de
+    entrada de índice i, ou é None se o componente não foi reduzido.
+    """
+    __slots__ = ("name", "circuit", "compiled", "n_inputs", "n_outputs",
+                 "lut")
+
+    def __init__(self, name, circuit, collapse=False):
+        self.name = name
+        self.circuit = circuit
+        self.compiled = compiled = circuit.compile()
+        if any(IS_SOURCE[op] and op != OP_INPUT for op in compiled.opcodes):
+            raise ValueError("Um componente não pode ter elementos "
+                             "sequenciais nem relógios")
+        self.n_inputs = len(compiled.inputs)
+        self.n_outputs = len(compiled.outputs)
+        self.lut = None
+        if collapse:
+            self.lut = _build_lut(compiled)
+
+    def __repr__(self):
+        return (f"MacroDefinition({self.name!r}, {self.n_inputs} entradas, "
+                f"{self.n_outputs} saídas)")
+
+    def evaluate_index(self, index):
+        """Saídas para o vetor de entrada `index` (bit j = entrada j).
+
+        Devolve as saídas empacotadas num inteiro, ou -1 se alguma não
+        estiver determinada.
+        """
+        if self.lut is not None:
+            return self.lut[index]
+        compiled = self.compiled
+        values = bytearray(len(compiled))
+        for j, i in enumerate(compiled.inputs):
+            values[i] = (index >> j) & 1
+        result = compiled.evaluate(values)
+        out = 0
+        for k, i in enumerate(compiled.outputs):
+            v = result[i]
+            if v == X:
+                return -1
+            out |= v << k
+        return out
+
+    def evaluate_packed(self, input_words, count):
+        """Versão bit-paralela: uma palavra por saída (None se X)."""
+        from .batch import evaluate_packed   # evita importar NumPy cedo
+        result = evaluate_packed(self.compiled, input_words, count)
+        return [result[i] for i in self.compiled.outputs]
+
+def _build_lut(compiled):
+    """Tabela das saídas por vetor de entrada, ou None se não for possível.
+
+    Só é construída para componentes combinacionais (sem ciclos nem
+    saídas indeterminadas) com até LUT_MAX_INPUTS entradas.
+    """
+    if len(compiled.inputs) > LUT_MAX_INPUTS or compiled.cyclic:
+        return None
+    from .truthtable import iter_batches   # evita importar NumPy cedo
+    lut = array("q", [0]) * (1 << len(compiled.inputs))
+    try:
+        for base, count, words in iter_batches(compiled):
+            for k, word in enumerate(words):
+                bit = 1 << k
+                for m in range(count):
+                    if (word >> m) & 1:
+                        lut[base + m] |= bit
+    except ValueError:
+        return None
+    return lut
+
+def subcircuit(circuit, ids):
+    """Extrai as portas `ids` (e os fios entre elas) para um novo Circuit.
+
+    Os IDs são renumerados pela ordem original; as instâncias de
+    componentes contidas na seleção devem incluir as portas PIN.
+    """
+    ids = sorted(set(ids))
+    new_id = {old: new for new, old in enumerate(ids)}
+    sub = Circuit()
+    for i in ids:
+        op = circuit.opcodes[i]
+        param = circuit.params[i]
+        if op == OP_MACRO:
+            definition = circuit.macros[param]
+            if definition not in sub.macros:
+                sub.macros.append(definition)
+            param = sub.macros.index(definition)
+        sub._append(op, circuit.values[i] if IS_SOURCE[op] else 0,
+                    circuit.x[i], circuit.y[i], param)
+    for src, dst, pin in zip(circuit.wire_src, circuit.wire_dst,
+                             circuit.wire_pin):
+        if src in new_id and dst in new_id:
+            sub.connect(new_id[src], new_id[dst], pin)
+    return sub
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""Otimização da netlist antes da simulação.
+
+Numa só travessia por nível são aplicados:
+
+* propagação de constantes: portas CONST0/CONST1, entradas desligadas
+  (X) e INPUTs indicados como constantes;
+* remoção de inversões duplas (NOT de NOT);
+* fusão estrutural: portas do mesmo tipo com as mesmas entradas passam a
+  ser uma só;
+
+e no fim são eliminadas as portas sem caminho até um OUTPUT, incluindo
+os registos cujo valor nenhum OUTPUT observa (os INPUTs e CLOCKs ficam
+sempre). O resultado é um novo Circuit com os mesmos INPUTs e OUTPUTs,
+pela mesma ordem, e com os mesmos valores nos OUTPUTs para qualquer
+vetor de entrada. As portas em ciclos combinacionais, os elementos
+sequenciais e as instâncias de componentes que ficam são copiados sem
+alterações.
+"""
+from .core import (
+    GATE_LUT, OP_CLOCK, OP_INPUT, OP_MACRO, OP_PIN, OPCODES, X, Circuit,
+)
+
+OP_NOT = OPCODES["NOT"]
+OP_OUTPUT = OPCODES["OUTPUT"]
+OP_CONST = (OPCODES["CONST0"], OPCODES["CONST1"])
+
+# Literais: um ID >= 0 é uma porta do circuito novo; os negativos são
+# constantes (-1 = X, que corresponde a uma entrada desligada)
+_X, _ZERO, _ONE = -1, -2, -3
+
+def _const(v):
+    return _X if v == X else _ZERO - v
+
+def _value(literal):
+    return X if literal == _X else _ZERO - literal
+
+# Com uma entrada constante k: (resultado se k = 0, resultado se k = 1),
+# em que "a" é a outra entrada e "!a" a sua negação
+_IDENTITIES = {
+    "AND": (_ZERO, "a"), "OR": ("a", _ONE), "XOR": ("a", "!a"),
+    "NAND": (_ONE, "!a"), "NOR": ("!a", _ZERO),
+}
+_IDENTITIES = {OPCODES[name]: rule for name, rule in _IDENTITIES.items()}
+# Com as duas entradas iguais (a, a)
+_SAME_INPUTS = {"AND": "a", "OR": "a", "XOR": _ZERO, "NAND": "!a", "NOR": "!a"}
+_SAME_INPUTS = {OPCODES[name]: rule for name, rule in _SAME_INPUTS.items()}
+
+class OptimizeReport:
+    """Contagens de uma otimização."""
+    __slots__ = ("before", "after", "constants", "inversions", "merged",
+                 "dead")
+
+    def __init__(self):
+        self.before = self.after = 0
+        self.constants = self.inversions = self.merged = self.dead = 0
+
+    def __str__(self):
+        return (f"Portas: {self.before} -> {self.after} "
+                f"({self.constants} constantes, {self.inversions} inversões "
+                f"duplas, {self.merged} fundidas, {self.dead} sem uso)")
+
+class _Builder:
+    """Netlist nova em listas, com fusão estrutural das portas."""
+    def __init__(self, circuit, report):
+        self.circuit = circuit
+        self.report = report
+        self.ops = []
+        self.args = []
+        self.params = []
+        self.values = []
+        self.origin = []   # porta original (posição no editor)
+        self.maybe_x = []  # se o valor pode ser X (registos, componentes)
+        self.table = {}
+
+    def node(self, op, args, origin, param=0, value=0, maybe_x=True):
+        self.ops.append(op)
+        self.args.append(args)
+        self.params.append(param)
+        self.values.append(value)
+        self.origin.append(origin)
+        self.maybe_x.append(maybe_x)
+        return len(self.ops) - 1
+
+    def hashed(self, op, args, origin):
+        """Porta `op(args)`, reutilizando uma igual se já existir."""
+        key = (op,) + args
+        found = self.table.get(key)
+        if found is not None:
+            self.report.merged += 1
+            return found
+        maybe_x = any(self.maybe_x[a] for a in args)
+        self.table[key] = n = self.node(op, list(args), origin,
+                                        maybe_x=maybe_x)
+        return n
+
+    def negate(self, a, origin):
+        if a < 0:
+            return _const(GATE_LUT[9 * OP_NOT + 3 * _value(a) + X])
+        if self.ops[a] == OP_NOT:
+            self.report.inversions += 1
+            return self.args[a][0]
+        return self.hashed(OP_NOT, (a,), origin)
+
+    def gate(self, op, args, origin):
+        """Literal de uma porta lógica, simplificada sempre que possível."""
+        if op == OP_NOT:
+            return self.negate(args[0], origin)
+        a, b = args
+        if a == _X or b == _X:
+            return _X
+        if a < 0 and b < 0:
+            return _const(GATE_LUT[9 * op + 3 * _value(a) + _value(b)])
+        if a < 0 or b < 0:
+            k, other = (a, b) if a < 0 else (b, a)
+            rule = _IDENTITIES[op][_value(k)]
+        elif a == b:
+            rule, other = _SAME_INPUTS[op], a
+        else:
+            rule = None
+        # Uma constante só domina uma entrada que nunca é X (com X o
+        # resultado também seria X)
+        if rule is None or (rule not in ("a", "!a") and self.maybe_x[other]):
+            a, b = self.materialize(a, origin), self.materialize(b, origin)
+            return self.hashed(op, (min(a, b), max(a, b)), origin)
+        if rule == "a":
+            return other
+        if rule == "!a":
+            return self.negate(other, origin)
+        return rule
+
+    def materialize(self, literal, origin):
+        """ID de uma porta com o valor do literal (-1 se for X); as
+        constantes passam a ser portas CONST0/CONST1, uma por valor."""
+        if literal >= 0 or literal == _X:
+            return literal
+        return self.hashed(OP_CONST[_value(literal)], (), origin)
+
+def optimize(circuit, constants=()):
+    """Otimiza `circuit`; devolve (novo Circuit, OptimizeReport).
+
+    `constants` são IDs de INPUTs a tratar como constantes, com o valor
+    que têm em `circuit.values`; continuam no circuito (a ordem dos
+    INPUTs não muda), mas o resultado só é válido enquanto mantiverem
+    esse valor.
+    """
+    compiled = circuit.compile()
+    opcodes, ptr, fanin = compiled.opcodes, compiled.fanin_ptr, compiled.fanin
+    n = len(compiled)
+    report = OptimizeReport()
+    report.before = n
+    b = _Builder(circuit, report)
+    constants = set(constants)
+    for i in constants:
+        if opcodes[i] != OP_INPUT:
+            raise ValueError(f"A porta {i} não é um INPUT")
+
+    def drivers(i):
+        return [lit[d] for d in fanin[ptr[i]:ptr[i + 1]]]
+
+    # Fontes pela ordem original (a ordem dos INPUTs define os vetores)
+    lit = [_X] * (n + 1)
+    for i in compiled.sources:
+        lit[i] = b.node(opcodes[i], [], i, value=circuit.values[i],
+                        maybe_x=opcodes[i] not in (OP_INPUT, OP_CLOCK))
+        if i in constants:
+            lit[i] = _const(circuit.values[i])
+
+    # Portas em ciclos: copiadas tal como estão, ligadas no fim. Os
+    # OUTPUTs são sempre criados no fim, para manterem a ordem.
+    cyclic = [i for i in compiled.cyclic if opcodes[i] != OP_OUTPUT]
+    for i in cyclic:
+        lit[i] = b.node(opcodes[i], None, i, compiled.params[i])
+    for i in compiled.cyclic:
+        if opcodes[i] == OP_OUTPUT:
+            lit[i] = drivers(i)[0]
+
+    for i in compiled.eval_order:
+        op = opcodes[i]
+        if op == OP_OUTPUT:
+            lit[i] = drivers(i)[0]
+        elif op in OP_CONST:
+            lit[i] = _const(OP_CONST.index(op))
+        elif op == OP_MACRO:
+            args = [b.materialize(a, i) for a in drivers(i)]
+            lit[i] = b.node(op, args, i, compiled.params[i])
+            pins = sorted((compiled.params[j], j) for j in compiled.successors(i)
+                          if opcodes[j] == OP_PIN)
+            for k, j in pins:
+                lit[j] = b.node(OP_PIN, [lit[i]], j, k)
+        elif op != OP_PIN:
+            lit[i] = b.gate(op, drivers(i), i)
+            if lit[i] < 0:
+                report.constants += 1
+
+    for i in cyclic + list(compiled.registers):
+        b.args[lit[i]] = [b.materialize(a, i) for a in drivers(i)]
+    outputs = [b.node(OP_OUTPUT, [b.materialize(drivers(i)[0], i)], i)
+               for i in compiled.outputs]
+    return _emit(b, outputs), report
+
+def _emit(b, outputs):
+    """Copia para um Circuit as portas de `b` que alimentam algum OUTPUT,
+    mais todos os INPUTs e CLOCKs."""
+    ops, args, m = b.ops, b.args, len(b.ops)
+    live = bytearray(m)
+    stack = list(outputs)
+    stack += [k for k in range(m) if ops[k] in (OP_INPUT, OP_CLOCK)]
+    while stack:
+        k = stack.pop()
+        if live[k]:
+            continue
+        live[k] = 1
+        if ops[k] == OP_PIN:
+            # Uma instância fica com todas as saídas (os PIN seguem o MACRO)
+            macro = args[k][0]
+            stack.append(macro)
+            p = macro + 1
+            while p < m and ops[p] == OP_PIN and args[p][0] == macro:
+                stack.append(p)
+                p += 1
+        stack.extend(a for a in args[k] if a >= 0)
+
+    circuit = b.circuit
+    new = Circuit()
+    new.macros = list(circuit.macros)
+    new_id = {}
+    for k in range(m):
+        if live[k]:
+            o = b.origin[k]
+            new_id[k] = new._append(ops[k], b.values[k], circuit.x[o],
+                                    circuit.y[o], b.params[k])
+    for k in range(m):
+        if live[k]:
+            for pin, a in enumerate(args[k]):
+                if a >= 0:
+                    new.connect(new_id[a], new_id[k], pin)
+    b.report.dead = m - len(new_id)
+    b.report.after = len(new)
+    return new
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Simulação de grandes conjuntos de estímulos em vários processos.
+
+A netlist compilada é enviada uma única vez para cada processo (no
+inicializador do pool). O trabalho é dividido em fatias de estímulos e
+os resultados são reunidos pela ordem original.
+"""
+import multiprocessing
+
+from .batch import evaluate_packed
+from .stimulus import pack_lines, unpack_lines, read_range, shard_ranges
+
+# Vetores avaliados de cada vez dentro de um processo
+CHUNK = 4096
+
+def _compiled(netlist):
+    return netlist.compile() if hasattr(netlist, "compile") else netlist
+
+def simulate_lines(netlist, lines):
+    """Avalia uma lista de cadeias de bits e devolve as cadeias de saída."""
+    out = []
+    n_inputs = len(netlist.inputs)
+    for s in range(0, len(lines), CHUNK):
+        block = lines[s:s + CHUNK]
+        result = evaluate_packed(netlist, pack_lines(block, n_inputs),
+                                 len(block))
+        out.extend(unpack_lines(list(result.values()), len(block)))
+    return out
+
+# =============================================================
+#  PROCESSOS
+# =============================================================
+
+_netlist = None
+
+def _init_worker(netlist):
+    global _netlist
+    _netlist = netlist
+
+def _run_lines(lines):
+    return simulate_lines(_netlist, lines)
+
+def _run_range(task):
+    path, start, end = task
+    return simulate_lines(_netlist, read_range(path, start, end))
+
+def _shards(vectors, size):
+    shard = []
+    for v in vectors:
+        shard.append(v if isinstance(v, str) else "".join(map(str, v)))
+        if len(shard) == size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+def simulate_vectors(netlist, vectors, processes=None, shard=65536):
+    """Avalia um iterável de vetores em `processes` processos.
+
+    Os vetores podem ser cadeias '0101' ou sequências de 0/1. Produz uma
+    cadeia de saída por vetor, pela mesma ordem.
+    """
+    netlist = _compiled(netlist)
+    with multiprocessing.Pool(processes, _init_worker, (netlist,)) as pool:
+        for block in pool.imap(_run_lines, _shards(vectors, shard)):
+            yield from block
+
+def simulate_file(netlist, path, out, processes=None, shard_bytes=1 << 20):
+    """Simula um ficheiro de estímulos e escreve os resultados em `out`.
+
+    Cada processo lê diretamente a sua fatia do ficheiro, pelo que só os
+    intervalos de bytes e as linhas de resultado passam entre processos.
+    Devolve o número de vetores simulados.
+    """
+    netlist = _compiled(netlist)
+    tasks = [(path, s, e) for s, e in shard_ranges(path, shard_bytes)]
+    count = 0
+    with multiprocessing.Pool(processes, _init_worker, (netlist,)) as pool:
+        for block in pool.imap(_run_range, tasks):
+            if block:
+                out.write("\n".join(block) + "\n")
+            count += len(block)
+    return count
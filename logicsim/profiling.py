@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Instrumentação opcional da simulação.
+
+Com um Profiler ativo (`enable` ou `with profile() as p`) são registados:
+
+* o tempo e o número de chamadas de cada fase (construção da netlist,
+  avaliação, propagação, estabilização de ciclos, simulação sequencial,
+  leitura/gravação de ficheiros e, na interface, atualização e pintura);
+* contadores globais: passagens completas, ondas de propagação,
+  passagens de estabilização, ciclos de relógio;
+* por porta, quantas vezes foi avaliada e quantas vezes mudou de valor.
+
+Sem Profiler ativo o custo é uma leitura de `active` por chamada das
+funções instrumentadas, nunca por porta.
+"""
+import time
+from array import array
+from contextlib import contextmanager
+
+# Profiler ativo, ou None
+active = None
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+class _Phase:
+    __slots__ = ("entry", "start")
+
+    def __init__(self, entry):
+        self.entry = entry
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.entry[0] += 1
+        self.entry[1] += time.perf_counter() - self.start
+        return False
+
+def phase(name):
+    """Contexto que cronometra a fase `name` (nada faz sem Profiler ativo)."""
+    prof = active
+    return _NULL_PHASE if prof is None else prof.phase(name)
+
+class Profiler:
+    """Tempos por fase, contadores e atividade por porta."""
+    __slots__ = ("phases", "counters", "evaluations", "changes")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.phases = {}     # nome -> [chamadas, segundos]
+        self.counters = {}   # nome -> total
+        self.evaluations = array("q")
+        self.changes = array("q")
+
+    def phase(self, name):
+        entry = self.phases.get(name)
+        if entry is None:
+            entry = self.phases[name] = [0, 0.0]
+        return _Phase(entry)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def _grow(self, n):
+        missing = n - len(self.evaluations)
+        if missing > 0:
+            zeros = array("q", [0]) * missing
+            self.evaluations.extend(zeros)
+            self.changes.extend(zeros)
+
+    def add_evaluations(self, ids, times=1):
+        """Conta `times` avaliações de cada porta em `ids`."""
+        if not len(ids):
+            return
+        self._grow(max(ids) + 1)
+        ev = self.evaluations
+        for i in ids:
+            ev[i] += times
+        self.count("gate_evaluations", len(ids) * times)
+
+    def add_changes(self, ids):
+        """Conta uma mudança de valor em cada porta de `ids`."""
+        if not len(ids):
+            return
+        self._grow(max(ids) + 1)
+        ch = self.changes
+        for i in ids:
+            ch[i] += 1
+        self.count("value_changes", len(ids))
+
+    def compare(self, old, new):
+        """Conta as mudanças entre dois buffers de valores."""
+        n = min(len(old), len(new)) - 1   # a última posição é sempre X
+        self.add_changes([i for i in range(n) if old[i] != new[i]])
+
+    def hotspots(self, n=20, key="evaluations"):
+        """As `n` portas com mais avaliações (ou mudanças, `key="changes"`).
+
+        Lista de (ID, avaliações, mudanças).
+        """
+        primary = self.evaluations if key == "evaluations" else self.changes
+        ids = sorted((i for i in range(len(primary)) if primary[i]),
+                     key=lambda i: -primary[i])[:n]
+        return [(i, self.evaluations[i], self.changes[i]) for i in ids]
+
+    def to_dict(self, n=20):
+        return {
+            "phases": {k: {"calls": c, "seconds": s}
+                       for k, (c, s) in self.phases.items()},
+            "counters": dict(self.counters),
+            "hotspots": [{"id": i, "evaluations": e, "changes": c}
+                         for i, e, c in self.hotspots(n)],
+        }
+
+    def report(self, gate_types=None, n=20):
+        """Resumo em texto; `gate_types` dá o tipo de cada ID, se indicado."""
+        lines = ["Fase                 chamadas    tempo (s)"]
+        for name, (calls, seconds) in sorted(self.phases.items(),
+                                             key=lambda kv: -kv[1][1]):
+            lines.append(f"{name:<20}{calls:>9}{seconds:>13.4f}")
+        if self.counters:
+            lines.append("")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:<24}{value:>12}")
+        spots = self.hotspots(n)
+        if spots:
+            lines.append("")
+            lines.append("Porta     tipo       avaliações   mudanças")
+            for i, e, c in spots:
+                kind = gate_types[i] if gate_types and i < len(gate_types) else ""
+                lines.append(f"{i:<10}{kind:<10}{e:>12}{c:>11}")
+        return "\n".join(lines)
+
+def enable(profiler=None):
+    """Ativa `profiler` (ou um novo) e devolve-o."""
+    global active
+    active = profiler if profiler is not None else Profiler()
+    return active
+
+def disable():
+    """Desativa a instrumentação; devolve o Profiler que estava ativo."""
+    global active
+    prof, active = active, None
+    return prof
+
+@contextmanager
+def profile(profiler=None):
+    """`with profile() as p:` ativa um Profiler durante o bloco."""
+    global active
+    previous = active
+    prof = enable(profiler)
+    try:
+        yield prof
+    finally:
+        active = previous
@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+"""Ficheiros de projeto: portas e fios por ID estável.
+
+Formatos suportados:
+
+* JSON v3 (`.json`): um objeto com as colunas das portas e dos fios e
+  as definições dos componentes usados (v2: o mesmo, sem componentes);
+* binário (`.lgsb`): as mesmas colunas em bruto, lidas de uma só vez
+  através de `mmap`;
+* JSON v1: a lista de portas (sem fios) das versões anteriores, que
+  continua a poder ser carregada;
+* netlists BLIF (`.blif`) e Verilog estrutural (`.v`), sem posições
+  nem componentes (`logicsim.interchange`).
+
+O ID de cada porta é a sua posição nas colunas.
+"""
+import json
+import mmap
+import re
+import struct
+import sys
+from array import array
+
+from . import profiling
+from .core import ARITY, GATE_NAMES, OP_MACRO, OP_PIN, OPCODES, X, Circuit
+from .macros import MacroDefinition
+
+FORMAT_VERSION = 3
+BINARY_MAGIC = b"LGSB"
+# magia, versão, reservado, nº de portas, nº de fios, bytes da tabela de tipos
+_HEADER = struct.Struct("<4sHHQQI")
+
+OP_OUTPUT = OPCODES["OUTPUT"]
+
+# =============================================================
+#  CONSTRUÇÃO EM BLOCO
+# =============================================================
+
+def circuit_from_columns(type_names, opcodes, values, x, y, src, dst, pin,
+                         params=None, macros=()):
+    """Constrói um Circuit diretamente a partir das colunas.
+
+    `opcodes` refere-se à tabela `type_names` do ficheiro, que é traduzida
+    para os opcodes atuais se for diferente de GATE_NAMES. `macros` são
+    as definições (MacroDefinition) a que os `params` dos MACRO se referem.
+    """
+    unknown = [t for t in type_names if t not in OPCODES]
+    if unknown:
+        raise ValueError(f"Tipos de porta desconhecidos: {unknown}")
+    opcodes = array("B", opcodes).tobytes()
+    if list(type_names) != GATE_NAMES:
+        table = bytearray(range(256))
+        for op, name in enumerate(type_names):
+            table[op] = OPCODES[name]
+        opcodes = opcodes.translate(table)
+    if max(opcodes, default=0) >= len(GATE_NAMES):
+        raise ValueError("Opcode fora da tabela de tipos")
+
+    n = len(opcodes)
+    params = array("i", [0]) * n if params is None else array("i", params)
+    if not (len(values) == len(x) == len(y) == len(params) == n
+            and len(src) == len(dst) == len(pin)):
+        raise ValueError("Colunas com comprimentos diferentes")
+    if OP_MACRO in opcodes:
+        if any(not 0 <= params[i] < len(macros)
+               for i, op in enumerate(opcodes) if op == OP_MACRO):
+            raise ValueError("Componente inexistente")
+        arity = array("i", (macros[params[i]].n_inputs if op == OP_MACRO
+                            else ARITY[op] for i, op in enumerate(opcodes)))
+    else:
+        arity = None
+    if values and (min(values) < 0 or max(values) > X):
+        raise ValueError("Valor de porta inválido")
+    if src and (min(src) < 0 or max(src) >= n):
+        raise ValueError("Fio com origem inválida")
+    for s, d, p in zip(src, dst, pin):
+        if not 0 <= d < n:
+            raise ValueError("Fio com destino inválido")
+        if not 0 <= p < (ARITY[opcodes[d]] if arity is None else arity[d]):
+            raise ValueError(f"Porta {d} não tem entrada {p}")
+        if opcodes[s] == OP_OUTPUT:
+            raise ValueError(f"Fio com origem no OUTPUT {s}")
+    if OP_MACRO in opcodes or OP_PIN in opcodes:
+        _check_instances(opcodes, params, macros, src, dst)
+
+    circuit = Circuit()
+    circuit.opcodes = array("B", opcodes)
+    circuit.values = bytearray(array("B", values))
+    circuit.x = array("f", x)
+    circuit.y = array("f", y)
+    circuit.wire_src = array("i", src)
+    circuit.wire_dst = array("i", dst)
+    circuit.wire_pin = array("B", pin)
+    circuit.params = params
+    circuit.macros = list(macros)
+    circuit.version = 1
+    return circuit
+
+def _check_instances(opcodes, params, macros, src, dst):
+    """Verifica que cada MACRO é seguido pelos seus PIN, pela ordem das
+    saídas (como em `Circuit.add_macro`), e que os fios de e para estes
+    são só os que ligam cada instância às suas saídas."""
+    n = len(opcodes)
+    owner = {}
+    for i, op in enumerate(opcodes):
+        if op != OP_MACRO:
+            continue
+        for k in range(macros[params[i]].n_outputs):
+            j = i + 1 + k
+            if j >= n or opcodes[j] != OP_PIN or params[j] != k:
+                raise ValueError(f"Componente {i} sem a saída {k} a seguir")
+            owner[j] = i
+    if opcodes.count(OP_PIN) != len(owner):
+        raise ValueError("Saída de componente sem instância")
+    for s, d in zip(src, dst):
+        if ((opcodes[s] == OP_MACRO or opcodes[d] == OP_PIN)
+                and owner.get(d) != s):
+            raise ValueError(f"Fio inválido entre o componente e as "
+                             f"saídas: {s} -> {d}")
+
+# =============================================================
+#  JSON
+# =============================================================
+
+def circuit_to_data(circuit):
+    """Dados JSON (formato v3) de um circuito."""
+    return {
+        "format": "logicsim",
+        "version": FORMAT_VERSION,
+        "types": GATE_NAMES,
+        "gates": {
+            "op": list(circuit.opcodes),
+            "value": list(circuit.values),
+            "x": circuit.x.tolist(),
+            "y": circuit.y.tolist(),
+            "param": circuit.params.tolist(),
+        },
+        "wires": {
+            "src": circuit.wire_src.tolist(),
+            "dst": circuit.wire_dst.tolist(),
+            "pin": list(circuit.wire_pin),
+        },
+        "macros": [macro_to_data(d) for d in circuit.macros],
+    }
+
+def macro_to_data(definition):
+    """Dados JSON de uma definição de componente."""
+    return {
+        "name": definition.name,
+        "collapse": definition.lut is not None,
+        "circuit": circuit_to_data(definition.circuit),
+    }
+
+def macro_from_data(data):
+    return MacroDefinition(data["name"], circuit_from_data(data["circuit"]),
+                           data.get("collapse", False))
+
+class _V1Columns:
+    """Acumula as portas de um projeto v1 (lista de portas, sem fios)."""
+    def __init__(self):
+        self.names = []
+        self.index = {}
+        self.opcodes = bytearray()
+        self.values = bytearray()
+        self.x = array("f")
+        self.y = array("f")
+
+    def add(self, item):
+        if item["type"] != "gate":
+            return
+        name = item["gate_type"]
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+        self.opcodes.append(self.index[name])
+        self.values.append(item.get("value") or 0)
+        self.x.append(item["x"])
+        self.y.append(item["y"])
+
+    def circuit(self):
+        return circuit_from_columns(self.names, self.opcodes, self.values,
+                                    self.x, self.y, [], [], [])
+
+def circuit_from_data(data):
+    """Constrói um Circuit a partir de dados JSON (v1, v2 ou v3)."""
+    if isinstance(data, list):
+        columns = _V1Columns()
+        for item in data:
+            columns.add(item)
+        return columns.circuit()
+
+    if data.get("format") != "logicsim" or data.get("version", 0) > FORMAT_VERSION:
+        raise ValueError("Formato de projeto não suportado")
+    gates, wires = data["gates"], data["wires"]
+    return circuit_from_columns(
+        data["types"], gates["op"], gates["value"], gates["x"], gates["y"],
+        wires["src"], wires["dst"], wires["pin"], gates.get("param"),
+        [macro_from_data(m) for m in data.get("macros", ())])
+
+# =============================================================
+#  LEITURA INCREMENTAL DE JSON
+# =============================================================
+
+class LoadCancelled(Exception):
+    """O carregamento foi cancelado pelo utilizador."""
+
+_WHITESPACE = re.compile(r"\s*")
+_NOT_NUMERIC = re.compile(r"[^0-9eE.+\-,\s]")
+_decoder = json.JSONDecoder()
+
+# Caracteres lidos de cada vez nos arrays de números
+_SLICE = 1 << 20
+
+class _JsonReader:
+    """Analisador JSON incremental para ficheiros de projeto.
+
+    Os arrays de números (as colunas do formato v2) são convertidos
+    diretamente para `array`, fatia a fatia, sem criar um objeto Python
+    por elemento; os restantes valores usam o descodificador normal.
+    Entre fatias chama `tick(posição)`, que reporta o progresso e pode
+    cancelar a leitura.
+    """
+    def __init__(self, text, tick):
+        self.text = text
+        self.pos = 0
+        self.tick = tick
+
+    def skip(self):
+        self.pos = _WHITESPACE.match(self.text, self.pos).end()
+
+    def expect(self, char):
+        self.skip()
+        if self.text[self.pos:self.pos + 1] != char:
+            raise ValueError(f"JSON inválido na posição {self.pos}: "
+                             f"esperado {char!r}")
+        self.pos += 1
+
+    def peek(self):
+        self.skip()
+        return self.text[self.pos:self.pos + 1]
+
+    def value(self):
+        c = self.peek()
+        if c == "{":
+            return self.object()
+        if c == "[":
+            end = self.text.find("]", self.pos)
+            if end >= 0 and not _NOT_NUMERIC.search(self.text, self.pos + 1, end):
+                return self.numbers(end)
+        v, self.pos = _decoder.raw_decode(self.text, self.pos)
+        return v
+
+    def object(self):
+        self.expect("{")
+        result = {}
+        if self.peek() == "}":
+            self.pos += 1
+            return result
+        while True:
+            self.skip()
+            key, self.pos = _decoder.raw_decode(self.text, self.pos)
+            self.expect(":")
+            result[key] = self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return result
+
+    def numbers(self, end):
+        """Array plano de números terminado em `end`, lido por fatias."""
+        text = self.text
+        column = array("q")
+        start = self.pos + 1
+        while start < end:
+            cut = end
+            if end - start > _SLICE:
+                cut = text.rfind(",", start, start + _SLICE)
+                cut = end if cut < 0 else cut
+            piece = text[start:cut]
+            if piece.strip():
+                parts = piece.split(",")
+                if column.typecode == "q" and any(c in piece for c in ".eE"):
+                    column = array("d", column)
+                column.extend(map(float if column.typecode == "d" else int,
+                                  parts))
+            start = cut + 1
+            self.tick(start)
+        self.pos = end + 1
+        return column
+
+    def items(self):
+        """Produz os elementos de um array um a um (projetos v1)."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            self.tick(self.pos)
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+def read_json_project(path, progress=None, cancelled=None):
+    """Lê um projeto JSON (v1, v2 ou v3) sem construir a árvore completa.
+
+    `progress(fração)` é chamada à medida que o ficheiro é lido e
+    `cancelled()`, se devolver True, interrompe a leitura com
+    LoadCancelled.
+    """
+    with open(path, "r") as f:
+        text = f.read()
+    size = max(len(text), 1)
+    state = {"next": 0}
+
+    def tick(pos):
+        if pos < state["next"]:
+            return
+        state["next"] = pos + _SLICE
+        if cancelled is not None and cancelled():
+            raise LoadCancelled()
+        if progress is not None:
+            progress(pos / size)
+
+    reader = _JsonReader(text, tick)
+    if reader.peek() == "[":
+        columns = _V1Columns()
+        for item in reader.items():
+            columns.add(item)
+        return columns.circuit()
+    return circuit_from_data(reader.object())
+
+# =============================================================
+#  BINÁRIO
+# =============================================================
+
+def _align(offset, size):
+    return (offset + size - 1) // size * size
+
+def _columns(circuit):
+    """Colunas pela ordem em que são escritas, com o alinhamento de cada uma."""
+    return [
+        (array("B", circuit.opcodes), 1), (array("B", circuit.values), 1),
+        (circuit.x, 4), (circuit.y, 4), (circuit.params, 4),
+        (circuit.wire_src, 4), (circuit.wire_dst, 4), (circuit.wire_pin, 1),
+    ]
+
+def save_binary(circuit, path):
+    # A tabela de tipos e as definições dos componentes (pequenas) vão em
+    # JSON no cabeçalho; as colunas seguem em bruto
+    names = json.dumps({
+        "types": GATE_NAMES,
+        "macros": [macro_to_data(d) for d in circuit.macros],
+    }).encode("utf-8")
+    header = _HEADER.pack(BINARY_MAGIC, FORMAT_VERSION, 0, len(circuit),
+                          len(circuit.wire_src), len(names))
+    with open(path, "wb") as f:
+        f.write(header + names)
+        offset = len(header) + len(names)
+        for column, size in _columns(circuit):
+            pad = _align(offset, size) - offset
+            f.write(b"\0" * pad)
+            if sys.byteorder != "little" and column.itemsize > 1:
+                column = array(column.typecode, column)
+                column.byteswap()
+            column.tofile(f)
+            offset += pad + len(column) * column.itemsize
+
+def load_binary(path, progress=None, cancelled=None):
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, version, _, n, m, names_len = _HEADER.unpack_from(mm, 0)
+        if magic != BINARY_MAGIC or version > FORMAT_VERSION:
+            raise ValueError("Formato de projeto não suportado")
+        offset = _HEADER.size
+        names = json.loads(bytes(mm[offset:offset + names_len]))
+        offset += names_len
+
+        columns = []
+        if version >= 3:
+            layout = (("B", n), ("B", n), ("f", n), ("f", n), ("i", n),
+                      ("i", m), ("i", m), ("B", m))
+        else:   # sem a coluna dos parâmetros
+            layout = (("B", n), ("B", n), ("f", n), ("f", n),
+                      ("i", m), ("i", m), ("B", m))
+        for k, (typecode, count) in enumerate(layout):
+            if cancelled is not None and cancelled():
+                raise LoadCancelled()
+            if progress is not None:
+                progress(k / len(layout))
+            column = array(typecode)
+            offset = _align(offset, column.itemsize)
+            end = offset + count * column.itemsize
+            with memoryview(mm)[offset:end] as view:
+                column.frombytes(view)
+            if sys.byteorder != "little" and column.itemsize > 1:
+                column.byteswap()
+            columns.append(column)
+            offset = end
+    if version < 3:
+        return circuit_from_columns(names, *columns)
+    opcodes, values, x, y, params, src, dst, pin = columns
+    macros = [macro_from_data(d) for d in names["macros"]]
+    return circuit_from_columns(names["types"], opcodes, values, x, y,
+                                src, dst, pin, params, macros)
+
+# =============================================================
+#  FICHEIROS
+# =============================================================
+
+def save_project(circuit, path):
+    """Guarda o circuito; `.lgsb` usa o formato binário, `.blif` e `.v`
+    são netlists (`logicsim.interchange`), o resto JSON."""
+    with profiling.phase("file_io"):
+        from .interchange import is_netlist, write_netlist
+        if is_netlist(path):
+            write_netlist(circuit, path)
+            return
+        if str(path).endswith(".lgsb"):
+            save_binary(circuit, path)
+            return
+        with open(path, "w") as f:
+            json.dump(circuit_to_data(circuit), f, separators=(",", ":"))
+
+def load_project(path, progress=None, cancelled=None):
+    """Lê um projeto em qualquer dos formatos suportados.
+
+    Ver `read_json_project` para `progress` e `cancelled`. Os ficheiros
+    `.blif` e `.v` são lidos como netlists, sem posições (ver
+    `logicsim.layout`).
+    """
+    with profiling.phase("file_io"):
+        from .interchange import is_netlist, read_netlist
+        if is_netlist(path):
+            return read_netlist(path, progress, cancelled)
+        with open(path, "rb") as f:
+            binary = f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+        if binary:
+            return load_binary(path, progress, cancelled)
+        return read_json_project(path, progress, cancelled)
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""Simulação síncrona por ciclos de relógio.
+
+Cada ciclo tem dois meios ciclos: os CLOCK passam a 1 (flanco
+ascendente) e depois a 0. Em cada um, a lógica combinacional é avaliada
+e os elementos sequenciais são atualizados:
+
+* DFF: guarda D quando a entrada CLK passa de 0 para 1;
+* LATCH: segue D enquanto EN = 1.
+
+As atualizações de um passo são simultâneas (todos os registos amostram
+antes de algum mudar) e repetem-se até o circuito estabilizar, no máximo
+`settle_limit` vezes; as portas em ciclos combinacionais são resolvidas
+com `CompiledNetlist.settle`. Se não estabilizar, é lançada
+SimulationUnstable.
+
+Quando todos os DFF têm o CLK ligado diretamente a um CLOCK que não
+alimenta mais nada e não há LATCH nem ciclos combinacionais, um ciclo
+reduz-se a amostrar os D, atualizar os Q e avaliar a lógica uma vez por
+nível. Com `jit=True`, esse ciclo é feito por uma função gerada
+(`logicsim.codegen`), quando o circuito o permite.
+
+Com um `recorder` (logicsim.waveform.WaveformRecorder), os valores são
+registados no fim de cada ciclo e após cada alteração de INPUTs, com o
+número do ciclo como instante.
+"""
+from array import array
+
+from . import profiling
+from .core import (
+    OP_CLOCK, OP_DFF, OP_LATCH, SETTLE_LIMIT, X, SimulationUnstable,
+)
+
+class SequentialSimulator:
+    """Estado de um circuito sequencial ao longo dos ciclos.
+
+    `netlist` é um Circuit (o estado inicial vem de `values`: INPUTs,
+    conteúdo dos registos e portas em ciclos) ou uma CompiledNetlist, com
+    `values` opcional.
+    O valor atual de cada porta está em `values`. `jit` ativa o código
+    compilado no caminho rápido.
+    """
+    __slots__ = ("netlist", "values", "state", "cycle", "settle_limit",
+                 "clocks", "_dffs", "_dff_d", "_dff_clk", "_last_clk",
+                 "_latches", "_latch_d", "_latch_en", "_fast", "_jit_run",
+                 "recorder")
+
+    def __init__(self, netlist, values=None, settle_limit=SETTLE_LIMIT,
+                 jit=False, recorder=None):
+        if hasattr(netlist, "compile"):
+            if values is None:
+                values = netlist.values
+            netlist = netlist.compile()
+        self.netlist = netlist
+        self.settle_limit = settle_limit
+        self.cycle = 0
+        n = len(netlist)
+        opcodes, ptr, fanin = netlist.opcodes, netlist.fanin_ptr, netlist.fanin
+
+        # Valores das fontes (INPUTs, estado dos registos, fase do relógio)
+        self.state = state = bytearray(n)
+        if values is not None:
+            for i in netlist.sources:
+                state[i] = values[i]
+        self.clocks = array("i", (i for i in netlist.sources
+                                  if opcodes[i] == OP_CLOCK))
+        for i in self.clocks:
+            state[i] = 0
+
+        self._dffs = array("i", (i for i in netlist.registers
+                                 if opcodes[i] == OP_DFF))
+        self._dff_d = array("i", (fanin[ptr[i]] for i in self._dffs))
+        self._dff_clk = array("i", (fanin[ptr[i] + 1] for i in self._dffs))
+        self._latches = array("i", (i for i in netlist.registers
+                                    if opcodes[i] == OP_LATCH))
+        self._latch_d = array("i", (fanin[ptr[i]] for i in self._latches))
+        self._latch_en = array("i", (fanin[ptr[i] + 1] for i in self._latches))
+
+        # As portas em ciclos (p. ex. um latch feito de portas NOR) guardam
+        # estado: partem do valor dado em `values` ou, sem ele, de 0, como
+        # os registos; com X um ciclo nunca se resolveria
+        seed = values
+        self.values = values = netlist.evaluate(state)
+        for i in netlist.cyclic:
+            values[i] = seed[i] if seed is not None and seed[i] <= 1 else 0
+        self._last_clk = bytearray(values[c] for c in self._dff_clk)
+        self._settle([])
+
+        clocks = set(self.clocks)
+        self._fast = (not self._latches and not netlist.cyclic
+                      and all(c in clocks for c in self._dff_clk)
+                      and not clocks.intersection(self._dff_d)
+                      and all(not netlist.successors(c) for c in clocks))
+        self._jit_run = None
+        if jit and self._fast:
+            from .codegen import cycle_function
+            self._jit_run = cycle_function(netlist, self._dffs, self._dff_d)
+        self.recorder = recorder
+        self._record()
+
+    def set_input(self, gate_id, value):
+        """Altera um INPUT e deixa o circuito estabilizar."""
+        if self.state[gate_id] == value:
+            return
+        self.state[gate_id] = value
+        if self._fast:
+            self.values[gate_id] = value
+            self._evaluate()
+        else:
+            self._settle([gate_id])
+        self._record()
+
+    def apply(self, vector):
+        """Aplica um vetor de entrada ('0101' ou sequência de 0/1)."""
+        inputs = self.netlist.inputs
+        if len(vector) != len(inputs):
+            raise ValueError(f"Vetor inválido para {len(inputs)} INPUTs: "
+                             f"{vector!r}")
+        changed = []
+        for i, bit in zip(inputs, vector):
+            bit = int(bit)
+            if self.state[i] != bit:
+                self.state[i] = bit
+                changed.append(i)
+        if not changed:
+            return
+        if self._fast:
+            for i in changed:
+                self.values[i] = self.state[i]
+            self._evaluate()
+        else:
+            self._settle(changed)
+        self._record()
+
+    def step(self):
+        """Avança um ciclo de relógio."""
+        self.run(1)
+
+    def run(self, cycles):
+        """Avança `cycles` ciclos de relógio."""
+        prof = profiling.active
+        if prof is not None:
+            prof.count("cycles", cycles)
+            with prof.phase("sequential"):
+                self._run(cycles, prof)
+        else:
+            self._run(cycles, None)
+
+    def _run(self, cycles, prof):
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            try:
+                for _ in range(cycles):
+                    self._run(1, prof)
+                    recorder.sample(self.cycle, self.values)
+            finally:
+                self.recorder = recorder
+            return
+        if self._fast and prof is not None:
+            # Um ciclo de cada vez, para contar avaliações e mudanças
+            for _ in range(cycles):
+                old = bytes(self.values)
+                self._run_fast(1)
+                prof.add_evaluations(self.netlist.eval_order)
+                prof.compare(old, self.values)
+        elif self._fast:
+            self._run_fast(cycles)
+        else:
+            state = self.state
+            for _ in range(cycles):
+                for level in (1, 0):
+                    for c in self.clocks:
+                        state[c] = level
+                    self._settle(self.clocks)
+        self.cycle += cycles
+
+    def outputs(self):
+        """Valores dos OUTPUTs (0, 1 ou X), pela ordem dos IDs."""
+        values = self.values
+        return tuple(values[i] for i in self.netlist.outputs)
+
+    def trace(self, vectors):
+        """Para cada vetor: aplica-o, avança um ciclo e produz os OUTPUTs."""
+        for vector in vectors:
+            self.apply(vector)
+            self.step()
+            yield self.outputs()
+
+    def _record(self):
+        if self.recorder is not None:
+            self.recorder.sample(self.cycle, self.values)
+
+    # ---------------------------------------------------------
+    #  Caminho rápido: um só relógio, sem LATCH nem ciclos
+    # ---------------------------------------------------------
+
+    def _evaluator(self):
+        netlist = self.netlist
+        if netlist.macros:
+            return netlist._evaluate_hierarchy, {}
+        return netlist._evaluate_gates, None
+
+    def _evaluate(self):
+        evaluate_gates, outs = self._evaluator()
+        evaluate_gates(self.values, self.netlist.eval_order, outs)
+
+    def _run_fast(self, cycles):
+        values, state = self.values, self.state
+        order = self.netlist.eval_order
+        evaluate_gates, outs = self._evaluator()
+        dffs, dff_d = self._dffs, self._dff_d
+        sources = self.netlist.sources
+        if (cycles and self._jit_run is not None
+                and all(state[i] <= 1 for i in sources)):
+            values[:] = self._jit_run(values, cycles)
+            for i in dffs:
+                state[i] = values[i]
+            return
+        for _ in range(cycles):
+            sampled = [values[d] for d in dff_d]
+            for i, v in zip(dffs, sampled):
+                values[i] = v
+            evaluate_gates(values, order, outs)
+        for i in dffs:
+            state[i] = values[i]
+
+    # ---------------------------------------------------------
+    #  Caminho geral
+    # ---------------------------------------------------------
+
+    def _settle(self, sources):
+        """Propaga `sources` e atualiza registos até estabilizar."""
+        netlist, values, state = self.netlist, self.values, self.state
+        for _ in range(self.settle_limit):
+            if sources and netlist.macros:
+                # As instâncias de componentes não têm propagação por
+                # eventos; a reavaliação completa põe os ciclos a X, por
+                # isso o estado que guardam é reposto antes de `settle`
+                kept = [values[i] for i in netlist.cyclic]
+                values[:] = netlist.evaluate(state)
+                for i, v in zip(netlist.cyclic, kept):
+                    values[i] = v
+            elif sources:
+                netlist.propagate(values, state, sources)
+            if netlist.cyclic:
+                netlist.settle(values, self.settle_limit)
+            sources = self._commit()
+            if not sources:
+                return
+        raise SimulationUnstable(f"Os registos não estabilizaram em "
+                                 f"{self.settle_limit} passos")
+
+    def _commit(self):
+        """Atualiza os registos ativos; devolve os que mudaram."""
+        values, state, last = self.values, self.state, self._last_clk
+        updates = []
+        for k, i in enumerate(self._dffs):
+            clk = values[self._dff_clk[k]]
+            if clk != last[k]:
+                if clk == 1 and last[k] == 0:
+                    updates.append((i, values[self._dff_d[k]]))
+                last[k] = clk
+        for k, i in enumerate(self._latches):
+            en = values[self._latch_en[k]]
+            d = values[self._latch_d[k]]
+            if en == 1:
+                updates.append((i, d))
+            elif en == X and d != state[i]:
+                updates.append((i, X))
+        changed = []
+        for i, v in updates:
+            if state[i] != v:
+                state[i] = v
+                changed.append(i)
+        return changed
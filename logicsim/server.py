@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""Servidor de avaliação: mantém os circuitos compilados entre pedidos.
+
+    python -m logicsim.server --socket /tmp/logicsim.sock
+    python -m logicsim.server --port 8765
+
+Cada pedido é um objeto JSON. Pelo socket Unix, um por linha, com a
+resposta também numa linha (a ligação pode ser reutilizada); por HTTP,
+no corpo de um POST (GET /stats devolve as estatísticas):
+
+    {"op": "evaluate", "project": "p.json", "vectors": ["0101", ...]}
+    -> {"ok": true, "outputs": ["10", ...]}
+    {"op": "evaluate", "project": "p.json", "vector": "0101"}
+    -> {"ok": true, "output": "10"}
+    {"op": "load", "project": "p.json"}
+    -> {"ok": true, "hash": ..., "inputs": [...], "outputs": [...], ...}
+    {"op": "stats"}
+
+Os vetores têm um bit por INPUT e as respostas um carácter ('0', '1' ou
+'X') por OUTPUT, pela ordem de `inputs`/`outputs` da netlist. A avaliação
+é a de `batch.evaluate_packed`, com código compilado quando o circuito o
+permite.
+
+Os circuitos ficam numa cache LRU indexada pelo hash do conteúdo do
+ficheiro; o hash de cada caminho só é recalculado quando o tamanho ou a
+data de modificação mudam. Os pedidos que chegam ao mesmo circuito
+enquanto outro está a ser avaliado são juntados numa única avaliação
+empacotada.
+"""
+import argparse
+import hashlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .batch import evaluate_packed
+from .codegen import JitNetlist, supported
+from .project import load_project
+from .stimulus import pack_lines, unpack_lines
+
+# Circuitos mantidos na cache por omissão
+CACHE_SIZE = 32
+# Tamanho máximo de uma linha de pedido no socket Unix
+MAX_LINE = 1 << 26
+
+# =============================================================
+#  CIRCUITOS EM CACHE
+# =============================================================
+
+class LoadedCircuit:
+    """Um circuito compilado e os pedidos à espera de avaliação.
+
+    O primeiro pedido a chegar avalia; os que chegam entretanto ficam em
+    `_pending` e são avaliados juntos na volta seguinte, pelo mesmo fio.
+    """
+    __slots__ = ("key", "netlist", "inputs", "outputs", "_evaluate",
+                 "_lock", "_pending", "_busy", "batches", "coalesced")
+
+    def __init__(self, key, circuit):
+        self.key = key
+        self.netlist = nl = circuit.compile()
+        self.inputs = list(nl.inputs)
+        self.outputs = list(nl.outputs)
+        if supported(nl):
+            jit = JitNetlist(nl)
+            self._evaluate = jit.evaluate_packed
+            # Gera (ou lê da cache) o código já aqui, fora dos pedidos
+            jit.evaluate_packed([0] * len(self.inputs), 1)
+        else:
+            self._evaluate = lambda words, count: evaluate_packed(nl, words, count)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._busy = False
+        self.batches = 0
+        self.coalesced = 0
+
+    def evaluate(self, lines):
+        """Avalia uma lista de cadeias de bits; devolve as das saídas."""
+        slot = [lines, None, None, threading.Event()]
+        with self._lock:
+            self._pending.append(slot)
+            leader = not self._busy
+            self._busy = True
+        if leader:
+            while True:
+                with self._lock:
+                    batch, self._pending = self._pending, []
+                    if not batch:
+                        self._busy = False
+                        break
+                self._run(batch)
+        else:
+            slot[3].wait()
+        if slot[2] is not None:
+            raise slot[2]
+        return slot[1]
+
+    def _run(self, batch):
+        n_inputs = len(self.inputs)
+        # Um vetor inválido só faz falhar o pedido a que pertence
+        valid = []
+        for slot in batch:
+            bad = next((bits for bits in slot[0] if not isinstance(bits, str)
+                        or len(bits) != n_inputs or bits.strip("01")), None)
+            if bad is None:
+                valid.append(slot)
+            else:
+                slot[2] = ValueError(f"Vetor inválido para {n_inputs} "
+                                     f"INPUTs: {bad!r}")
+                slot[3].set()
+        lines = [bits for slot in valid for bits in slot[0]]
+        try:
+            if lines:
+                words = self._evaluate(pack_lines(lines, n_inputs), len(lines))
+                rows = unpack_lines([words[o] for o in self.outputs],
+                                    len(lines))
+            start = 0
+            for slot in valid:
+                end = start + len(slot[0])
+                slot[1] = rows[start:end] if lines else []
+                start = end
+        except Exception as e:
+            for slot in valid:
+                slot[2] = e
+        self.batches += 1
+        if len(batch) > 1:
+            self.coalesced += len(batch)
+        for slot in valid:
+            slot[3].set()
+
+class CircuitCache:
+    """Cache LRU de LoadedCircuit, indexada pelo hash do ficheiro."""
+
+    def __init__(self, capacity=CACHE_SIZE):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._loading = {}     # hash -> Event, enquanto o ficheiro é lido
+        self._hashes = {}      # caminho -> (mtime, tamanho, hash)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._evicted = [0, 0]   # batches e coalesced das entradas removidas
+
+    def content_hash(self, path):
+        """sha256 do ficheiro, reaproveitado enquanto este não mudar."""
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        known = self._hashes.get(path)
+        if known is not None and known[:2] == stamp:
+            return known[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        if len(self._hashes) >= 4 * self.capacity:
+            self._hashes.clear()
+        self._hashes[path] = stamp + (digest,)
+        return digest
+
+    def get(self, path):
+        """LoadedCircuit do projeto em `path`, lido só se não estiver em
+        cache. Leituras simultâneas do mesmo conteúdo esperam pela
+        primeira."""
+        key = self.content_hash(path)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                waiting = self._loading.get(key)
+                if waiting is None:
+                    self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+            waiting.wait()
+        try:
+            entry = LoadedCircuit(key, load_project(path))
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.capacity:
+                    old = self._entries.popitem(last=False)[1]
+                    self._evicted[0] += old.batches
+                    self._evicted[1] += old.coalesced
+                    self.evictions += 1
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+        return entry
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            batches, coalesced = self._evicted
+        return {"cached": len(entries), "capacity": self.capacity,
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions,
+                "batches": batches + sum(e.batches for e in entries),
+                "coalesced": coalesced + sum(e.coalesced for e in entries)}
+
+# =============================================================
+#  PEDIDOS
+# =============================================================
+
+class EvaluationService:
+    """Responde aos pedidos JSON, qualquer que seja o transporte."""
+
+    def __init__(self, capacity=CACHE_SIZE):
+        self.cache = CircuitCache(capacity)
+        self.requests = 0
+
+    def handle(self, request):
+        """Devolve a resposta (um dict) a um pedido já descodificado."""
+        self.requests += 1
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("O pedido deve ser um objeto JSON")
+            op = request.get("op", "evaluate")
+            if op == "stats":
+                return dict(self.cache.stats(), ok=True,
+                            requests=self.requests)
+            if "project" not in request:
+                raise ValueError("Falta o campo 'project'")
+            entry = self.cache.get(request["project"])
+            if op == "load":
+                return {"ok": True, "hash": entry.key, "inputs": entry.inputs,
+                        "outputs": entry.outputs, "gates": len(entry.netlist)}
+            if op != "evaluate":
+                raise ValueError(f"Operação desconhecida: {op!r}")
+            if "vector" in request:
+                return {"ok": True,
+                        "output": entry.evaluate([request["vector"]])[0]}
+            vectors = request.get("vectors")
+            if not isinstance(vectors, list):
+                raise ValueError("Falta a lista 'vectors' (ou 'vector')")
+            return {"ok": True, "outputs": entry.evaluate(vectors)}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+class _StreamHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        for line in iter(lambda: self.rfile.readline(MAX_LINE), b""):
+            if not line.strip():
+                continue
+            try:
+                response = service.handle(json.loads(line))
+            except ValueError as e:
+                response = {"ok": False, "error": f"JSON inválido: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+class _HttpHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # ligações persistentes
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            response = self.server.service.handle(
+                json.loads(self.rfile.read(length)))
+        except ValueError as e:
+            response = {"ok": False, "error": f"JSON inválido: {e}"}
+        self._reply(200 if response["ok"] else 400, response)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._reply(200, self.server.service.handle({"op": "stats"}))
+        else:
+            self._reply(404, {"ok": False, "error": "Use POST ou GET /stats"})
+
+    def _reply(self, status, response):
+        body = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+class _HttpServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+def make_server(service, socket_path=None, port=None, host="127.0.0.1"):
+    """Cria o servidor (socket Unix ou HTTP local); falta `serve_forever`."""
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)   # socket deixado por outra execução
+        server = _UnixServer(socket_path, _StreamHandler)
+    else:
+        server = _HttpServer((host, port), _HttpHandler)
+    server.service = service
+    return server
+
+# =============================================================
+#  CLIENTE
+# =============================================================
+
+class Client:
+    """Cliente do socket Unix, com uma ligação persistente."""
+
+    def __init__(self, socket_path):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(socket_path)
+        self._file = self._sock.makefile("rwb")
+
+    def request(self, request):
+        """Envia um pedido e devolve a resposta; ValueError se falhar."""
+        self._file.write(json.dumps(request).encode() + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("O servidor fechou a ligação")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise ValueError(response.get("error"))
+        return response
+
+    def evaluate(self, project, vectors):
+        """Cadeias das saídas para cada vetor ('0101') de `vectors`."""
+        return self.request({"op": "evaluate", "project": str(project),
+                             "vectors": list(vectors)})["outputs"]
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# =============================================================
+#  LINHA DE COMANDOS
+# =============================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m logicsim.server",
+        description="Serve avaliações de projetos, mantendo-os compilados "
+                    "em memória.")
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument("--socket", metavar="CAMINHO",
+        help="escuta num socket Unix (um pedido JSON por linha)")
+    where.add_argument("--port", type=int,
+        help="escuta em HTTP, só em localhost")
+    parser.add_argument("--cache", type=int, default=CACHE_SIZE, metavar="N",
+        help=f"circuitos mantidos em memória (por omissão {CACHE_SIZE})")
+    args = parser.parse_args(argv)
+
+    server = make_server(EvaluationService(args.cache), args.socket, args.port)
+    where = args.socket or "http://127.0.0.1:%d" % server.server_address[1]
+    print(f"À escuta em {where}", file=sys.stderr)
+    # SIGTERM termina como Ctrl+C, para remover o socket
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket:
+            os.unlink(args.socket)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Ficheiros de estímulos: um vetor de entrada por linha.
+
+Cada linha tem um carácter 0/1 por INPUT, pela ordem dos IDs (espaços e
+'_' são ignorados, '#' inicia um comentário). Os resultados usam o mesmo
+formato, com 'X' para saídas não determinadas.
+"""
+import os
+
+def parse_line(line):
+    """Devolve a cadeia de bits de uma linha, ou None se estiver vazia."""
+    line = line.split("#", 1)[0]
+    bits = line.replace(" ", "").replace("\t", "").replace("_", "").strip()
+    return bits or None
+
+def read_vectors(path):
+    """Produz os vetores de um ficheiro de estímulos, um de cada vez."""
+    with open(path, "r") as f:
+        for line in f:
+            bits = parse_line(line)
+            if bits is not None:
+                yield bits
+
+def shard_ranges(path, shard_bytes):
+    """Divide o ficheiro em intervalos de bytes alinhados com as linhas."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + shard_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def read_range(path, start, end):
+    """Lê os vetores contidos no intervalo [start, end) do ficheiro."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        chunk = f.read(end - start).decode("ascii")
+    return [b for b in map(parse_line, chunk.splitlines()) if b is not None]
+
+def pack_lines(lines, n_inputs):
+    """Empacota cadeias de bits numa palavra int por INPUT (bit k = linha k)."""
+    for bits in lines:
+        if len(bits) != n_inputs or bits.strip("01"):
+            raise ValueError(f"Vetor inválido para {n_inputs} INPUTs: {bits!r}")
+    if not lines:
+        return [0] * n_inputs
+    return [int("".join(reversed(column)), 2) for column in zip(*lines)]
+
+def unpack_lines(words, count):
+    """Inverso de `pack_lines` para as palavras dos OUTPUTs."""
+    columns = [format(w, f"0{count}b")[::-1][:count] if w is not None
+               else "X" * count for w in words]
+    if not columns:
+        return [""] * count
+    return ["".join(row) for row in zip(*columns)]
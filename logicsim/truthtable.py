@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Tabelas de verdade exaustivas e verificação de equivalência.
+
+O espaço de entradas é percorrido em lotes bit-paralelos: os `BATCH_BITS`
+INPUTs de menor ordem variam dentro de cada palavra e os restantes são
+constantes em cada lote. Nada é materializado: as linhas são produzidas
+à medida que são calculadas.
+"""
+import multiprocessing
+
+from .batch import evaluate_packed
+
+# Cada lote cobre 2**BATCH_BITS linhas da tabela
+BATCH_BITS = 14
+# A partir de quantos INPUTs a verificação usa vários processos
+PARALLEL_INPUTS = 20
+# Lotes por tarefa enviada a cada processo
+BATCHES_PER_TASK = 8
+
+# =============================================================
+#  ENUMERAÇÃO EM LOTES
+# =============================================================
+
+def _input_patterns(k):
+    """Palavras com as 2**k combinações dos primeiros k INPUTs.
+
+    No padrão j, o bit m vale (m >> j) & 1.
+    """
+    size = 1 << k
+    patterns = []
+    for j in range(k):
+        half = 1 << j
+        pattern = ((1 << half) - 1) << half
+        width = 2 * half
+        while width < size:
+            pattern |= pattern << width
+            width *= 2
+        patterns.append(pattern)
+    return patterns
+
+class _Enumerator:
+    """Gera as palavras de entrada de cada lote de um circuito."""
+    def __init__(self, n_inputs):
+        self.n_inputs = n_inputs
+        self.k = min(n_inputs, BATCH_BITS)
+        self.rows = 1 << self.k
+        self.n_batches = 1 << (n_inputs - self.k)
+        self.mask = (1 << self.rows) - 1
+        self.patterns = _input_patterns(self.k)
+
+    def words(self, batch):
+        high = [self.mask if (batch >> j) & 1 else 0
+                for j in range(self.n_inputs - self.k)]
+        return self.patterns + high
+
+def _compiled(netlist):
+    return netlist.compile() if hasattr(netlist, "compile") else netlist
+
+def _outputs(result, netlist):
+    words = [result[i] for i in netlist.outputs]
+    if any(w is None for w in words):
+        raise ValueError("Há OUTPUTs não determinados "
+                         "(entradas desligadas ou ciclos)")
+    return words
+
+def iter_batches(netlist):
+    """Produz (primeira linha, nº de linhas, palavras dos OUTPUTs) por lote."""
+    netlist = _compiled(netlist)
+    enum = _Enumerator(len(netlist.inputs))
+    for b in range(enum.n_batches):
+        result = evaluate_packed(netlist, enum.words(b), enum.rows)
+        yield b * enum.rows, enum.rows, _outputs(result, netlist)
+
+def iter_truth_table(netlist):
+    """Produz cada linha como (bits dos INPUTs, bits dos OUTPUTs).
+
+    O INPUT de menor ID é o bit menos significativo do índice da linha.
+    """
+    netlist = _compiled(netlist)
+    n = len(netlist.inputs)
+    for base, count, words in iter_batches(netlist):
+        for m in range(count):
+            row = base + m
+            yield (tuple((row >> j) & 1 for j in range(n)),
+                   tuple((w >> m) & 1 for w in words))
+
+def write_truth_table(netlist, f):
+    """Escreve a tabela de verdade em texto, linha a linha, para `f`."""
+    netlist = _compiled(netlist)
+    f.write(" ".join([f"I{i}" for i in netlist.inputs] + ["|"] +
+                     [f"O{i}" for i in netlist.outputs]) + "\n")
+    for ins, outs in iter_truth_table(netlist):
+        f.write(" ".join(map(str, ins)) + " | " +
+                " ".join(map(str, outs)) + "\n")
+
+# =============================================================
+#  EQUIVALÊNCIA
+# =============================================================
+
+def _first_mismatch(a, b, enum, batches):
+    """Procura a primeira linha em que `a` e `b` diferem nos lotes dados."""
+    for batch in batches:
+        words = enum.words(batch)
+        wa = _outputs(evaluate_packed(a, words, enum.rows), a)
+        wb = _outputs(evaluate_packed(b, words, enum.rows), b)
+        diff = 0
+        for x, y in zip(wa, wb):
+            diff |= x ^ y
+        if diff:
+            return batch * enum.rows + (diff & -diff).bit_length() - 1
+    return None
+
+_worker = None
+
+def _init_worker(a, b, n_inputs):
+    global _worker
+    _worker = (a, b, _Enumerator(n_inputs))
+
+def _check_batches(batches):
+    a, b, enum = _worker
+    return _first_mismatch(a, b, enum, batches)
+
+def check_equivalence(a, b, processes=None):
+    """Verifica se dois circuitos implementam a mesma função.
+
+    INPUTs e OUTPUTs são emparelhados pela ordem dos IDs. Devolve None se
+    forem equivalentes ou um contraexemplo (bits dos INPUTs, OUTPUTs de
+    `a`, OUTPUTs de `b`). Pára no primeiro desacordo encontrado; com
+    `PARALLEL_INPUTS` ou mais INPUTs, os lotes são divididos por
+    `processes` processos (por omissão, um por núcleo).
+    """
+    a, b = _compiled(a), _compiled(b)
+    if len(a.inputs) != len(b.inputs) or len(a.outputs) != len(b.outputs):
+        raise ValueError("Os circuitos têm números diferentes de "
+                         "INPUTs ou OUTPUTs")
+    n = len(a.inputs)
+    enum = _Enumerator(n)
+
+    if n < PARALLEL_INPUTS or processes == 1:
+        row = _first_mismatch(a, b, enum, range(enum.n_batches))
+    else:
+        tasks = (range(s, min(s + BATCHES_PER_TASK, enum.n_batches))
+                 for s in range(0, enum.n_batches, BATCHES_PER_TASK))
+        row = None
+        with multiprocessing.Pool(processes, _init_worker, (a, b, n)) as pool:
+            for found in pool.imap_unordered(_check_batches, tasks):
+                if found is not None:
+                    row = found
+                    break
+    if row is None:
+        return None
+
+    bits = tuple((row >> j) & 1 for j in range(n))
+    return bits, _row_outputs(a, bits), _row_outputs(b, bits)
+
+def _row_outputs(netlist, bits):
+    result = evaluate_packed(netlist, list(bits), 1)
+    return tuple(result[i] for i in netlist.outputs)
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Registo de formas de onda e exportação para VCD.
+
+Um WaveformRecorder acompanha um conjunto de portas (sondas) e guarda só
+as alterações de valor, num buffer circular de tamanho fixo: cada
+alteração ocupa 13 bytes (instante, sonda, valor), seja qual for a
+duração da simulação.
+
+Quando o buffer enche, a alteração mais antiga sai da janela. Se houver
+um VCDWriter associado (`sink`), é escrita no ficheiro antes de sair e
+nada se perde; sem ele, passa a fazer parte dos valores iniciais da
+janela e o registo guarda só o fim da simulação.
+
+O formato VCD (IEEE 1364) é lido por visualizadores como o GTKWave.
+"""
+import re
+from array import array
+
+from .core import X
+
+# Alterações guardadas por omissão (cerca de 13 MB)
+DEFAULT_CAPACITY = 1 << 20
+
+_VCD_VALUES = "01x"
+
+class WaveformRecorder:
+    """Alterações de valor das portas `probes` ao longo do tempo.
+
+    `names` são os nomes das sondas no VCD (por omissão, "g<ID>").
+    """
+    __slots__ = ("probes", "names", "capacity", "sink", "base", "base_time",
+                 "last", "dropped", "_index", "_times", "_slots", "_levels",
+                 "_start", "_count")
+
+    def __init__(self, probes, names=None, capacity=DEFAULT_CAPACITY,
+                 sink=None):
+        self.probes = array("i", probes)
+        if names is None:
+            names = [f"g{i}" for i in self.probes]
+        if len(names) != len(self.probes):
+            raise ValueError("É preciso um nome por sonda")
+        self.names = list(names)
+        if capacity < 1:
+            raise ValueError("A capacidade tem de ser positiva")
+        self.capacity = capacity
+        self.sink = sink
+        # Valores das sondas no início da janela (None antes da 1.ª amostra)
+        self.base = None
+        self.base_time = 0
+        self.last = None
+        self.dropped = 0
+        self._index = {i: k for k, i in enumerate(self.probes)}
+        self._times = array("q", [0]) * capacity
+        self._slots = array("i", [0]) * capacity
+        self._levels = bytearray(capacity)
+        self._start = self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def sample(self, time, values, ids=None):
+        """Regista os valores das sondas no instante `time`.
+
+        `values` é um buffer de valores por porta; `ids`, se indicado,
+        limita a verificação às portas que podem ter mudado.
+        """
+        if self.last is None:
+            self.base = bytearray(values[i] for i in self.probes)
+            self.last = bytearray(self.base)
+            self.base_time = time
+            if self.sink is not None:
+                self.sink.dump(time, self.base)
+            return
+        last = self.last
+        if ids is None:
+            slots = range(len(self.probes))
+        else:
+            index = self._index
+            slots = [index[i] for i in ids if i in index]
+        probes = self.probes
+        for k in slots:
+            v = values[probes[k]]
+            if v != last[k]:
+                last[k] = v
+                self._push(time, k, v)
+
+    def _push(self, time, k, v):
+        cap = self.capacity
+        if self._count == cap:
+            # Buffer cheio: a alteração mais antiga sai da janela
+            s = self._start
+            t, old_k, old_v = self._times[s], self._slots[s], self._levels[s]
+            if self.sink is not None:
+                self.sink.change(t, old_k, old_v)
+            else:
+                self.base[old_k] = old_v
+                self.base_time = t
+                self.dropped += 1
+            self._start = (s + 1) % cap
+            self._count -= 1
+        p = (self._start + self._count) % cap
+        self._times[p] = time
+        self._slots[p] = k
+        self._levels[p] = v
+        self._count += 1
+
+    def changes(self):
+        """Alterações na janela, por ordem: (instante, sonda, valor)."""
+        cap, start = self.capacity, self._start
+        for n in range(self._count):
+            p = (start + n) % cap
+            yield self._times[p], self._slots[p], self._levels[p]
+
+    def waveform(self, k):
+        """Pares (instante, valor) da sonda `k`, desde o início da janela."""
+        if self.base is None:
+            return []
+        points = [(self.base_time, self.base[k])]
+        points.extend((t, v) for t, s, v in self.changes() if s == k)
+        return points
+
+    def flush(self):
+        """Escreve no `sink` as alterações ainda no buffer e esvazia-o."""
+        if self.sink is None:
+            return
+        for t, k, v in self.changes():
+            self.sink.change(t, k, v)
+        self._start = self._count = 0
+
+    def write_vcd(self, f, timescale="1 ns"):
+        """Escreve a janela atual num ficheiro VCD aberto em modo texto."""
+        writer = VCDWriter(f, self.names, timescale)
+        if self.base is not None:
+            writer.dump(self.base_time, self.base)
+            for t, k, v in self.changes():
+                writer.change(t, k, v)
+
+# =============================================================
+#  VCD
+# =============================================================
+
+def _identifier(k):
+    """Identificador VCD curto (caracteres ASCII 33 a 126)."""
+    chars = []
+    while True:
+        chars.append(chr(33 + k % 94))
+        k //= 94
+        if not k:
+            return "".join(chars)
+
+def _vcd_name(name):
+    return re.sub(r"\s+", "_", str(name)) or "_"
+
+class VCDWriter:
+    """Escrita incremental de um ficheiro VCD com sinais de 1 bit."""
+    __slots__ = ("f", "names", "timescale", "codes", "time")
+
+    def __init__(self, f, names, timescale="1 ns"):
+        self.f = f
+        self.names = [_vcd_name(n) for n in names]
+        self.timescale = timescale
+        self.codes = [_identifier(k) for k in range(len(names))]
+        self.time = None
+
+    def dump(self, time, values):
+        """Cabeçalho e valores iniciais, no instante `time`."""
+        f = self.f
+        f.write(f"$timescale {self.timescale} $end\n")
+        f.write("$scope module logicsim $end\n")
+        for code, name in zip(self.codes, self.names):
+            f.write(f"$var wire 1 {code} {name} $end\n")
+        f.write("$upscope $end\n$enddefinitions $end\n")
+        f.write(f"#{time}\n$dumpvars\n")
+        for code, v in zip(self.codes, values):
+            f.write(f"{_VCD_VALUES[min(v, X)]}{code}\n")
+        f.write("$end\n")
+        self.time = time
+
+    def change(self, time, k, value):
+        if time != self.time:
+            self.f.write(f"#{time}\n")
+            self.time = time
+        self.f.write(f"{_VCD_VALUES[min(value, X)]}{self.codes[k]}\n")
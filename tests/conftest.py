@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+
+GUI = Path(__file__).resolve().parent.parent / "Simulador-Portas-Lógicas-0.py"
+
+@pytest.fixture(scope="session")
+def gui():
+    """Módulo da interface, com Qt sem ecrã; ignorado sem PySide6."""
+    pytest.importorskip("PySide6")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    spec = importlib.util.spec_from_file_location("simulador", GUI)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.app = app   # mantém a aplicação viva durante os testes
+    return module
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""Linha de comandos (python -m logicsim)."""
+import pytest
+
+from logicsim.__main__ import main
+
+def test_missing_project(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(tmp_path / "nao_existe.json")])
+    assert exit_info.value.code == 2
+    err = capsys.readouterr().err
+    assert err.startswith("logicsim: ") and err.count("\n") == 1
+
+def test_vcd_needs_cycles(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["projeto.json", "--vcd", str(tmp_path / "ondas.vcd")])
+    assert exit_info.value.code == 2
+    assert "--vcd precisa de --cycles" in capsys.readouterr().err
+    assert not (tmp_path / "ondas.vcd").exists()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Compilação para código Python e cache em disco (logicsim.codegen)."""
+import random
+
+import pytest
+
+from logicsim import Circuit, codegen
+from logicsim.batch import evaluate_packed
+from logicsim.codegen import JitNetlist, structural_hash
+from logicsim.generators import random_dag
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Cache vazia numa pasta temporária, sem funções já carregadas."""
+    monkeypatch.setenv("LOGICSIM_CACHE", str(tmp_path))
+    monkeypatch.setattr(codegen, "_loaded", {})
+    return tmp_path
+
+def test_evaluate_matches_interpreter(cache):
+    c = random_dag(500, n_inputs=16, n_outputs=16, seed=4, window=40)
+    netlist = c.compile()
+    jit = JitNetlist(netlist)
+    rng = random.Random(4)
+    for _ in range(20):
+        for i in c.inputs():
+            c.values[i] = rng.randint(0, 1)
+        expected = netlist.evaluate(c.values)
+        values = jit.evaluate(c.values)
+        assert [values[o] for o in c.outputs()] == \
+            [expected[o] for o in c.outputs()]
+
+def test_unconnected_input_is_x(cache):
+    c = Circuit()
+    a = c.add_gate("INPUT")
+    g = c.add_gate("AND")
+    o = c.add_gate("OUTPUT")
+    c.connect(a, g, 0)   # entrada 1 desligada
+    c.connect(g, o)
+    for v in (0, 1):
+        c.values[a] = v
+        assert JitNetlist(c).evaluate(c.values)[o] == c.evaluate()[o]
+
+def test_evaluate_packed_matches_batch(cache):
+    c = random_dag(500, n_inputs=16, n_outputs=16, seed=5, window=40)
+    rng = random.Random(5)
+    words = [rng.getrandbits(256) for _ in c.inputs()]
+    assert JitNetlist(c).evaluate_packed(words, 256) == \
+        evaluate_packed(c.compile(), words, 256)
+
+def test_compiled_code_is_reused_from_disk(cache, monkeypatch):
+    c = random_dag(100, n_inputs=8, n_outputs=8, seed=6)
+    expected = JitNetlist(c).evaluate(c.values)
+    files = list(cache.iterdir())
+    assert len(files) == 1
+
+    # Noutro processo (sem funções carregadas) o código vem da cache
+    monkeypatch.setattr(codegen, "_loaded", {})
+    def no_compile(*args):
+        raise AssertionError("o código devia vir da cache")
+    monkeypatch.setattr(codegen, "compile", no_compile, raising=False)
+    copy = random_dag(100, n_inputs=8, n_outputs=8, seed=6)
+    assert structural_hash(copy.compile()) == structural_hash(c.compile())
+    assert JitNetlist(copy).evaluate(copy.values) == expected
+    assert list(cache.iterdir()) == files
+
+def test_structural_hash_follows_topology():
+    c = random_dag(100, n_inputs=8, n_outputs=8, seed=7)
+    before = structural_hash(c.compile())
+    c.connect(c.inputs()[0], c.outputs()[0])
+    assert structural_hash(c.compile()) != before
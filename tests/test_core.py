@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""Avaliação e propagação incremental (logicsim.core)."""
+import random
+
+import pytest
+
+from logicsim import Circuit
+from logicsim.generators import random_dag
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_set_input_matches_full_evaluate(seed):
+    circuit = random_dag(300, n_inputs=8, n_outputs=8, seed=seed, window=20)
+    circuit.evaluate()
+    rng = random.Random(seed)
+    inputs = circuit.inputs()
+    for _ in range(50):
+        before = bytes(circuit.result)
+        changed = circuit.set_input(rng.choice(inputs), rng.randint(0, 1))
+        after = bytes(circuit.result)
+        assert after == bytes(circuit.compile().evaluate(circuit.values))
+        assert {i for i in range(len(circuit)) if before[i] != after[i]} \
+            <= set(changed)
+
+def test_set_input_after_edit_evaluates_again():
+    c = Circuit()
+    a = c.add_gate("INPUT")
+    n = c.add_gate("NOT")
+    o = c.add_gate("OUTPUT")
+    c.connect(a, n)
+    c.evaluate()
+    c.connect(n, o)   # nova topologia: o resultado anterior já não serve
+    c.set_input(a, 1)
+    assert c.result[o] == 0
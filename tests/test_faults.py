@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Simulação de falhas stuck-at (logicsim.faults)."""
+import random
+
+import pytest
+
+from logicsim import GATE_NAMES, GATE_TYPES
+from logicsim.core import IS_SOURCE
+from logicsim.faults import FaultSimulator, fault_list
+from logicsim.generators import random_dag, ripple_carry_adder
+
+def _faulty_outputs(netlist, bits, fault=None):
+    """OUTPUTs com a falha injetada, porta a porta pela ordem topológica."""
+    g_fault, pin_fault, v_fault = fault if fault else (None, None, None)
+    values = [0] * len(netlist)
+    for i, b in zip(netlist.inputs, bits):
+        values[i] = b
+    ptr = netlist.fanin_ptr
+    for g in netlist.order:
+        if not IS_SOURCE[netlist.opcodes[g]]:
+            operands = [values[d] for d in netlist.fanin[ptr[g]:ptr[g + 1]]]
+            if g == g_fault and pin_fault >= 0:
+                operands[pin_fault] = v_fault
+            values[g] = GATE_TYPES[GATE_NAMES[netlist.opcodes[g]]](operands)
+        if g == g_fault and pin_fault < 0:
+            values[g] = v_fault
+    return [values[o] for o in netlist.outputs]
+
+def _first_detections(netlist, vectors):
+    """Primeiro vetor que deteta cada falha, por força bruta."""
+    good = [_faulty_outputs(netlist, v) for v in vectors]
+    detected = {}
+    for fault in fault_list(netlist):
+        for k, v in enumerate(vectors):
+            if _faulty_outputs(netlist, v, fault) != good[k]:
+                detected[fault] = k
+                break
+    return detected
+
+@pytest.mark.parametrize("make", [lambda: ripple_carry_adder(3),
+                                  lambda: random_dag(80, n_inputs=7,
+                                                     n_outputs=5, seed=8,
+                                                     window=12)],
+                         ids=["adder", "random"])
+def test_detections_match_brute_force(make):
+    circuit = make()
+    netlist = circuit.compile()
+    rng = random.Random(8)
+    vectors = [[rng.randint(0, 1) for _ in netlist.inputs] for _ in range(40)]
+    # A referência sem falhas é a avaliação normal
+    for v in vectors:
+        for i, b in zip(netlist.inputs, v):
+            circuit.values[i] = b
+        values = circuit.evaluate()
+        assert _faulty_outputs(netlist, v) == [values[o] for o in netlist.outputs]
+
+    # Lotes pequenos: as falhas detetadas deixam de ser simuladas
+    sim = FaultSimulator(netlist)
+    report = sim.run(("".join(map(str, v)) for v in vectors), block=8)
+    assert report.detected == _first_detections(netlist, vectors)
+    # Sem falhas por detetar, os lotes seguintes já não são simulados
+    assert report.patterns == 40 or not sim.pending
+    assert set(sim.pending).isdisjoint(report.detected)
+
+def test_detected_faults_are_dropped():
+    netlist = ripple_carry_adder(2).compile()
+    sim = FaultSimulator(netlist)
+    n = len(netlist.inputs)
+    everything = [format(k, f"0{n}b") for k in range(1 << n)]
+    report = sim.run(everything)
+    assert not sim.pending
+    assert report.coverage == 1.0
+    # Simular mais vetores não altera o primeiro vetor de cada deteção
+    first = dict(report.detected)
+    sim.run(everything)
+    assert report.detected == first
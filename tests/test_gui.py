@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Partes da interface que correm sem ecrã."""
+
+def test_project_loader_reports_any_error(gui, tmp_path, monkeypatch):
+    def broken(*args):
+        raise IndexError("list index out of range")
+    monkeypatch.setattr(gui, "load_project", broken)
+    loader = gui.ProjectLoader(str(tmp_path / "p.json"))
+    failed, loaded = [], []
+    loader.failed.connect(failed.append)
+    loader.loaded.connect(loaded.append)
+    loader.run()
+    assert failed == ["list index out of range"] and not loaded
+
+def _nor_latch(gui, scene):
+    s, r, q, qn = (gui.GateItem(t) for t in ("INPUT", "INPUT", "NOR", "NOR"))
+    for g in (s, r, q, qn):
+        scene.addGate(g)
+    scene.addWire(r.output, q.inputs[0])
+    scene.addWire(qn.output, q.inputs[1])
+    scene.addWire(s.output, qn.inputs[0])
+    scene.addWire(q.output, qn.inputs[1])
+    return s, r, q
+
+def test_cycle_warning_once_per_netlist(gui, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(gui.QMessageBox, "warning",
+                        lambda *args: warnings.append(args[1]))
+    scene = gui.LogicScene()
+    s, r, q = _nor_latch(gui, scene)
+    scene.evaluate()
+    scene.evaluate()
+    assert warnings == ["Ciclo detetado"]
+    # Uma nova topologia volta a ser assinalada
+    scene.addGate(gui.GateItem("OUTPUT"))
+    scene.evaluate()
+    assert len(warnings) == 2
+
+def test_unknown_values_are_shown(gui):
+    scene = gui.LogicScene()
+    a, g = gui.GateItem("INPUT"), gui.GateItem("AND")
+    scene.addGate(a)
+    scene.addGate(g)
+    scene.addWire(a.output, g.inputs[0])
+    a.value, g.value = 1, 1
+    # Com uma entrada desligada o AND fica X, não com o 1 anterior
+    scene.evaluate()
+    assert g.value == gui.X
+
+def test_step_clock_shows_unknown_register_state(gui):
+    scene = gui.LogicScene()
+    d, latch = gui.GateItem("INPUT"), gui.GateItem("LATCH")
+    scene.addGate(d)
+    scene.addGate(latch)
+    scene.addWire(d.output, latch.inputs[0])
+    d.value = 1
+    # EN desligado (X) com D diferente do estado: o estado fica X
+    scene.stepClock()
+    assert latch.value == gui.X
+
+def test_simulation_worker_reports_any_error(gui):
+    class Broken:
+        def evaluate(self, *args):
+            raise MemoryError()
+    worker = gui.SimulationWorker(Broken(), bytearray())
+    failed, done = [], []
+    worker.failed.connect(failed.append)
+    worker.simulated.connect(lambda *args: done.append(args))
+    worker.run()
+    assert failed == ["MemoryError"] and not done
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Netlists BLIF e Verilog (logicsim.interchange)."""
+import pytest
+
+from logicsim import MacroDefinition, load_project, save_project
+from logicsim.codegen import JitNetlist
+from logicsim.truthtable import check_equivalence, iter_truth_table
+
+CONSTANTS_BLIF = """\
+.model constantes
+.outputs zero um
+.names zero
+.names um
+1
+.end
+"""
+
+CONSTANTS_VERILOG = """\
+module constantes(a, zero, um, y);
+  input a;
+  output zero, um, y;
+  assign zero = 1'b0;
+  assign um = 1'b1;
+  assign y = ~a;
+endmodule
+"""
+
+def _outputs(circuit):
+    values = circuit.evaluate()
+    return [values[o] for o in circuit.outputs()]
+
+@pytest.mark.parametrize("ext", ["blif", "v"])
+def test_constants_without_inputs_keep_interface(tmp_path, ext):
+    source = tmp_path / "constantes.blif"
+    source.write_text(CONSTANTS_BLIF)
+    circuit = load_project(str(source))
+    assert circuit.inputs() == []
+    assert _outputs(circuit) == [0, 1]
+
+    copy = tmp_path / f"copia.{ext}"
+    save_project(circuit, str(copy))
+    again = load_project(str(copy))
+    assert again.inputs() == []
+    assert _outputs(again) == [0, 1]
+
+def test_constants_with_inputs_keep_interface(tmp_path):
+    source = tmp_path / "constantes.v"
+    source.write_text(CONSTANTS_VERILOG)
+    circuit = load_project(str(source))
+    assert len(circuit.inputs()) == 1
+    copy = tmp_path / "copia.blif"
+    save_project(circuit, str(copy))
+    assert len(load_project(str(copy)).inputs()) == 1
+
+@pytest.mark.parametrize("name, text", [("constantes.blif", CONSTANTS_BLIF),
+                                        ("constantes.v", CONSTANTS_VERILOG)],
+                         ids=["blif", "v"])
+def test_constants_are_gates_not_registers(tmp_path, monkeypatch, name, text):
+    monkeypatch.setenv("LOGICSIM_CACHE", str(tmp_path / "cache"))
+    source = tmp_path / name
+    source.write_text(text)
+    circuit = load_project(str(source))
+    assert len(circuit.compile().registers) == 0
+    MacroDefinition("constantes", circuit, collapse=True)
+
+    copy = tmp_path / "copia.blif"
+    save_project(circuit, str(copy))
+    assert ".latch" not in copy.read_text()
+
+    # Tabela de verdade, equivalência e código gerado concordam com evaluate
+    rows = list(iter_truth_table(circuit))
+    jit = JitNetlist(circuit.compile())
+    inputs = circuit.inputs()
+    for row in range(1 << len(inputs)):
+        bits = tuple((row >> j) & 1 for j in range(len(inputs)))
+        for i, b in zip(inputs, bits):
+            circuit.values[i] = b
+        assert rows[row] == (bits, tuple(_outputs(circuit)))
+        values = jit.evaluate(circuit.values)
+        assert [values[o] for o in circuit.outputs()] == _outputs(circuit)
+    assert check_equivalence(circuit, load_project(str(copy))) is None
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Componentes e redução a tabela (logicsim.macros)."""
+import pytest
+
+from logicsim import Circuit, MacroDefinition
+from logicsim.batch import evaluate_packed
+from logicsim.generators import ripple_carry_adder
+
+def _adder_from_components(n, definition):
+    """Somador de n bits com uma instância de `definition` por bit.
+
+    INPUTs e OUTPUTs na mesma ordem que `ripple_carry_adder(n)`.
+    """
+    c = Circuit()
+    a = [c.add_gate("INPUT") for _ in range(n)]
+    b = [c.add_gate("INPUT") for _ in range(n)]
+    carry = c.add_gate("INPUT")
+    sums = []
+    for k in range(n):
+        macro, s, cout = c.add_macro(definition)
+        for pin, src in enumerate((a[k], b[k], carry)):
+            c.connect(src, macro, pin)
+        sums.append(s)
+        carry = cout
+    for src in sums + [carry]:
+        c.connect(src, c.add_gate("OUTPUT"))
+    return c
+
+def _outputs(circuit, bits):
+    for i, b in zip(circuit.inputs(), bits):
+        circuit.values[i] = b
+    values = circuit.evaluate()
+    return [values[o] for o in circuit.outputs()]
+
+def test_collapsed_definition_matches_gates():
+    plain = MacroDefinition("fa", ripple_carry_adder(1))
+    collapsed = MacroDefinition("fa", ripple_carry_adder(1), collapse=True)
+    assert plain.lut is None and collapsed.lut is not None
+    for index in range(8):
+        assert collapsed.evaluate_index(index) == plain.evaluate_index(index)
+
+@pytest.mark.parametrize("collapse", [False, True])
+def test_adder_of_components_matches_flat_adder(collapse):
+    n = 3
+    flat = ripple_carry_adder(n)
+    definition = MacroDefinition("fa", ripple_carry_adder(1), collapse=collapse)
+    built = _adder_from_components(n, definition)
+    rows = 1 << (2 * n + 1)
+    for row in range(rows):
+        bits = [(row >> j) & 1 for j in range(2 * n + 1)]
+        assert _outputs(built, bits) == _outputs(flat, bits)
+
+    # Avaliação bit-paralela de todas as linhas de uma vez
+    words = [sum(((row >> j) & 1) << row for row in range(rows))
+             for j in range(2 * n + 1)]
+    packed = evaluate_packed(built.compile(), words, rows)
+    expected = evaluate_packed(flat.compile(), words, rows)
+    assert ([packed[o] for o in built.outputs()]
+            == [expected[o] for o in flat.outputs()])
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Otimização da netlist (logicsim.optimize)."""
+import pytest
+
+from logicsim import Circuit
+from logicsim.generators import random_dag
+from logicsim.optimize import optimize
+
+def _outputs(circuit, bits):
+    for i, b in zip(circuit.inputs(), bits):
+        circuit.values[i] = b
+    values = circuit.evaluate()
+    return [values[o] for o in circuit.outputs()]
+
+def _assert_same_function(a, b):
+    n = len(a.inputs())
+    assert len(b.inputs()) == n
+    for row in range(1 << n):
+        bits = [(row >> j) & 1 for j in range(n)]
+        assert _outputs(a, bits) == _outputs(b, bits)
+
+def _gate(c, gate_type, *srcs):
+    g = c.add_gate(gate_type)
+    for pin, s in enumerate(srcs):
+        c.connect(s, g, pin)
+    return g
+
+def test_constants_are_propagated():
+    c = Circuit()
+    a, b = c.add_gate("INPUT"), c.add_gate("INPUT")
+    zero, one = c.add_gate("CONST0"), c.add_gate("CONST1")
+    _gate(c, "OUTPUT", _gate(c, "OR", _gate(c, "AND", a, zero),
+                             _gate(c, "XOR", b, one)))
+    _gate(c, "OUTPUT", _gate(c, "NAND", one, one))
+    new, report = optimize(c)
+    # AND(a, 0) e NAND(1, 1) ficam constantes, OR(0, !b) passa a NOT b
+    assert report.constants == 2
+    assert sorted(new.gate_types) == ["CONST0", "INPUT", "INPUT", "NOT",
+                                      "OUTPUT", "OUTPUT"]
+    _assert_same_function(c, new)
+
+def test_double_inversions_are_removed():
+    c = Circuit()
+    a = c.add_gate("INPUT")
+    _gate(c, "OUTPUT", _gate(c, "NOT", _gate(c, "NOT", a)))
+    new, report = optimize(c)
+    assert report.inversions == 1
+    assert new.gate_types == ["INPUT", "OUTPUT"]
+    _assert_same_function(c, new)
+
+def test_equal_gates_are_merged():
+    c = Circuit()
+    a, b = c.add_gate("INPUT"), c.add_gate("INPUT")
+    _gate(c, "OUTPUT", _gate(c, "AND", a, b))
+    _gate(c, "OUTPUT", _gate(c, "AND", b, a))
+    new, report = optimize(c)
+    assert report.merged == 1
+    assert new.gate_types.count("AND") == 1
+    _assert_same_function(c, new)
+
+def test_unobserved_gates_and_registers_are_removed():
+    c = Circuit()
+    a, clk = c.add_gate("INPUT"), c.add_gate("CLOCK")
+    _gate(c, "OUTPUT", _gate(c, "NOT", a))
+    _gate(c, "DFF", _gate(c, "XOR", a, clk), clk)   # nenhum OUTPUT o observa
+    new, report = optimize(c)
+    assert report.dead == 2
+    assert sorted(new.gate_types) == ["CLOCK", "INPUT", "NOT", "OUTPUT"]
+    _assert_same_function(c, new)
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_random_circuit_keeps_its_function(seed):
+    c = random_dag(400, n_inputs=8, n_outputs=8, seed=seed, window=30)
+    new, report = optimize(c)
+    assert report.after == len(new) <= report.before == len(c)
+    _assert_same_function(c, new)
+
+def test_constant_inputs():
+    c = random_dag(200, n_inputs=6, n_outputs=6, seed=3, window=20)
+    fixed = c.inputs()[0]
+    c.values[fixed] = 1
+    new, report = optimize(c, constants=[fixed])
+    assert len(new.inputs()) == len(c.inputs())
+    for row in range(1 << 5):
+        bits = [1] + [(row >> j) & 1 for j in range(5)]
+        assert _outputs(new, bits) == _outputs(c, bits)
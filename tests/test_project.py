@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Leitura e escrita de projetos (logicsim.project)."""
+import pytest
+
+from logicsim import (
+    Circuit, MacroDefinition, circuit_from_data, circuit_to_data,
+    load_project, save_project,
+)
+from logicsim.project import circuit_from_columns
+
+@pytest.mark.parametrize("ext", ["json", "lgsb", "blif", "v"])
+def test_empty_project_round_trip(tmp_path, ext):
+    path = tmp_path / f"vazio.{ext}"
+    save_project(Circuit(), str(path))
+    assert len(load_project(str(path))) == 0
+
+def test_empty_v1_project(tmp_path):
+    # Formato v1, tal como a interface original o guarda
+    path = tmp_path / "vazio.json"
+    path.write_text("[]")
+    assert len(load_project(str(path))) == 0
+
+@pytest.mark.parametrize("dst", [-1, 2, 100])
+def test_wire_destination_out_of_range(dst):
+    with pytest.raises(ValueError):
+        circuit_from_columns(["INPUT", "OUTPUT"], [0, 1], [0, 0], [0, 0],
+                             [0, 0], [0], [dst], [0])
+
+def test_wire_source_out_of_range():
+    with pytest.raises(ValueError):
+        circuit_from_columns(["INPUT", "OUTPUT"], [0, 1], [0, 0], [0, 0],
+                             [0, 0], [2], [1], [0])
+
+@pytest.mark.parametrize("value", [-1, 3, 300])
+def test_gate_value_out_of_range(value):
+    with pytest.raises(ValueError):
+        circuit_from_columns(["INPUT", "OUTPUT"], [0, 1], [value, 0],
+                             [0, 0], [0, 0], [0], [1], [0])
+
+def test_wire_from_output():
+    with pytest.raises(ValueError):
+        circuit_from_columns(["INPUT", "OUTPUT"], [0, 1, 1], [0, 0, 0],
+                             [0, 0, 0], [0, 0, 0], [0, 1], [1, 2], [0, 0])
+
+def _macro_data():
+    """Dados JSON de INPUT -> componente de 2 saídas -> OUTPUT."""
+    inner = Circuit()
+    a, n, o, o2 = (inner.add_gate(t) for t in ("INPUT", "NOT", "OUTPUT", "OUTPUT"))
+    inner.connect(a, n)
+    inner.connect(n, o)
+    inner.connect(a, o2)
+    c = Circuit()
+    i = c.add_gate("INPUT")
+    macro, pin0, pin1 = c.add_macro(MacroDefinition("m", inner))
+    out = c.add_gate("OUTPUT")
+    c.connect(i, macro)
+    c.connect(pin0, out)
+    return circuit_to_data(c)
+
+def test_macro_instance_round_trip():
+    circuit = circuit_from_data(_macro_data())
+    assert circuit.evaluate()[4] == 1
+
+def _swap_pins(data):
+    data["gates"]["param"][2:4] = [1, 0]
+
+def _drop_pin(data):
+    for column in ("op", "value", "x", "y", "param"):
+        del data["gates"][column][3]
+    wires = data["wires"]
+    keep = [k for k, d in enumerate(wires["dst"]) if d != 3]
+    for column in ("src", "dst", "pin"):
+        wires[column] = [wires[column][k] for k in keep]
+    wires["dst"] = [d - 1 if d > 3 else d for d in wires["dst"]]
+    wires["src"] = [s - 1 if s > 3 else s for s in wires["src"]]
+
+def _wire_from_macro(data):
+    data["wires"]["src"][3] = 1   # MACRO -> OUTPUT em vez de PIN -> OUTPUT
+
+def _wire_into_pin(data):
+    data["wires"]["src"][0] = 0   # INPUT -> PIN em vez de MACRO -> PIN
+
+@pytest.mark.parametrize("corrupt", [_swap_pins, _drop_pin, _wire_from_macro,
+                                     _wire_into_pin])
+def test_malformed_macro_instance(corrupt):
+    data = _macro_data()
+    corrupt(data)
+    with pytest.raises(ValueError):
+        circuit_from_data(data)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Servidor de avaliação (logicsim.server)."""
+import random
+import threading
+import time
+
+import pytest
+
+from logicsim import save_project
+from logicsim.generators import random_dag, ripple_carry_adder
+from logicsim.server import Client, EvaluationService, make_server
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOGICSIM_CACHE", str(tmp_path / "cache"))
+
+def _project(tmp_path, name, circuit):
+    path = tmp_path / name
+    save_project(circuit, str(path))
+    return str(path)
+
+def _expected(circuit, vectors):
+    """Cadeias das saídas de cada vetor, com a avaliação normal."""
+    rows = []
+    for bits in vectors:
+        for i, b in zip(circuit.inputs(), bits):
+            circuit.values[i] = int(b)
+        values = circuit.evaluate()
+        rows.append("".join("01X"[values[o]] for o in circuit.outputs()))
+    return rows
+
+def _vectors(n_inputs, count, seed):
+    rng = random.Random(seed)
+    return ["".join(rng.choice("01") for _ in range(n_inputs))
+            for _ in range(count)]
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 10
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+def test_evaluate_matches_circuit(tmp_path):
+    circuit = random_dag(200, n_inputs=10, n_outputs=6, seed=9, window=20)
+    path = _project(tmp_path, "p.json", circuit)
+    vectors = _vectors(10, 50, 9)
+    service = EvaluationService()
+    response = service.handle({"op": "evaluate", "project": path,
+                               "vectors": vectors})
+    assert response == {"ok": True, "outputs": _expected(circuit, vectors)}
+    response = service.handle({"project": path, "vector": vectors[0]})
+    assert response["output"] == _expected(circuit, vectors[:1])[0]
+    response = service.handle({"project": path, "vectors": ["01"]})
+    assert not response["ok"] and "Vetor inválido" in response["error"]
+
+def test_concurrent_requests_are_coalesced(tmp_path):
+    circuit = ripple_carry_adder(4)
+    path = _project(tmp_path, "somador.json", circuit)
+    service = EvaluationService()
+    entry = service.cache.get(path)
+
+    # O primeiro pedido fica a avaliar até os restantes estarem em espera
+    release = threading.Event()
+    evaluate = entry._evaluate
+    def slow(words, count):
+        release.wait(10)
+        return evaluate(words, count)
+    entry._evaluate = slow
+
+    requests = [_vectors(9, 1 + k, k) for k in range(6)]
+    results = [None] * len(requests)
+    def worker(k):
+        results[k] = service.handle({"project": path,
+                                     "vectors": requests[k]})["outputs"]
+    threads = [threading.Thread(target=worker, args=(0,))]
+    threads[0].start()
+    _wait_for(lambda: entry._busy)
+    threads += [threading.Thread(target=worker, args=(k,))
+                for k in range(1, len(requests))]
+    for t in threads[1:]:
+        t.start()
+    _wait_for(lambda: len(entry._pending) == len(requests) - 1)
+    release.set()
+    for t in threads:
+        t.join(10)
+
+    assert results == [_expected(circuit, v) for v in requests]
+    assert (entry.batches, entry.coalesced) == (2, len(requests) - 1)
+
+def test_cache_is_lru_and_follows_file_changes(tmp_path):
+    service = EvaluationService(capacity=2)
+    paths = [_project(tmp_path, f"p{k}.json", ripple_carry_adder(k + 1))
+             for k in range(3)]
+    load = lambda p: service.handle({"op": "load", "project": p})
+    load(paths[0])
+    load(paths[1])
+    load(paths[0])          # p0 passa a ser o mais recente
+    load(paths[2])          # sai p1
+    stats = service.handle({"op": "stats"})
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 3, 1)
+    load(paths[0])
+    assert service.handle({"op": "stats"})["hits"] == 2
+    load(paths[1])
+    assert service.handle({"op": "stats"})["misses"] == 4
+
+    # Outro conteúdo no mesmo caminho é outro circuito
+    changed = ripple_carry_adder(3)
+    save_project(changed, paths[1])
+    vectors = _vectors(7, 10, 1)
+    response = service.handle({"project": paths[1], "vectors": vectors})
+    assert response["outputs"] == _expected(changed, vectors)
+
+def test_unix_socket_round_trip(tmp_path):
+    circuit = ripple_carry_adder(3)
+    path = _project(tmp_path, "p.lgsb", circuit)
+    server = make_server(EvaluationService(), socket_path=str(tmp_path / "s"))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        with Client(str(tmp_path / "s")) as client:
+            vectors = _vectors(7, 20, 2)
+            assert client.evaluate(path, vectors) == _expected(circuit, vectors)
+            with pytest.raises(ValueError):
+                client.evaluate(path, ["0"])
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Tabelas de verdade e equivalência (logicsim.truthtable)."""
+import pytest
+
+from logicsim import OPCODES, truthtable
+from logicsim.generators import carry_lookahead_adder, ripple_carry_adder
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    """Lotes de 8 linhas, para exercitar vários lotes e processos."""
+    monkeypatch.setattr(truthtable, "BATCH_BITS", 3)
+    monkeypatch.setattr(truthtable, "PARALLEL_INPUTS", 4)
+    monkeypatch.setattr(truthtable, "BATCHES_PER_TASK", 2)
+
+def _outputs(circuit, bits):
+    for i, b in zip(circuit.inputs(), bits):
+        circuit.values[i] = b
+    values = circuit.evaluate()
+    return tuple(values[o] for o in circuit.outputs())
+
+def _broken_adder(n):
+    """Somador com o último XOR trocado por um OR."""
+    circuit = ripple_carry_adder(n)
+    last = max(i for i, op in enumerate(circuit.opcodes)
+               if op == OPCODES["XOR"])
+    circuit.opcodes[last] = OPCODES["OR"]
+    circuit.version += 1
+    return circuit
+
+def test_truth_table_rows_match_evaluate(small_batches):
+    circuit = ripple_carry_adder(3)
+    rows = list(truthtable.iter_truth_table(circuit))
+    assert len(rows) == 1 << 7
+    for row, (bits, outs) in enumerate(rows):
+        assert bits == tuple((row >> j) & 1 for j in range(7))
+        assert outs == _outputs(circuit, bits)
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_equivalent_adders(small_batches, processes):
+    assert truthtable.check_equivalence(
+        ripple_carry_adder(3), carry_lookahead_adder(3, block=2),
+        processes) is None
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_counterexample_matches_evaluate(small_batches, processes):
+    good, bad = ripple_carry_adder(3), _broken_adder(3)
+    bits, out_good, out_bad = truthtable.check_equivalence(good, bad,
+                                                           processes)
+    assert out_good == _outputs(good, bits) != _outputs(bad, bits) == out_bad